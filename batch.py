@@ -0,0 +1,34 @@
+#! /bin/python3
+# -*- coding: Utf-8 -*
+
+import sys
+import glob
+import argparse
+from my_radar import ScriptParser
+from my_radar.batch import ScriptSetups, DEFAULT_MAX_CHRONO, create_jobs, run_batch, write_batch_results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="my_radar_batch", description="Run headless air traffic simulations in parallel")
+    parser.add_argument("scripts", nargs="+", help="Paths or glob patterns of .rdr script files")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file where the result of each run is appended")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: one per core)")
+    parser.add_argument("--speed-scale", type=float, nargs="+", default=[1], help="Airplane speed factors to sweep")
+    parser.add_argument("--delay-jitter", type=float, nargs="+", default=[0], help="Maximum random delay offsets (in seconds) to sweep")
+    parser.add_argument("--tower-radius-scale", type=float, nargs="+", default=[1], help="Tower area radius factors to sweep")
+    parser.add_argument("--seeds", type=int, default=1, help="Number of random seeds per parameter combination")
+    parser.add_argument("--max-time", type=float, default=DEFAULT_MAX_CHRONO, help="Simulated time limit of a run (in seconds)")
+
+    args = parser.parse_args()
+    scripts = list[ScriptSetups]()
+    for pattern in args.scripts:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            script = ScriptParser(path)
+            scripts.append(ScriptSetups(script.filepath, script.airplanes, script.towers))
+
+    jobs = create_jobs(len(scripts), args.speed_scale, args.delay_jitter, args.tower_radius_scale, args.seeds)
+    nb_results = write_batch_results(run_batch(scripts, jobs, args.max_time, args.jobs), args.output)
+    print("{} run{} written in {}".format(nb_results, "s" if nb_results > 1 else "", args.output))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#! /bin/python3
+# -*- coding: Utf-8 -*
+
+import sys
+import json
+import argparse
+from my_radar import ScriptParser
+from my_radar.batch import ScriptSetups, DEFAULT_MAX_CHRONO
+from my_radar.montecarlo import estimate_collision_risk
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="my_radar_montecarlo", description="Estimate the collision risk of a script with randomized replicas")
+    parser.add_argument("script", help="Path to a .rdr script file")
+    parser.add_argument("-n", "--replicas", type=int, default=1000, help="Maximum number of replicas")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: one per core)")
+    parser.add_argument("--delay-jitter", type=float, default=1, help="Maximum random delay offset (in seconds)")
+    parser.add_argument("--speed-jitter", type=float, default=0.05, help="Maximum relative random speed offset")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first replica")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Stop when every confidence interval half-width is below this value")
+    parser.add_argument("--min-replicas", type=int, default=100, help="Minimum number of replicas before early stopping")
+    parser.add_argument("--max-time", type=float, default=DEFAULT_MAX_CHRONO, help="Simulated time limit of a replica (in seconds)")
+    parser.add_argument("-o", "--output", help="JSON file where all the estimates are written")
+    parser.add_argument("--top", type=int, default=10, help="Number of riskiest airplanes and pairs to print")
+
+    args = parser.parse_args()
+    script = ScriptParser(args.script)
+    estimator = estimate_collision_risk(
+        ScriptSetups(script.filepath, script.airplanes, script.towers), args.replicas,
+        delay_jitter=args.delay_jitter, speed_jitter=args.speed_jitter, seed=args.seed, tolerance=args.tolerance,
+        min_replicas=args.min_replicas, max_chrono=args.max_time, max_workers=args.jobs
+    )
+    airplanes = estimator.airplane_estimates()
+    pairs = estimator.pair_estimates()
+
+    print("Replicas:", estimator.nb_replicas)
+    print("Riskiest airplanes (frequency [95% CI]):")
+    for airplane, estimate in sorted(airplanes.items(), key=lambda item: item[1].frequency, reverse=True)[:args.top]:
+        print("  A{}: {:.4f} [{:.4f}, {:.4f}]".format(airplane, estimate.frequency, estimate.low, estimate.high))
+    print("Riskiest pairs (frequency [95% CI]):")
+    for (airplane_1, airplane_2), estimate in list(pairs.items())[:args.top]:
+        print("  A{} - A{}: {:.4f} [{:.4f}, {:.4f}]".format(airplane_1, airplane_2, estimate.frequency, estimate.low, estimate.high))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "replicas": estimator.nb_replicas,
+                "airplanes": {str(airplane): estimate._asdict() for airplane, estimate in airplanes.items()},
+                "pairs": {"{}-{}".format(*pair): estimate._asdict() for pair, estimate in pairs.items()},
+            }, file, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
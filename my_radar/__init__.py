@@ -5,152 +5,499 @@ import os.path
 import sys
 import time
 import io
+import importlib
+from concurrent.futures import Future
 from typing import Union
 
 sys.stdout = io.StringIO()
 import pygame
 sys.stdout = sys.__stdout__
 
-from .constants import BLACK, WHITE, IMG, FONT_DARK_CALIBRI
+from .constants import WHITE, RED, GREEN_DARK, IMG, FONT_DARK_CALIBRI, SCREEN_SIZE
 from .camera import Camera
 from .entity import Entity, EntityEditor, EntityEditorGroup
-from .airplane import Airplane, AirplaneGroup, AirplaneEditor
-from .tower import Tower, TowerGroup, TowerEditor
+from .airplane import Airplane, AirplaneGroup, AirplaneEditor, get_airplane_images
+from .tower import TowerGroup, TowerEditor
 from .parser import ScriptParser
-from .editor import EditorToolbox, EditorSideBoard, EditorActionFormatter
+from .simulation import Simulation, SimulationThread
+from .scheduler import SpawnScheduler
+from .snapshot import AirplaneStateRenderer, AIRPLANE_IN_TOWER_AREA, is_flying
+from .recording import TrajectoryRecorder, TrajectoryReplay, TrajectoryPlayer
+from .metrics import REGISTRY
+from .checkpoint import load_checkpoint, restore_simulation, get_checkpoint_writer
+from .profiling import StartupProfiler, MemoryProfiler, get_surfaces_size
+from .steady_state import FrameCollector
+from .loading import LoadingScreen, EntityLoader, load_image_in_background, draw_progress_bar
+
+# Modules only needed by the editor or by optional services are imported on first use
+LAZY_ATTRIBUTES = {
+    "EditorToolbox": ".editor",
+    "EditorSideBoard": ".editor",
+    "EditorActionFormatter": ".editor",
+    "SharedStateReader": ".shared_state",
+    "publish_simulation": ".shared_state",
+    "TelemetryServer": ".telemetry",
+    "MetricsServer": ".metrics_server",
+}
+
+def __getattr__(name: str):
+    module = LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    return getattr(importlib.import_module(module, __name__), name)
+
+FRAME_DURATION = REGISTRY.histogram("my_radar_frame_seconds", "Duration of a frame, without the frame rate limiter wait")
+UPDATE_DURATION = REGISTRY.histogram("my_radar_phase_seconds", "Duration of each phase of a frame", phase="update")
+DRAW_DURATION = REGISTRY.histogram("my_radar_phase_seconds", "Duration of each phase of a frame", phase="draw")
+DISPLAY_DURATION = REGISTRY.histogram("my_radar_phase_seconds", "Duration of each phase of a frame", phase="display")
+EVENTS_DURATION = REGISTRY.histogram("my_radar_phase_seconds", "Duration of each phase of a frame", phase="events")
+
+FRAMERATE = 60
+ENTITIES_LOADING_BUDGET = 1 / 120 # seconds of entity building per frame
+IDLE_WAIT_TIMEOUT = 0.25          # seconds: longest wait for an event while the view is static
+IDLE_REDRAW_INTERVAL = 1          # seconds: a static view is still drawn this often (FPS overlay)
 
 class MyRadar:
 
-    def __init__(self, parser: ScriptParser, editor=False):
+    def __init__(self, parser: Union[ScriptParser, Future, None], editor=False, threaded=False, shared_memory: Union[str, None]=None,
+                 record: Union[str, None]=None, replay: Union[str, None]=None, resume: Union[str, None]=None,
+                 checkpoint: Union[str, None]=None, checkpoint_every: float=5, telemetry: Union[str, None]=None,
+                 metrics: Union[str, None]=None, startup_profiler: Union[StartupProfiler, None]=None, watch=False,
+                 autosave=True, recover=False, memory_profiler: Union[MemoryProfiler, None]=None, steady_state=False,
+                 event_log: Union[str, None]=None, heatmap: Union[str, None]=None):
+        self.startup_profiler = startup_profiler if startup_profiler is not None else StartupProfiler(enabled=False)
+        self.memory_profiler = memory_profiler if memory_profiler is not None else MemoryProfiler(enabled=False)
         status = pygame.init()
         if status[1] > 0:
             sys.exit("Error on pygame initialization ({} module{} failed to load)".format(status[1], "s" if status[1] > 1 else ""))
-        self.screen = pygame.display.set_mode((1920, 1080), flags=pygame.FULLSCREEN|pygame.HWSURFACE|pygame.DOUBLEBUF)
+        self.startup_profiler.mark("pygame init")
+        self.screen = pygame.display.set_mode(SCREEN_SIZE, flags=pygame.FULLSCREEN|pygame.HWSURFACE|pygame.DOUBLEBUF)
+        pygame.key.set_repeat(500, 50)
+
+        # Images are decoded (and the script is parsed) on worker threads while the loading screen is shown
+        images = {name: load_image_in_background(IMG[name]) for name in ("airplane", "tower")}
+        world_map = load_image_in_background(IMG["world_map"], self.screen.get_size())
+        self.loading_screen = LoadingScreen(self.screen)
+        self.loading_screen.draw(0)
+        self.startup_profiler.mark("display and loading screen")
+
+        if isinstance(parser, Future):
+            parser = self.loading_screen.wait(parser, 0.1)
         title = "MyRadar Remake"
         if editor:
             title = "{} - Editor | file: {}".format(title, os.path.basename(parser.filepath))
         pygame.display.set_caption(title)
-        pygame.key.set_repeat(500, 50)
-
-        # Show Loading message:
-        self.screen.fill(BLACK)
-        text_loading = pygame.font.SysFont("calibri", 50).render("Loading...", True, "white")
-        self.screen.blit(text_loading, text_loading.get_rect(center=self.rect.center))
-        pygame.display.flip()
 
         self.clock = pygame.time.Clock()
-        self.chrono = 0
 
-        airplane_image = pygame.image.load(IMG["airplane"]).convert_alpha()
-        tower_image = pygame.image.load(IMG["tower"]).convert_alpha()
-        world_map_image = pygame.image.load(IMG["world_map"]).convert_alpha()
+        airplane_image = self.loading_screen.wait(images["airplane"], 0.2).convert_alpha()
+        tower_image = self.loading_screen.wait(images["tower"], 0.3).convert_alpha()
+        world_map_image = self.loading_screen.wait(world_map, 0.4).convert_alpha()
 
-        self.background = pygame.transform.smoothscale(world_map_image, self.screen.get_size())
+        self.background = world_map_image
+        if self.background.get_size() != self.screen.get_size():
+            self.background = pygame.transform.smoothscale(world_map_image, self.screen.get_size())
         self.font = pygame.font.Font(FONT_DARK_CALIBRI, 45)
+        self.rendered_texts = dict[str, tuple[str, pygame.Surface]]()
 
         alpha_threshold = 125
         self.white_mask = pygame.Surface(self.screen.get_size(), flags=pygame.SRCALPHA).convert_alpha()
         self.white_mask.fill(pygame.Color(255, 255, 255, alpha_threshold))
         self.black_mask = pygame.Surface(self.screen.get_size(), flags=pygame.SRCALPHA).convert_alpha()
         self.black_mask.fill(pygame.Color(0, 0, 0, alpha_threshold))
+        self.startup_profiler.mark("images and fonts")
 
         self.parser = parser
+        recovered = False
+        if editor and recover:
+            from .autosave import recover_setups # pylint: disable=import-outside-toplevel
+            setups = recover_setups(parser.filepath)
+            if setups is not None:
+                parser.load_setups(*setups)
+                recovered = True
+            else:
+                print("my_radar: nothing to recover for {}".format(parser.filepath), file=sys.stderr)
 
         # Editor
         self.editor = editor
         self.entity_editor_grp = EntityEditorGroup()
 
-        # Load Airplanes
-        self.airplanes_group = AirplaneGroup()
-        for airplane_setup in parser.airplanes:
-            AirplaneType = Airplane if not self.editor else AirplaneEditor
-            airplane = AirplaneType.from_script_setup(airplane_image, airplane_setup)
-            airplane.group = self.airplanes_group
-            if self.editor:
-                airplane.add(self.entity_editor_grp)
-        self.airplanes_list = self.airplanes_group.sprites().copy() if not self.editor else list[Airplane]()
-
-        # Load Towers
-        self.towers_group = TowerGroup()
-        for tower_setup in parser.towers:
-            TowerType = Tower if not self.editor else TowerEditor
-            tower = TowerType.from_script_setup(tower_image, tower_setup, self.rect)
-            tower.group = self.towers_group
-            if self.editor:
-                tower.add(self.entity_editor_grp)
+        # A shared memory viewer or a replay only draws the airplanes states written by someone else
+        self.replay = TrajectoryReplay(replay) if replay is not None and not self.editor else None
+        external_airplanes = (shared_memory is not None or self.replay is not None) and not self.editor
+        restored_simulation = None
+        if resume is not None and not self.editor and not external_airplanes:
+            restored_simulation = restore_simulation(load_checkpoint(resume), airplane_image, tower_image, self.rect)
 
-        # Editor stuff
-        action_formatter = EditorActionFormatter.from_entity_editor
-        self.toolbox = EditorToolbox(airplane_image, tower_image, self.airplanes_group, self.towers_group)
-        self.sideboard = EditorSideBoard(
-            action_formatter(AirplaneEditor, select=True),
-            action_formatter(TowerEditor, select=True)
+        # Airplanes and Towers
+        self.airplanes_group = AirplaneGroup() if restored_simulation is None else restored_simulation.airplanes_group
+        self.towers_group = TowerGroup() if restored_simulation is None else restored_simulation.towers_group
+        script_airplanes = parser.airplanes if not external_airplanes and restored_simulation is None else list()
+        # Outside the editor, airplanes are only built shortly before taking off
+        scheduler = SpawnScheduler.from_setups(airplane_image, script_airplanes if not self.editor else list())
+        self.simulation = Simulation(self.airplanes_group, self.towers_group, scheduler) if restored_simulation is None else restored_simulation
+        airplanes_setups = script_airplanes if self.editor else list()
+        if self.replay is not None:
+            towers_setups = self.replay.towers
+        else:
+            towers_setups = parser.towers if restored_simulation is None else list()
+        self.entity_loader = EntityLoader(
+            self.simulation, airplane_image, tower_image, airplanes_setups, towers_setups, self.rect,
+            entity_editor_grp=self.entity_editor_grp if self.editor else None
         )
+        if self.editor:
+            # The editor works on the whole script: everything is built behind the loading screen
+            while not self.entity_loader.done:
+                self.entity_loader.load(1 / 30)
+                self.loading_screen.draw(0.5 + self.entity_loader.progress / 2)
+            self.entity_loader = None
+        self.startup_profiler.mark("entities")
+
+        # Simulation
+        self.simulation_thread = SimulationThread(self.simulation) if threaded and not self.editor and not external_airplanes else None
+        self.recorder = None
+        self.record = record if not self.editor and not external_airplanes else None
+        self.checkpoint_writer = None
+        if checkpoint is not None and not self.editor and not external_airplanes:
+            self.checkpoint_writer = get_checkpoint_writer(checkpoint, checkpoint_every)
+            if self.checkpoint_writer is not None:
+                self.simulation.add_listener(self.checkpoint_writer)
+        self.event_log = None
+        if event_log is not None and not self.editor and not external_airplanes:
+            from .events import EventLog # pylint: disable=import-outside-toplevel
+            self.event_log = EventLog(event_log, first_collision=len(self.simulation.collisions))
+            self.simulation.add_listener(self.event_log)
+        # Traffic heatmap: accumulated from the start when it is saved at exit, else from the first time it is shown
+        self.local_simulation = not self.editor and not external_airplanes
+        self.heatmap = self.heatmap_overlay = None
+        self.heatmap_path = heatmap if self.local_simulation else None
+        self.heatmap_rendered = 0
+        self.show_heatmap = False
+        if self.heatmap_path is not None:
+            self.start_heatmap()
+        self.airplane_renderer = AirplaneStateRenderer(airplane_image)
+        self.snapshot_source = self.shared_state_reader = None
+        if self.simulation_thread is not None:
+            self.snapshot_source = self.simulation_thread.buffer
+        elif self.replay is not None:
+            self.snapshot_source = TrajectoryPlayer(self.replay)
+        elif shared_memory is not None and not self.editor:
+            from .shared_state import SharedStateReader # pylint: disable=import-outside-toplevel
+            self.snapshot_source = self.shared_state_reader = SharedStateReader(shared_memory)
+        # Until every entity is built, they are drawn from their groups
+        self.snapshot = None
+        self.telemetry = None
+        if telemetry is not None and not self.editor:
+            from .telemetry import TelemetryServer # pylint: disable=import-outside-toplevel
+            self.telemetry = TelemetryServer(telemetry)
+        self.nb_published_collisions = 0
+        self.metrics_server = None
+        if metrics is not None:
+            from .metrics_server import MetricsServer # pylint: disable=import-outside-toplevel
+            self.metrics_server = MetricsServer(metrics)
+        for state in ("flying", "land_on", "destroyed", "in_tower_area"):
+            REGISTRY.gauge("my_radar_airplanes", "Airplanes count by state", state=state).set_function(
+                lambda state=state: self.count_airplanes()[state]
+            )
+        self.startup_profiler.mark("simulation")
+
+        # Editor stuff
+        self.toolbox = self.sideboard = None
+        if self.editor:
+            from .editor import EditorToolbox, EditorSideBoard, EditorActionFormatter # pylint: disable=import-outside-toplevel
+            action_formatter = EditorActionFormatter.from_entity_editor
+            self.toolbox = EditorToolbox(airplane_image, tower_image, self.airplanes_group, self.towers_group)
+            self.sideboard = EditorSideBoard(
+                action_formatter(AirplaneEditor, select=True),
+                action_formatter(TowerEditor, select=True),
+                EditorActionFormatter.from_action_dict(EntityEditorGroup.get_action_dict(), select=True)
+            )
+            self.startup_profiler.mark("editor")
         self.show_editor_stuff = True
 
+        # Watch mode: the editor follows the changes made to the script by other programs
+        self.entity_images = (airplane_image, tower_image)
+        self.script_watcher = None
+        self.script_entities = list[Union[EntityEditor, None]]()
+        if watch and self.editor:
+            from .watch import ScriptWatcher # pylint: disable=import-outside-toplevel
+            self.script_watcher = ScriptWatcher(self.parser.filepath)
+            self.map_script_entities()
+        self.show_route_crossings = False
+        self.route_crossings = list()
+
+        # Autosave: the changes are journaled on a background thread, until the script is saved
+        self.autosave = None
+        if self.editor and autosave:
+            from .autosave import EditorAutosave, get_journal_path # pylint: disable=import-outside-toplevel
+            if os.path.isfile(get_journal_path(self.parser.filepath)) and not recovered:
+                # The journal of the last session must not be overwritten before the user had a chance to recover it
+                print("my_radar: {} has unsaved changes from a previous session, run again with --recover to get them back "
+                      "(autosave is disabled)".format(self.parser.filepath), file=sys.stderr)
+            else:
+                self.autosave = EditorAutosave(self.parser.filepath, self.entity_editor_grp)
+        if recovered:
+            self.entity_editor_grp.modification_recovered()
+
         # Camera
         self.camera = Camera(self.screen)
+        self.view_invalidated = True
+        self.last_draw = 0
+        self.frame_collector = FrameCollector(enabled=steady_state)
+
+        # Pygame surfaces are not traced: their pixels are counted apart
+        self.memory_profiler.add_source("airplane images", lambda: get_surfaces_size([
+            *get_airplane_images(), *(airplane.image for airplane in self.airplanes_group.sprites()), *self.airplane_renderer.images
+        ]))
+        self.memory_profiler.add_source("tower images", lambda: get_surfaces_size(tower.image for tower in self.towers_group.sprites()))
+        self.memory_profiler.add_source("tower areas", lambda: get_surfaces_size(
+            area.image for tower in self.towers_group.sprites() for area in tower.areas
+        ))
+        if self.editor:
+            self.memory_profiler.add_source("editor history", self.entity_editor_grp.history.get_memory_size)
+        if self.entity_loader is None:
+            self.memory_profiler.report("entities loaded")
+            self.frame_collector.freeze()
 
     @property
     def rect(self) -> pygame.Rect:
         return self.screen.get_rect()
 
+    @property
+    def chrono(self) -> float:
+        if self.snapshot is not None:
+            return self.snapshot.chrono
+        return self.simulation.chrono
+
+    @property
+    def finished(self) -> bool:
+        if self.snapshot is not None:
+            return self.snapshot.finished
+        # The local simulation of a shared memory viewer is empty: only its first snapshot tells
+        if self.shared_state_reader is not None:
+            return False
+        return self.simulation.finished
+
     def start(self) -> None:
         loop = True
         simulation_running = not self.editor
-        self.chrono = 0
+        if self.telemetry is not None:
+            self.telemetry.start()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
         while loop:
-            self.clock.tick(60)
-            if simulation_running:
-                self.chrono += self.clock.get_time() / 1000
-                self.airplanes_group.update(self.chrono)
-            self.draw_screen()
-            pygame.display.update()
-            for event in pygame.event.get():
+            idle = self.is_view_idle(simulation_running)
+            events = list[pygame.event.Event]()
+            if idle and not self.view_invalidated:
+                # Nothing changes on screen until an event comes: sleep instead of drawing the same frame again
+                event = pygame.event.wait(round(IDLE_WAIT_TIMEOUT * 1000))
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+            self.clock.tick(FRAMERATE)
+            self.memory_profiler.start_frame()
+            frame_start = time.perf_counter()
+            if self.entity_loader is not None:
+                self.load_entities()
+            elif self.script_watcher is not None:
+                self.reload_script()
+            else:
+                if isinstance(self.snapshot_source, TrajectoryPlayer):
+                    self.snapshot_source.update(self.clock.get_time() / 1000)
+                if self.snapshot_source is not None:
+                    self.snapshot = self.snapshot_source.latest
+                elif simulation_running:
+                    self.simulation.update(self.clock.get_time() / 1000)
+            if self.autosave is not None:
+                self.autosave.update()
+            if self.telemetry is not None:
+                self.publish_telemetry()
+            draw_start = display_start = time.perf_counter()
+            redraw = not idle or self.view_invalidated or draw_start - self.last_draw >= IDLE_REDRAW_INTERVAL
+            if redraw:
+                self.draw_screen()
+                display_start = time.perf_counter()
+                pygame.display.update()
+                self.view_invalidated = False
+                self.last_draw = draw_start
+            if self.startup_profiler.enabled:
+                self.startup_profiler.mark("first frame")
+                self.startup_profiler.report()
+            events_start = time.perf_counter()
+            events.extend(pygame.event.get())
+            for event in events:
+                # Any event may change what is drawn
+                self.view_invalidated = True
                 if (event.type == pygame.QUIT) or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
                     loop = False
                     break
+                if event.type == pygame.KEYDOWN and isinstance(self.snapshot_source, TrajectoryPlayer):
+                    self.handle_replay_key(event.key)
                 if event.type == pygame.KEYDOWN and not self.editor:
                     if event.key == pygame.K_l:
                         Entity.show_hitbox(not Entity.hitbox_shown())
                     elif event.key == pygame.K_s:
                         Entity.show_sprite(not Entity.sprite_shown())
-                    elif event.key == pygame.K_p:
+                    elif event.key == pygame.K_h and self.local_simulation:
+                        self.show_heatmap = not self.show_heatmap
+                        if self.heatmap is None:
+                            self.start_heatmap()
+                    elif event.key == pygame.K_p and self.replay is None:
                         simulation_running = not simulation_running
+                        if self.simulation_thread is not None:
+                            if simulation_running:
+                                self.simulation_thread.resume()
+                            else:
+                                self.simulation_thread.pause()
                 elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not self.editor:
-                    x, y = self.camera.map_cursor(event.pos)
-                    for airplane in self.airplanes_group.sprites():
-                        if airplane.rect.collidepoint(x, y):
-                            self.camera.focus(airplane)
-                            break
+                    self.camera.focus(self.get_airplane_at(self.camera.map_cursor(event.pos)))
                 if self.editor:
                     self.handle_editor_event(event)
                 else:
                     self.camera.handle_event(event)
-            if not self.editor and simulation_running:
-                self.towers_group.update(self.airplanes_group.sprites())
-                self.airplanes_group.check_collisions()
-                if not self.airplanes_group:
-                    self.show_results()
-                    loop = False
+            frame_end = time.perf_counter()
+            UPDATE_DURATION.observe(draw_start - frame_start)
+            if redraw:
+                DRAW_DURATION.observe(display_start - draw_start)
+                DISPLAY_DURATION.observe(events_start - display_start)
+            EVENTS_DURATION.observe(frame_end - events_start)
+            FRAME_DURATION.observe(frame_end - frame_start)
+            self.memory_profiler.end_frame()
+            self.frame_collector.collect(1 / FRAMERATE - (time.perf_counter() - frame_start))
+            if not self.editor and self.replay is None and self.entity_loader is None and self.finished:
+                self.show_results()
+                loop = False
+        if self.simulation_thread is not None:
+            self.simulation_thread.stop()
+        elif self.shared_state_reader is not None:
+            self.shared_state_reader.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.wait()
+        if self.event_log is not None:
+            self.event_log.close()
+        if self.heatmap_path is not None:
+            self.heatmap.save(self.heatmap_path)
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.replay is not None:
+            self.replay.close()
+        if self.autosave is not None:
+            self.autosave.stop()
+        self.memory_profiler.report("exit")
+        self.memory_profiler.stop()
+        self.frame_collector.stop()
         pygame.quit()
 
+    def is_view_idle(self, simulation_running: bool) -> bool:
+        # An idle view only changes on events: it is drawn again once invalidated
+        if self.entity_loader is not None or self.camera.moving:
+            return False
+        if self.editor:
+            return not self.entity_editor_grp.moving and not self.entity_editor_grp.selecting
+        if isinstance(self.snapshot_source, TrajectoryPlayer):
+            return not self.snapshot_source.playing
+        if self.shared_state_reader is not None:
+            return False
+        return not simulation_running
+
+    def load_entities(self) -> None:
+        # Entities stream in during the first frames (the map is already interactive), the simulation starts once they are all built
+        self.entity_loader.load(ENTITIES_LOADING_BUDGET)
+        if not self.entity_loader.done:
+            return
+        self.entity_loader = None
+        self.memory_profiler.report("entities loaded")
+        if self.record is not None:
+            self.recorder = TrajectoryRecorder(
+                self.record, self.simulation.get_angles(),
+                [tower.get_setup() for tower in self.simulation.towers_list]
+            )
+            self.simulation.add_listener(self.recorder.record)
+        if self.simulation_thread is not None:
+            self.simulation_thread.buffer.publish(self.simulation.snapshot())
+            self.simulation_thread.start()
+        self.frame_collector.freeze()
+
+    def count_airplanes(self) -> dict[str, int]:
+        # Called from the metrics server thread: only read immutable snapshots or counts, never the groups being updated
+        if self.snapshot is not None:
+            snapshot = self.snapshot
+            flags = [state_flags for _, _, _, _, state_flags in snapshot.airplanes if is_flying(state_flags)]
+            return {
+                "flying": len(flags), "land_on": snapshot.land_on, "destroyed": snapshot.destroyed,
+                "in_tower_area": sum(1 for state_flags in flags if state_flags & AIRPLANE_IN_TOWER_AREA)
+            }
+        return self.simulation.airplanes_count._asdict()
+
+    def publish_telemetry(self) -> None:
+        # With a simulation thread, the collisions and their positions come from the same snapshot as the airplanes
+        snapshot = self.snapshot
+        collisions = snapshot.collisions if snapshot is not None else self.simulation.collision_states
+        nb_collisions = snapshot.nb_collisions if snapshot is not None else len(collisions)
+        events = collisions[self.nb_published_collisions:nb_collisions]
+        self.nb_published_collisions = nb_collisions
+        if self.telemetry.nb_clients == 0:
+            return
+        from .telemetry import CollisionEvent # pylint: disable=import-outside-toplevel
+        self.telemetry.publish(
+            snapshot if snapshot is not None else self.simulation.snapshot(), [CollisionEvent(*collision) for collision in events]
+        )
+
+    def handle_replay_key(self, key: int) -> None:
+        player = self.snapshot_source
+        if key == pygame.K_p or key == pygame.K_SPACE:
+            player.toggle_pause()
+        elif key == pygame.K_LEFT:
+            player.seek(player.chrono - 10)
+        elif key == pygame.K_RIGHT:
+            player.seek(player.chrono + 10)
+        elif key == pygame.K_UP:
+            player.speed *= 2
+        elif key == pygame.K_DOWN:
+            player.speed /= 2
+
+    def get_airplane_at(self, point: tuple[int, int]) -> Union[Airplane, None]:
+        if self.snapshot is not None:
+            if self.simulation_thread is None:
+                # Airplanes drawn from shared memory or from a replay have no local entity to follow
+                return None
+            for state in self.snapshot.airplanes:
+                if state.flying and self.airplane_renderer.get_rect(state).collidepoint(point):
+                    return self.simulation.get_airplane(state.identifier)
+            return None
+        for airplane in self.airplanes_group.sprites():
+            if airplane.rect.collidepoint(point):
+                return airplane
+        return None
+
     def draw_screen(self) -> None:
         self.screen.blit(self.background, (0, 0))
 
         # Draw entities
         self.towers_group.draw(self.screen)
-        self.airplanes_group.draw(self.screen)
+        if self.snapshot is not None:
+            self.airplane_renderer.draw(self.screen, self.snapshot.airplanes)
+        else:
+            self.airplanes_group.draw(self.screen)
+        if self.show_heatmap:
+            self.draw_heatmap()
         if self.editor:
             self.screen.blit(self.white_mask, (0, 0))
             if isinstance(self.entity_editor_grp.selected, Entity):
                 self.entity_editor_grp.selected.draw(self.screen)
+            self.entity_editor_grp.draw_selection(self.screen)
+            if self.show_route_crossings:
+                for crossing in self.route_crossings:
+                    pygame.draw.circle(self.screen, GREEN_DARK if crossing.protected else RED, (crossing.x, crossing.y), 6, width=2)
 
         # Set zoom scale
         self.camera.update()
 
         # Draw framerate
-        text_framerate = self.font.render("{} FPS".format(int(self.clock.get_fps())), True, WHITE)
+        text_framerate = self.render_text("framerate", "{} FPS".format(int(self.clock.get_fps())), WHITE)
         if not self.editor:
             self.screen.blit(text_framerate, text_framerate.get_rect(top=self.rect.top + 10, left=self.rect.left + 10))
         else:
@@ -158,16 +505,21 @@ class MyRadar:
 
         if not self.editor:
             # Draw chrono
-            text_chrono = self.font.render(time.strftime("%H:%M:%S", time.gmtime(self.chrono)), True, WHITE)
+            text_chrono = self.render_text("chrono", time.strftime("%H:%M:%S", time.gmtime(self.chrono)), WHITE)
             self.screen.blit(text_chrono, text_chrono.get_rect(top=self.rect.top + 10, right=self.rect.right - 10))
+            if self.entity_loader is not None:
+                progress_rect = pygame.Rect(0, 0, self.rect.width // 3, 12)
+                progress_rect.midbottom = (self.rect.centerx, self.rect.bottom - 20)
+                draw_progress_bar(self.screen, progress_rect, self.entity_loader.progress)
         elif self.show_editor_stuff and not self.entity_editor_grp.moving:
             self.toolbox.draw(self.screen)
             text_script_filepath = "File: {}".format(os.path.basename(self.parser.filepath))
             if self.entity_editor_grp.modified:
                 text_script_filepath += " - Modified"
-            text_script_filepath = self.font.render(text_script_filepath, True, "black")
+            text_script_filepath = self.render_text("script filepath", text_script_filepath, "black")
             w, h = text_script_filepath.get_size()
-            box_rect = pygame.Surface((w + 20, h + 20)).get_rect(left=self.rect.left + 20, bottom=self.rect.bottom - 20)
+            box_rect = pygame.Rect(0, 0, w + 20, h + 20)
+            box_rect.bottomleft = (self.rect.left + 20, self.rect.bottom - 20)
             pygame.draw.rect(self.screen, "white", box_rect)
             pygame.draw.rect(self.screen, "black", box_rect, width=2)
             self.screen.blit(text_script_filepath, text_script_filepath.get_rect(center=box_rect.center))
@@ -175,21 +527,41 @@ class MyRadar:
                 self.screen.blit(self.black_mask, (0, 0))
             self.sideboard.draw(self.screen)
 
+    def start_heatmap(self) -> None:
+        from .heatmap import TrafficHeatmap # pylint: disable=import-outside-toplevel
+        self.heatmap = TrafficHeatmap(self.screen.get_size())
+        self.simulation.add_listener(self.heatmap)
+
+    def draw_heatmap(self) -> None:
+        # The overlay is rendered again at most every HEATMAP_RENDER_INTERVAL seconds
+        from .heatmap import HEATMAP_RENDER_INTERVAL # pylint: disable=import-outside-toplevel
+        now = time.perf_counter()
+        if self.heatmap_overlay is None or now - self.heatmap_rendered >= HEATMAP_RENDER_INTERVAL:
+            self.heatmap_overlay = self.heatmap.render(self.screen.get_size())
+            self.heatmap_rendered = now
+        if self.heatmap_overlay is not None:
+            self.screen.blit(self.heatmap_overlay, (0, 0))
+
+    def render_text(self, slot: str, text: str, color: pygame.Color) -> pygame.Surface:
+        # Overlay texts are only rendered again when they change
+        rendered = self.rendered_texts.get(slot)
+        if rendered is None or rendered[0] != text:
+            rendered = self.rendered_texts[slot] = (text, self.font.render(text, True, color))
+        return rendered[1]
+
     def show_results(self) -> None:
-        land_on = 0
-        destroyed = 0
-        for airplane in self.airplanes_list:
-            land_on += int(airplane.land_on)
-            destroyed += int(airplane.destroyed)
-        print("Simulation time:", time.strftime("%Hh%Mm%Ss", time.gmtime(self.chrono)))
-        print("Airplanes landed on:", land_on)
-        print("Airplanes destroyed:", destroyed)
+        results = self.simulation.get_results()
+        if self.snapshot is not None:
+            results = {"chrono": self.snapshot.chrono, "land_on": self.snapshot.land_on, "destroyed": self.snapshot.destroyed}
+        print_results(results)
 
     def handle_editor_event(self, event: pygame.event.Event) -> None:
-        if not self.camera.moving and not self.entity_editor_grp.moving:
+        if not self.camera.moving and not self.entity_editor_grp.moving and not self.entity_editor_grp.selecting:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_F12:
                     self.show_editor_stuff = not self.show_editor_stuff
+                elif event.key == pygame.K_F2:
+                    self.show_route_crossings = not self.show_route_crossings
                 elif event.key == pygame.K_DELETE:
                     self.entity_editor_grp.delete_selected_entity()
                 elif event.key == pygame.K_s and event.mod & (pygame.KMOD_LCTRL | pygame.KMOD_RCTRL):
@@ -197,28 +569,84 @@ class MyRadar:
                 self.entity_editor_grp.handle_key_event(event.key, event.mod)
             elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                 if not self.toolbox.is_shown() and not self.sideboard.is_shown():
-                    x, y = self.camera.map_cursor(event.pos)
-                    previous = self.entity_editor_grp.selected
-                    self.entity_editor_grp.select(None)
-                    for entity in self.entity_editor_grp.sprites():
-                        if entity.rect.collidepoint(x, y):
-                            if entity is previous:
-                                continue
-                            self.entity_editor_grp.select(entity)
-                            break
+                    self.entity_editor_grp.select(self.entity_editor_grp.pick(self.camera.map_cursor(event.pos)))
         if self.show_editor_stuff and not self.entity_editor_grp.moving:
             if not self.sideboard.is_shown():
                 self.toolbox.handle_event(event, self.entity_editor_grp, self.rect)
             if not self.toolbox.is_shown():
                 self.sideboard.handle_event(event, self.entity_editor_grp, self.rect)
-        if not self.entity_editor_grp.moving and not self.sideboard.is_shown() and not self.toolbox.is_shown():
+        selecting = self.entity_editor_grp.selecting or (event.type == pygame.MOUSEBUTTONDOWN and pygame.key.get_mods() & pygame.KMOD_SHIFT)
+        if not self.entity_editor_grp.moving and not selecting and not self.sideboard.is_shown() and not self.toolbox.is_shown():
             self.camera.handle_event(event)
         else:
             self.camera.stop_move()
         if (event.type in [pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP] and event.button == 1) or event.type == pygame.MOUSEMOTION and event.buttons[0]:
-            self.entity_editor_grp.handle_mouse_event(event.type, self.camera.map_cursor(pygame.mouse.get_pos()))
+            self.entity_editor_grp.handle_mouse_event(event.type, self.camera.map_cursor(pygame.mouse.get_pos()), pygame.key.get_mods())
+        if self.show_route_crossings and (event.type == pygame.KEYDOWN or (event.type == pygame.MOUSEBUTTONUP and event.button == 1)):
+            self.update_route_crossings()
+
+    def update_route_crossings(self) -> None:
+        from .routes import find_route_crossings # pylint: disable=import-outside-toplevel
+        airplanes = [airplane.get_setup() for airplane in self.airplanes_group.sprites()]
+        towers = [tower.get_setup() for tower in self.towers_group.sprites()]
+        self.route_crossings = find_route_crossings(airplanes, towers, self.rect)
 
     def save_setup(self) -> None:
         self.parser.update(self.airplanes_group, self.towers_group)
         if self.parser.save_in_file():
             self.entity_editor_grp.modification_saved()
+            if self.autosave is not None:
+                self.autosave.saved()
+            if self.script_watcher is not None:
+                self.script_watcher.reset()
+                self.map_script_entities()
+
+    def map_script_entities(self) -> None:
+        # The n-th airplane (tower) line of the script is the n-th entity of the airplanes (towers) group
+        entities = {"A": iter(self.airplanes_group.sprites()), "T": iter(self.towers_group.sprites())}
+        self.script_entities = [next(entities[letter], None) if letter in entities else None for letter in self.script_watcher.letters]
+
+    def reload_script(self) -> None:
+        change = self.script_watcher.poll()
+        if change is None:
+            return
+        # Unchanged lines keep their entity, changed lines reuse the entity of the line they replace when they can
+        groups = {"A": self.airplanes_group, "T": self.towers_group}
+        old_entities = self.script_entities[change.start:change.start + change.removed]
+        new_entities = list[EntityEditor]()
+        for index, (letter, setup) in enumerate(change.lines):
+            entity = old_entities[index] if index < len(old_entities) else None
+            if entity is not None and entity.alive() and entity.group is groups[letter]:
+                if entity.get_setup() != setup:
+                    entity.load_setup(setup)
+                    self.entity_editor_grp.refresh(entity)
+            else:
+                if entity is not None:
+                    entity.kill()
+                entity = self.create_editor_entity(letter, setup)
+            new_entities.append(entity)
+        for entity in old_entities[len(change.lines):]:
+            if entity is not None:
+                entity.kill()
+        self.script_entities[change.start:change.start + change.removed] = new_entities
+        self.view_invalidated = True
+        # The undo history may refer to entities which are gone
+        self.entity_editor_grp.history.clear()
+        if self.show_route_crossings:
+            self.update_route_crossings()
+
+    def create_editor_entity(self, letter: str, setup: list[float]) -> EntityEditor:
+        airplane_image, tower_image = self.entity_images
+        if letter == "A":
+            entity = AirplaneEditor.from_script_setup(airplane_image, setup)
+            entity.group = self.airplanes_group
+        else:
+            entity = TowerEditor.from_script_setup(tower_image, setup, self.rect)
+            entity.group = self.towers_group
+        entity.add(self.entity_editor_grp)
+        return entity
+
+def print_results(results: dict[str, float]) -> None:
+    print("Simulation time:", time.strftime("%Hh%Mm%Ss", time.gmtime(results["chrono"])))
+    print("Airplanes landed on:", results["land_on"])
+    print("Airplanes destroyed:", results["destroyed"])
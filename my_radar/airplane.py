@@ -1,38 +1,67 @@
 # -*- coding: Utf-8 -*
 
-from typing import Union, Sequence
+from array import array
+from typing import Union, Collection, Sequence
 from functools import wraps
 import pygame
 from pygame.math import Vector2
 from .entity import Entity, EntityEditor, EntityGroup
-from .constants import AIRPLANE_SIZE
+from .constants import AIRPLANE_SIZE, SIMULATION_STEP
 from .clock import Clock
+from .fonts import get_shared_font
+from .metrics import REGISTRY, COUNT_BUCKETS
+
+COLLISION_CHECKS = REGISTRY.histogram("my_radar_collision_checks", "Hitbox collision tests per tick", COUNT_BUCKETS)
+BROADPHASE_CANDIDATES = REGISTRY.histogram("my_radar_broadphase_candidates", "Airplane pairs kept by the broadphase per tick", COUNT_BUCKETS)
+
+# Every airplane draws the same scaled image (the source image is kept so that its id is not reused)
+__scaled_images = dict[int, tuple[pygame.Surface, pygame.Surface]]()
+
+def get_scaled_airplane_image(image: pygame.Surface) -> pygame.Surface:
+    scaled = __scaled_images.get(id(image))
+    if scaled is None:
+        scaled = __scaled_images[id(image)] = (image, pygame.transform.smoothscale(image, AIRPLANE_SIZE).convert_alpha())
+    return scaled[1]
+
+# Rotated images are shared too, with the same precision as AirplaneStateRenderer
+__rotated_images = dict[tuple[int, float], pygame.Surface]()
+
+def get_rotated_airplane_image(scaled_image: pygame.Surface, angle: float) -> pygame.Surface:
+    key = (id(scaled_image), round(angle, 1))
+    image = __rotated_images.get(key)
+    if image is None:
+        image = __rotated_images[key] = pygame.transform.rotate(scaled_image, key[1]).convert_alpha()
+    return image
+
+def get_airplane_images() -> list[pygame.Surface]:
+    return [scaled for _, scaled in __scaled_images.values()] + list(__rotated_images.values())
 
 class Airplane(Entity):
 
+    __slots__ = (
+        "__default_airplane_image", "__image_airplane", "__edit", "__update_clock", "__refresh_time", "__center", "__departure",
+        "__arrival", "__speed", "__delay", "__land_on", "__destroyed", "__take_off", "__hitbox_offsets", "__hitbox_points",
+        "__hitbox_edges", "__hitbox_axes", "__hitbox_dirty", "__hitbox_color", "__direction", "__angle"
+    )
+
     def __init__(self, image: pygame.Surface, departure: Vector2, arrival: Vector2, speed: float, delay: float, take_off=False, edit=False):
         super().__init__()
 
         # Textures
-        self.__default_airplane_image = self.__image_airplane = pygame.transform.smoothscale(image, AIRPLANE_SIZE).convert_alpha()
+        self.__default_airplane_image = self.__image_airplane = get_scaled_airplane_image(image)
 
         self.__edit = bool(edit)
         self.__update_clock = Clock()
-        self.__refresh_time = 10 #milliseconds
+        self.__refresh_time = SIMULATION_STEP
         self.__center = self.__departure = Vector2(departure)
         self.__arrival = Vector2(arrival)
         self.__speed = max(speed, 0)
         self.__delay = delay
         self.__land_on = self.__destroyed = False
         self.__take_off = take_off or (delay <= 0)
-        self.__hitbox_points = list[Vector2]()
-        self.__hitbox_edges = list[Vector2]()
         self.__hitbox_color = pygame.Color(46, 173, 46)
         self.__update_direction()
 
-        # Towers group
-        self.__towers = pygame.sprite.Group()
-
     @classmethod
     def from_script_setup(cls, image: pygame.Surface, line: Sequence[float], **kwargs):
         departure_x, departure_y, arrival_x, arrival_y, speed, delay = line
@@ -49,15 +78,55 @@ class Airplane(Entity):
         self.__center = self.__departure
         self.__update_direction()
 
-    def update(self, chrono: float) -> None:
+    @staticmethod
+    def load_setup_columns(airplanes: Sequence["Airplane"], setups: array, columns: Collection[int]) -> None:
+        # Bulk load_setup(): the heading (rotated image and hitbox offsets) is only computed again when the route turns
+        route = any(column < 4 for column in columns)
+        speed = 4 in columns
+        delay = 5 in columns
+        stride = len(setups) // max(len(airplanes), 1)
+        for airplane, start in zip(airplanes, range(0, len(setups), stride)):
+            departure, arrival = airplane.__departure, airplane.__arrival
+            previous_route = arrival - departure
+            if route:
+                departure.x, departure.y, arrival.x, arrival.y = setups[start:start + 4]
+                airplane.__center = departure
+            if speed:
+                airplane.__speed = max(setups[start + 4], 0)
+            if delay:
+                airplane.__delay = setups[start + 5]
+            if not route and not speed:
+                continue
+            direction = get_route_direction(departure, arrival, airplane.__speed, airplane.__refresh_time)
+            if arrival - departure != previous_route or not direction or not airplane.__direction:
+                airplane.__update_direction()
+            else:
+                airplane.__direction = direction
+                airplane.__hitbox_dirty = True
+
+    def get_state(self) -> tuple[float, ...]:
+        # Unlike get_setup(), the direction is kept as is: it was computed from the departure point, which moves with the airplane
+        return (
+            self.__center.x, self.__center.y, self.__arrival.x, self.__arrival.y, self.__direction.x, self.__direction.y,
+            self.__speed, self.__delay, self.__take_off, self.__land_on, self.__destroyed
+        )
+
+    def load_state(self, state: Sequence[float]) -> None:
+        center_x, center_y, arrival_x, arrival_y, direction_x, direction_y, self.__speed, self.__delay, take_off, land_on, destroyed = state
+        self.__center = self.__departure = Vector2(center_x, center_y)
+        self.__arrival = Vector2(arrival_x, arrival_y)
+        self.__take_off, self.__land_on, self.__destroyed = bool(take_off), bool(land_on), bool(destroyed)
+        self.__direction = Vector2(direction_x, direction_y)
+        self.__update_angle()
+
+    def update(self, chrono: float, fixed_step=False) -> None:
         if not self.__take_off:
             self.__take_off = chrono >= self.__delay
-        if self.flying and not self.__update_clock.elapsed_time(self.__refresh_time):
+        if self.flying and not fixed_step and not self.__update_clock.elapsed_time(self.__refresh_time):
             return
-        distance = (self.__arrival - self.__center).length()
-        if distance > self.__speed:
+        if self.__center.distance_to(self.__arrival) > self.__speed:
             self.__center += self.__direction
-            self.__update_hitbox()
+            self.__hitbox_dirty = True
         else:
             self.kill()
             self.__land_on = True
@@ -68,34 +137,44 @@ class Airplane(Entity):
         if self.sprite_shown():
             surface.blit(self.__image_airplane, self.__image_airplane.get_rect(center=self.__center))
         if self.hitbox_shown():
-            pygame.draw.polygon(surface, self.__hitbox_color, self.__hitbox_points, width=1)
+            pygame.draw.polygon(surface, self.__hitbox_color, self.get_hitbox_points(), width=1)
 
     def destroy(self) -> None:
         self.__destroyed = True
         self.kill()
 
     def __update_hitbox(self) -> None:
-        rect = self.__default_airplane_image.get_rect(center=self.__center)
-        center = Vector2(rect.center)
-        all_points = list()
-        for point in [rect.topleft, rect.topright, rect.bottomright, rect.bottomleft]:
-            point = Vector2(point)
-            direction = point - center
-            all_points.append(center + direction.rotate(-self.__angle))
-        self.__hitbox_points = all_points
-        nb_points = len(all_points)
-        edges = list()
-        for i in range(nb_points):
-            edges.append(all_points[(i + 1) % nb_points] - all_points[i])
-        self.__hitbox_edges = edges
+        # Only called when the hitbox is needed (collision test or drawing): the corners are computed from the offsets of the heading,
+        # in the vectors allocated with them
+        center_x, center_y = self.__default_airplane_image.get_rect(center=self.__center).center
+        points = self.__hitbox_points
+        for point, offset in zip(points, self.__hitbox_offsets):
+            point.x = center_x + offset.x
+            point.y = center_y + offset.y
+        nb_points = len(points)
+        for i, edge in enumerate(self.__hitbox_edges):
+            edge.x = points[(i + 1) % nb_points].x - points[i].x
+            edge.y = points[(i + 1) % nb_points].y - points[i].y
+        self.__hitbox_dirty = False
 
     def get_hitbox_points(self) -> list[Vector2]:
+        # Updated in place when the airplane moves
+        if self.__hitbox_dirty:
+            self.__update_hitbox()
         return self.__hitbox_points
 
     def get_hitbox_edges(self) -> list[Vector2]:
+        if self.__hitbox_dirty:
+            self.__update_hitbox()
         return self.__hitbox_edges
 
+    def get_hitbox_axes(self) -> list[Vector2]:
+        # Normals of the edges: they only depend on the heading
+        return self.__hitbox_axes
+
     def set_alpha(self, value: int) -> None:
+        # The rotated image is shared with the airplanes going in the same direction
+        self.__image_airplane = self.__image_airplane.copy()
         self.__image_airplane.set_alpha(value)
         self.__hitbox_color.a = value
 
@@ -122,16 +201,35 @@ class Airplane(Entity):
             raise AttributeError("can't set attribute")
         self.__delay = float(value)
 
+    def skip_moves(self, nb_moves: int) -> None:
+        # Airplanes move before taking off: the ones built by the spawn scheduler catch up on the moves made so far
+        self.__center = self.__departure = self.__departure + self.__direction * nb_moves
+        self.__hitbox_dirty = True
+
     def __update_direction(self) -> None:
-        self.__direction = self.__arrival - self.__departure
-        if self.__direction.length_squared() > 0:
-            self.__direction.scale_to_length((self.__speed * self.__refresh_time) / 1000)
+        self.__direction = get_route_direction(self.__departure, self.__arrival, self.__speed, self.__refresh_time)
+        self.__update_angle()
+
+    def __update_angle(self) -> None:
         self.__angle = self.__direction.angle_to(Vector2(1, 0))
-        self.__image_airplane = pygame.transform.rotate(self.__default_airplane_image, self.__angle).convert_alpha()
-        self.__update_hitbox()
+        self.__image_airplane = get_rotated_airplane_image(self.__default_airplane_image, self.__angle)
+        # The heading does not change during the flight, nor do the corners of the hitbox relative to its center
+        rect = self.__default_airplane_image.get_rect()
+        center = Vector2(rect.center)
+        self.__hitbox_offsets = offsets = [
+            (Vector2(point) - center).rotate(-self.__angle) for point in [rect.topleft, rect.topright, rect.bottomright, rect.bottomleft]
+        ]
+        self.__hitbox_points = [Vector2() for _ in offsets]
+        self.__hitbox_edges = [Vector2() for _ in offsets]
+        self.__hitbox_axes = list[Vector2]()
+        for i, offset in enumerate(offsets):
+            edge = offsets[(i + 1) % len(offsets)] - offset
+            self.__hitbox_axes.append(Vector2(-edge.y, edge.x).normalize())
+        self.__hitbox_dirty = True
 
     image = property(lambda self: self.__image_airplane)
     rect = property(lambda self: self.image.get_rect(center=self.__center))
+    center = property(lambda self: self.__center)
     departure = property(lambda self: self.__departure, set_departure)
     arrival = property(lambda self: self.__arrival, set_arrival)
     speed = property(lambda self: self.__speed, set_speed)
@@ -141,8 +239,12 @@ class Airplane(Entity):
     land_on = property(lambda self: self.__land_on)
     destroyed = property(lambda self: self.__destroyed)
     flying = property(lambda self: self.__take_off and not self.__land_on and not self.__destroyed)
-    towers = property(lambda self: self.__towers)
-    in_a_tower_area = property(lambda self: bool(self.__towers))
+
+def get_route_direction(departure: Vector2, arrival: Vector2, speed: float, refresh_time: int=SIMULATION_STEP) -> Vector2:
+    direction = arrival - departure
+    if direction.length_squared() > 0:
+        direction.scale_to_length((speed * refresh_time) / 1000)
+    return direction
 
 def init_decorator(function):
 
@@ -155,11 +257,13 @@ def init_decorator(function):
 
 class AirplaneEditor(Airplane, EntityEditor):
 
+    __slots__ = ("__arrowhead_rect", "__font", "__update_point")
+
     @init_decorator
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.__arrowhead_rect = pygame.Rect(0, 0, 0, 0)
-        self.__font = pygame.font.SysFont("calibri", 15, bold=True)
+        self.__font = get_shared_font("calibri", 15, bold=True)
         self.__update_point = None
 
     def __repr__(self) -> str:
@@ -244,6 +348,10 @@ class AirplaneEditor(Airplane, EntityEditor):
             }
         }
 
+    @staticmethod
+    def get_setup_columns() -> dict[str, tuple[int, ...]]:
+        return {"x": (0, 2), "y": (1, 3), "speed": (4,), "delay": (5,)}
+
 class AirplaneGroup(EntityGroup):
 
     def __init__(self):
@@ -253,47 +361,81 @@ class AirplaneGroup(EntityGroup):
         # pylint: disable=useless-super-delegation
         return super().sprites()
 
-    def get_airplanes_not_in_tower_area(self) -> tuple[Airplane, ...]:
-        return tuple(filter(lambda airplane: not airplane.in_a_tower_area, self.sprites()))
-
-    def check_collisions(self) -> None:
-        airplanes_list = self.get_airplanes_not_in_tower_area()
-        nb_airplanes = len(airplanes_list)
-        for i in range(nb_airplanes):
-            airplane_1 = airplanes_list[i]
+    def check_collisions(self, airplanes_list: Union[Sequence[Airplane], None]=None) -> list[tuple[Airplane, Airplane]]:
+        # Simultaneous collisions are resolved in the order of the list (by default, every airplane of the group)
+        collisions = list[tuple[Airplane, Airplane]]()
+        if airplanes_list is None:
+            airplanes_list = self.sprites()
+        candidates = get_collision_candidates(airplanes_list)
+        nb_checks = 0
+        for i, airplane_1 in enumerate(airplanes_list):
             if not airplane_1.flying:
                 continue
-            for j in range(i + 1, nb_airplanes):
+            for j in candidates[i]:
                 airplane_2 = airplanes_list[j]
                 if not airplane_2.flying:
                     continue
+                nb_checks += 1
                 if airplane_collision(airplane_1, airplane_2):
                     airplane_1.destroy()
                     airplane_2.destroy()
+                    collisions.append((airplane_1, airplane_2))
                     break
+        COLLISION_CHECKS.observe(nb_checks)
+        BROADPHASE_CANDIDATES.observe(sum(len(indexes) for indexes in candidates))
+        return collisions
+
+# airplane_collision() only needs the axes of one hitbox to overlap, so the other hitbox may be anywhere
+# within (half size + half diagonal) on each axis of the first one (+ rect rounding margin)
+HITBOX_DIAGONAL = Vector2(AIRPLANE_SIZE).length()
+COLLISION_DISTANCE = Vector2(AIRPLANE_SIZE[0] + HITBOX_DIAGONAL, AIRPLANE_SIZE[1] + HITBOX_DIAGONAL).length() / 2 + 2
+
+def get_collision_candidates(airplanes_list: Sequence[Airplane]) -> list[list[int]]:
+    # Sweep and prune along the x axis: for each airplane, the sorted indexes of the next ones close enough to collide
+    candidates = [list[int]() for _ in airplanes_list]
+    positions = sorted((airplane.center.x, airplane.center.y, index) for index, airplane in enumerate(airplanes_list) if airplane.flying)
+    max_distance_squared = COLLISION_DISTANCE ** 2
+    start = 0
+    for position, (x_1, y_1, index_1) in enumerate(positions):
+        while positions[start][0] < x_1 - COLLISION_DISTANCE:
+            start += 1
+        # Only the airplanes sorted before this one, within the band
+        for other in range(start, position):
+            x_2, y_2, index_2 = positions[other]
+            if (x_1 - x_2) ** 2 + (y_1 - y_2) ** 2 > max_distance_squared:
+                continue
+            candidates[min(index_1, index_2)].append(max(index_1, index_2))
+    for indexes in candidates:
+        indexes.sort()
+    return candidates
 
 def airplane_collision(airplane_1: Airplane, airplane_2: Airplane) -> bool:
     points_1 = airplane_1.get_hitbox_points()
-    edges_1 = airplane_1.get_hitbox_edges()
+    axes_1 = airplane_1.get_hitbox_axes()
 
     points_2 = airplane_2.get_hitbox_points()
-    edges_2 = airplane_2.get_hitbox_edges()
+    axes_2 = airplane_2.get_hitbox_axes()
 
     collision = separating_axis_collision_method
 
-    return collision(edges_1, points_1, points_2) or collision(edges_2, points_2, points_1)
+    return collision(axes_1, points_1, points_2) or collision(axes_2, points_2, points_1)
 
-def separating_axis_collision_method(edges_first: list[Vector2], points_first: list[Vector2], points_second: list[Vector2]) -> bool:
+def project_shape(axis: Vector2, points: list[Vector2]) -> tuple[float, float]:
+    minimum = maximum = axis.dot(points[0])
+    for point in points:
+        dot_product = axis.dot(point)
+        if dot_product < minimum:
+            minimum = dot_product
+        elif dot_product > maximum:
+            maximum = dot_product
+    return minimum, maximum
 
-    def project_shape(axis: Vector2, points: list[Vector2]) -> tuple[float, float]:
-        dot_products = [axis.dot(point) for point in points]
-        return min(dot_products), max(dot_products)
+def separating_axis_collision_method(axes_first: list[Vector2], points_first: list[Vector2], points_second: list[Vector2]) -> bool:
 
     def interval_distance(minA, maxA, minB, maxB) -> float:
         return minB - maxA if minA < minB else minA - maxB
 
-    for edge in edges_first:
-        axis = Vector2(-edge.y, edge.x).normalize()
+    for axis in axes_first:
         minA, maxA = project_shape(axis, points_first)
         minB, maxB = project_shape(axis, points_second)
         if interval_distance(minA, maxA, minB, maxB) > 0:
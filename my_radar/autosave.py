@@ -0,0 +1,179 @@
+# -*- coding: Utf-8 -*
+
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Union
+from .entity import EntityEditor, EntityEditorGroup
+from .parser import ENTITY_SIZES
+
+AUTOSAVE_INTERVAL = 2           # seconds between two journal writes
+AUTOSAVE_COMPACT_RECORDS = 5000 # journal records written before the journal is compacted
+
+# The journal is a text file, one record per line:
+#   "<id> A <6 values>" or "<id> T <3 values>": the last setup of the entity <id>
+#   "<id> -": the entity <id> has been removed
+# Replaying the records from the start gives the script as it was at the last write (a torn last line is ignored).
+
+def get_journal_path(script_path: str) -> str:
+    return script_path + ".journal"
+
+def get_autosave_script_path(script_path: str) -> str:
+    return os.path.splitext(script_path)[0] + ".autosave.rdr"
+
+def format_record(identifier: int, letter: Union[str, None], setup: Union[list[float], None]) -> str:
+    if letter is None:
+        return "{} -\n".format(identifier)
+    return "{} {} {}\n".format(identifier, letter, " ".join(map(repr, setup)))
+
+def replay_journal(path: str) -> dict[int, tuple[str, list[float]]]:
+    entities = dict[int, tuple[str, list[float]]]()
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if not line.endswith("\n"):
+                break
+            identifier, letter, *values = line.split()
+            if letter == "-":
+                entities.pop(int(identifier), None)
+            elif letter in ENTITY_SIZES and len(values) == ENTITY_SIZES[letter]:
+                entities[int(identifier)] = (letter, [float(value) for value in values])
+    return entities
+
+def recover_setups(script_path: str) -> Union[tuple[list[list[float]], list[list[float]]], None]:
+    # Airplanes and towers setups of the last session, None if everything had been saved
+    try:
+        entities = replay_journal(get_journal_path(script_path))
+    except (OSError, ValueError):
+        return None
+    airplanes = [setup for identifier, (letter, setup) in sorted(entities.items()) if letter == "A"]
+    towers = [setup for identifier, (letter, setup) in sorted(entities.items()) if letter == "T"]
+    return airplanes, towers
+
+class JournalWriter(threading.Thread):
+
+    # All the file operations are done here: the editor only queues the records of the entities modified since the last write
+    def __init__(self, script_path: str, entities: dict[int, tuple[str, list[float]]], compact_records: int=AUTOSAVE_COMPACT_RECORDS):
+        super().__init__(name="autosave", daemon=True)
+        self.__journal_path = get_journal_path(script_path)
+        self.__script_path = get_autosave_script_path(script_path)
+        self.__entities = entities
+        self.__compact_records = compact_records
+        self.__nb_records = 0
+        self.__journal = None
+        self.__queue = queue.Queue()
+
+    def run(self) -> None:
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            try:
+                if item == "saved":
+                    self.__discard()
+                else:
+                    self.__write(item)
+            except OSError as e:
+                print("my_radar: autosave: {}".format(e), file=sys.stderr)
+        if self.__journal is not None:
+            self.__journal.close()
+
+    def __write(self, records: list[tuple[int, Union[str, None], Union[list[float], None]]]) -> None:
+        for identifier, letter, setup in records:
+            if letter is None:
+                self.__entities.pop(identifier, None)
+            else:
+                self.__entities[identifier] = (letter, setup)
+        if self.__journal is None or self.__nb_records + len(records) > self.__compact_records:
+            # The journal starts again from the whole script, also written as a plain script beside the journal
+            self.__compact()
+            return
+        self.__journal.write("".join(format_record(*record) for record in records))
+        self.__journal.flush()
+        os.fsync(self.__journal.fileno())
+        self.__nb_records += len(records)
+
+    def __compact(self) -> None:
+        if self.__journal is not None:
+            self.__journal.close()
+        records = [(identifier, letter, setup) for identifier, (letter, setup) in sorted(self.__entities.items())]
+        temporary_path = self.__journal_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write("".join(format_record(*record) for record in records))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.__journal_path)
+        temporary_path = self.__script_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            for letter in ENTITY_SIZES:
+                for _, entity_letter, setup in records:
+                    if entity_letter == letter:
+                        print(letter, *[round(value, 1) for value in setup], file=file)
+        os.replace(temporary_path, self.__script_path)
+        self.__journal = open(self.__journal_path, "a", encoding="utf-8")
+        self.__nb_records = len(records)
+
+    def __discard(self) -> None:
+        # Everything is in the script file now
+        if self.__journal is not None:
+            self.__journal.close()
+            self.__journal = None
+        for path in (self.__journal_path, self.__script_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def write(self, records: list[tuple[int, Union[str, None], Union[list[float], None]]]) -> None:
+        self.__queue.put(records)
+
+    def saved(self) -> None:
+        self.__queue.put("saved")
+
+    def stop(self) -> None:
+        self.__queue.put(None)
+        if self.is_alive():
+            self.join()
+
+class EditorAutosave:
+
+    def __init__(self, script_path: str, entity_editor_grp: EntityEditorGroup, interval: float=AUTOSAVE_INTERVAL):
+        self.__group = entity_editor_grp
+        self.__interval = interval
+        self.__next_write = time.monotonic() + interval
+        self.__identifiers = dict[EntityEditor, int]()
+        entities = dict[int, tuple[str, list[float]]]()
+        for entity in entity_editor_grp.sprites():
+            identifier = self.__identifiers[entity] = len(self.__identifiers)
+            entities[identifier] = (entity.group.letter, entity.get_setup())
+        entity_editor_grp.pop_dirty_entities()
+        self.__writer = JournalWriter(script_path, entities)
+        self.__writer.start()
+
+    def update(self) -> None:
+        # Called every frame from the main thread: only the setups of the entities modified since the last write are copied
+        now = time.monotonic()
+        if now < self.__next_write:
+            return
+        self.__next_write = now + self.__interval
+        self.flush()
+
+    def flush(self) -> None:
+        records = list[tuple[int, Union[str, None], Union[list[float], None]]]()
+        for entity in self.__group.pop_dirty_entities():
+            identifier = self.__identifiers.setdefault(entity, len(self.__identifiers))
+            if entity.alive() and entity.group is not None:
+                records.append((identifier, entity.group.letter, entity.get_setup()))
+            else:
+                records.append((identifier, None, None))
+        if records:
+            self.__writer.write(records)
+
+    def saved(self) -> None:
+        self.__group.pop_dirty_entities()
+        self.__writer.saved()
+
+    def stop(self) -> None:
+        self.flush()
+        self.__writer.stop()
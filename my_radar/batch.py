@@ -0,0 +1,94 @@
+# -*- coding: Utf-8 -*
+
+import os
+import json
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple, Iterable, Iterator, Sequence, Union
+import pygame
+from .constants import SCREEN_SIZE
+from .headless import init_headless, load_entity_images
+from .simulation import Simulation
+
+DEFAULT_MAX_CHRONO = 24 * 3600
+
+class ScriptSetups(NamedTuple):
+    filepath: str
+    airplanes: list[list[float]]
+    towers: list[list[float]]
+
+class RunParameters(NamedTuple):
+    speed_scale: float = 1
+    delay_jitter: float = 0
+    tower_radius_scale: float = 1
+    seed: Union[int, None] = None
+    speed_jitter: float = 0
+
+class BatchJob(NamedTuple):
+    script: int
+    parameters: RunParameters
+
+def perturb_setups(script: ScriptSetups, parameters: RunParameters) -> tuple[list[list[float]], list[list[float]]]:
+    rng = random.Random(parameters.seed)
+    airplanes = list[list[float]]()
+    for departure_x, departure_y, arrival_x, arrival_y, speed, delay in script.airplanes:
+        speed *= parameters.speed_scale
+        if parameters.speed_jitter > 0:
+            speed *= 1 + rng.uniform(-parameters.speed_jitter, parameters.speed_jitter)
+        if parameters.delay_jitter > 0:
+            delay = max(delay + rng.uniform(-parameters.delay_jitter, parameters.delay_jitter), 0)
+        airplanes.append([departure_x, departure_y, arrival_x, arrival_y, speed, delay])
+    towers = [[center_x, center_y, radius * parameters.tower_radius_scale] for center_x, center_y, radius in script.towers]
+    return airplanes, towers
+
+def create_perturbed_simulation(script: ScriptSetups, parameters: RunParameters) -> Simulation:
+    init_headless()
+    airplane_image, tower_image = load_entity_images()
+    airplanes, towers = perturb_setups(script, parameters)
+    return Simulation.from_setups(airplane_image, tower_image, airplanes, towers, pygame.Rect((0, 0), SCREEN_SIZE))
+
+def run_headless(script: ScriptSetups, parameters: RunParameters, max_chrono: float=DEFAULT_MAX_CHRONO) -> dict[str, float]:
+    start = time.perf_counter()
+    simulation = create_perturbed_simulation(script, parameters)
+    simulation.run(max_chrono)
+    results = simulation.get_results()
+    results["finished"] = simulation.finished
+    results["wall_time"] = time.perf_counter() - start
+    return results
+
+__worker_scripts = list[ScriptSetups]()
+
+def __init_worker(scripts: list[ScriptSetups]) -> None:
+    __worker_scripts[:] = scripts
+    init_headless()
+
+def __run_job(job: BatchJob, max_chrono: float) -> dict[str, float]:
+    return run_headless(__worker_scripts[job.script], job.parameters, max_chrono)
+
+def create_jobs(nb_scripts: int, speed_scales: Sequence[float]=(1,), delay_jitters: Sequence[float]=(0,),
+                tower_radius_scales: Sequence[float]=(1,), nb_seeds: int=1) -> list[BatchJob]:
+    return [
+        BatchJob(script, RunParameters(speed_scale, delay_jitter, tower_radius_scale, seed if nb_seeds > 1 or delay_jitter > 0 else None))
+        for script in range(nb_scripts)
+        for speed_scale in speed_scales
+        for delay_jitter in delay_jitters
+        for tower_radius_scale in tower_radius_scales
+        for seed in range(nb_seeds)
+    ]
+
+def run_batch(scripts: list[ScriptSetups], jobs: Iterable[BatchJob], max_chrono: float=DEFAULT_MAX_CHRONO,
+              max_workers: Union[int, None]=None) -> Iterator[dict[str, float]]:
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=__init_worker, initargs=(scripts,)) as executor:
+        futures = {executor.submit(__run_job, job, max_chrono): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            yield {"script": scripts[job.script].filepath, **job.parameters._asdict(), **future.result()}
+
+def write_batch_results(results: Iterable[dict[str, float]], output_path: str) -> int:
+    nb_results = 0
+    with open(output_path, "a") as file:
+        for result in results:
+            print(json.dumps(result), file=file, flush=True)
+            nb_results += 1
+    return nb_results
@@ -0,0 +1,158 @@
+# -*- coding: Utf-8 -*
+
+import os
+import struct
+import threading
+from array import array
+from typing import NamedTuple, Union
+import pygame
+from .airplane import Airplane, AirplaneGroup
+from .tower import Tower, TowerGroup
+from .simulation import Simulation
+from .scheduler import SpawnScheduler, ROUTE_SIZE, ROW_PENDING, ROW_SPAWNED, ROW_RELEASED
+from .snapshot import AIRPLANE_TAKE_OFF, AIRPLANE_LAND_ON, AIRPLANE_DESTROYED
+
+MAGIC = b"MYRADCKP"
+VERSION = 2
+HEADER = struct.Struct("<HQdIIIII")      # version, tick, chrono, landed on, destroyed, nb airplanes, nb towers, nb collisions
+AIRPLANE_RECORD = struct.Struct("<8dBH") # center, arrival, direction, speed, delay, flags, nb towers
+COLLISION_RECORD = struct.Struct("<dII") # chrono, airplane, airplane
+
+TAKE_OFF = 1 << 0
+LAND_ON = 1 << 1
+DESTROYED = 1 << 2
+PENDING = 1 << 3 # Not built yet: the record holds the route from the script
+
+class Checkpoint(NamedTuple):
+    tick: int
+    chrono: float
+    land_on: int
+    destroyed: int
+    airplanes: list[tuple[float, ...]]
+    pending: list[bool]
+    memberships: list[list[int]]
+    towers: list[list[float]]
+    collisions: list[tuple[float, int, int]]
+
+def dump_checkpoint(simulation: Simulation) -> bytes:
+    towers_list = simulation.towers_list
+    results = simulation.get_results()
+    data = bytearray(MAGIC)
+    data += HEADER.pack(
+        VERSION, simulation.tick, simulation.chrono, results["land_on"], results["destroyed"],
+        simulation.nb_airplanes, len(towers_list), len(simulation.collisions)
+    )
+    data += array("d", (value for tower in towers_list for value in tower.get_setup())).tobytes()
+    scheduler = simulation.scheduler
+    for identifier in range(simulation.nb_airplanes):
+        airplane = simulation.get_airplane(identifier)
+        if airplane is not None:
+            *values, take_off, land_on, destroyed = airplane.get_state()
+            towers = simulation.membership.get_towers(identifier)
+        else:
+            *values, take_off, land_on, destroyed = scheduler.get_state(identifier)
+            towers = list[int]()
+        flags = (TAKE_OFF if take_off else 0) | (LAND_ON if land_on else 0) | (DESTROYED if destroyed else 0)
+        if scheduler.get_status(identifier) == ROW_PENDING:
+            flags |= PENDING
+        data += AIRPLANE_RECORD.pack(*values, flags, len(towers))
+        data += array("H", towers).tobytes()
+    for collision in simulation.collisions:
+        data += COLLISION_RECORD.pack(*collision)
+    return bytes(data)
+
+def parse_checkpoint(data: bytes) -> Checkpoint:
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a simulation checkpoint")
+    offset = len(MAGIC)
+    version, tick, chrono, land_on, destroyed, nb_airplanes, nb_towers, nb_collisions = HEADER.unpack_from(data, offset)
+    if version != VERSION:
+        raise ValueError("Unsupported checkpoint version {}".format(version))
+    offset += HEADER.size
+    towers_values = array("d", data[offset:offset + 8 * 3 * nb_towers])
+    towers = [list(towers_values[i:i + 3]) for i in range(0, len(towers_values), 3)]
+    offset += 8 * 3 * nb_towers
+    airplanes = list[tuple[float, ...]]()
+    pending = list[bool]()
+    memberships = list[list[int]]()
+    for _ in range(nb_airplanes):
+        *values, flags, nb_airplane_towers = AIRPLANE_RECORD.unpack_from(data, offset)
+        offset += AIRPLANE_RECORD.size
+        airplanes.append((*values, bool(flags & TAKE_OFF), bool(flags & LAND_ON), bool(flags & DESTROYED)))
+        pending.append(bool(flags & PENDING))
+        memberships.append(array("H", data[offset:offset + 2 * nb_airplane_towers]).tolist())
+        offset += 2 * nb_airplane_towers
+    collisions = [COLLISION_RECORD.unpack_from(data, offset + i * COLLISION_RECORD.size) for i in range(nb_collisions)]
+    return Checkpoint(tick, chrono, land_on, destroyed, airplanes, pending, memberships, towers, collisions)
+
+def save_checkpoint(data: bytes, path: str) -> None:
+    # Write beside the target then rename, so a crash while saving never leaves a truncated checkpoint
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+    os.replace(temporary_path, path)
+
+def load_checkpoint(path: str) -> Checkpoint:
+    with open(path, "rb") as file:
+        return parse_checkpoint(file.read())
+
+def restore_simulation(checkpoint: Checkpoint, airplane_image: pygame.Surface, tower_image: pygame.Surface, screen_rect: pygame.Rect) -> Simulation:
+    towers_group = TowerGroup()
+    for tower_setup in checkpoint.towers:
+        tower = Tower.from_script_setup(tower_image, tower_setup, screen_rect)
+        tower.group = towers_group
+    # Only the airplanes flying (or about to) get an entity back, the others stay as rows of the scheduler
+    statuses = list[int]()
+    flags = list[int]()
+    for state, pending in zip(checkpoint.airplanes, checkpoint.pending):
+        take_off, land_on, destroyed = state[8:]
+        statuses.append(ROW_PENDING if pending else ROW_RELEASED if land_on or destroyed else ROW_SPAWNED)
+        flags.append((AIRPLANE_TAKE_OFF if take_off else 0) | (AIRPLANE_LAND_ON if land_on else 0) | (AIRPLANE_DESTROYED if destroyed else 0))
+    scheduler = SpawnScheduler(airplane_image, [state[:ROUTE_SIZE] for state in checkpoint.airplanes], statuses=statuses, flags=flags)
+    simulation = Simulation(AirplaneGroup(), towers_group, scheduler)
+    for identifier, (state, membership) in enumerate(zip(checkpoint.airplanes, checkpoint.memberships)):
+        if statuses[identifier] != ROW_SPAWNED:
+            continue
+        center_x, center_y, arrival_x, arrival_y, _, _, speed, delay, *_ = state
+        airplane = Airplane.from_script_setup(airplane_image, (center_x, center_y, arrival_x, arrival_y, speed, delay))
+        airplane.load_state(state)
+        simulation.add_airplane(airplane, identifier)
+        for index in membership:
+            simulation.membership.add(identifier, index)
+    simulation.load_state(checkpoint.tick, checkpoint.chrono, checkpoint.land_on, checkpoint.destroyed, checkpoint.collisions)
+    return simulation
+
+class CheckpointWriter:
+
+    def __init__(self, path: str, interval: float):
+        self.__path = path
+        self.__interval = interval
+        self.__next_chrono = None
+        self.__thread = None
+
+    def __call__(self, simulation: Simulation) -> None:
+        if self.__next_chrono is None:
+            self.__next_chrono = simulation.chrono + self.__interval
+        if simulation.chrono < self.__next_chrono:
+            return
+        self.__next_chrono += self.__interval
+        self.save(simulation)
+
+    def save(self, simulation: Simulation) -> None:
+        # The state is serialized in the simulation thread (it must be consistent), the disk write is done in the background
+        data = dump_checkpoint(simulation)
+        self.wait()
+        self.__thread = threading.Thread(target=save_checkpoint, args=(data, self.__path), name="checkpoint", daemon=True)
+        self.__thread.start()
+
+    def wait(self) -> None:
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    path = property(lambda self: self.__path)
+
+def get_checkpoint_writer(path: Union[str, None], interval_minutes: float) -> Union[CheckpointWriter, None]:
+    if path is None or interval_minutes <= 0:
+        return None
+    return CheckpointWriter(path, interval_minutes * 60)
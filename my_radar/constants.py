@@ -54,4 +54,6 @@ IMG = {
 
 FONT_DARK_CALIBRI = set_constant_file(FONT_FOLDER, "Darks_Calibri_Remix.ttf")
 
+SCREEN_SIZE = (1920, 1080)
 AIRPLANE_SIZE = (20, 20)
+SIMULATION_STEP = 10 #milliseconds
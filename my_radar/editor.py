@@ -6,6 +6,7 @@ from typing import Type
 from .entity import EntityEditor, EntityEditorGroup
 from .airplane import AirplaneEditor
 from .tower import TowerEditor
+from .fonts import get_system_font
 
 def create_rect_from_edge(left, top, right, bottom) -> pygame.Rect:
     return pygame.Rect(left, top, (right - left), (bottom - top))
@@ -215,13 +216,15 @@ class EditorSideBoard:
             "Key actions:": {
                 "Escape": "Close editor",
                 "F12": "Show/hide editor stuff",
+                "F2": "Show/hide route crossings (red: outside tower areas)",
                 "Delete": "Remove selected entity",
                 "Ctrl+S": "Save in file",
                 "Ctrl+Z": "Undo modification",
                 "Ctrl+Y": "Redo modification"
             },
             "Mouse actions": {
-                "Click on entity": "Select entity",
+                "Click on entity": "Select entity (again: next overlapping entity)",
+                "Shift+Click + Move": "Select the entities in a box",
                 "Click + Move": "- on selected entity: Action on entity\n- on map: Move the camera",
                 "Mouse wheel": "Zoom in/out camera"
             }
@@ -230,9 +233,9 @@ class EditorSideBoard:
             actions |= {action.title: action}
 
         font = ("calibri", 20)
-        action_font = pygame.font.SysFont(*font)
-        description_font = pygame.font.SysFont(font[0], font[1] - 4)
-        title_font = pygame.font.SysFont(*font, bold=True)
+        action_font = get_system_font(*font)
+        description_font = get_system_font(font[0], font[1] - 4)
+        title_font = get_system_font(*font, bold=True)
         title_font.set_underline(True)
         line_blank = pygame.Surface(action_font.size("|"), flags=pygame.SRCALPHA).convert_alpha()
         space_between = 5 #px
@@ -1,16 +1,31 @@
 # -*- coding: Utf-8 -*
 
+import sys
+import time
+from array import array
+from collections import deque
 import pygame
-from typing import Union, Callable
+from typing import Union, Callable, Collection, Iterator, Sequence
 
-class Entity(pygame.sprite.Sprite):
+HISTORY_MAX_ENTRIES = 500   # Oldest actions are forgotten beyond this
+HISTORY_COALESCE_DELAY = 1  # seconds between two key presses modifying the same entity to keep a single action
+PICKING_CELL_SIZE = 32      # pixels
+SELECTION_MOVE_STEP = 5     # pixels
+SELECTION_SCALE_STEP = 1.1
+SELECTION_DELAY_STEP = 0.1  # seconds
+
+class Entity:
+
+    __slots__ = ("__groups", "__indexes", "__default_group")
 
     __show_sprite = True
     __show_hitbox = True
 
     def __init__(self):
-        super().__init__()
-        self.__default_group = pygame.sprite.Group(self)
+        # Memberships are the groups holding the entity and its slot index in each of them (an entity is rarely in more than two groups)
+        self.__groups = list[IndexedGroup]()
+        self.__indexes = list[int]()
+        self.__default_group = None
 
     @staticmethod
     def show_sprite(status: bool) -> None:
@@ -28,6 +43,9 @@ class Entity(pygame.sprite.Sprite):
     def hitbox_shown() -> bool:
         return Entity.__show_hitbox
 
+    def update(self, *args, **kwargs) -> None:
+        pass
+
     def draw(self, surface: pygame.Surface) -> None:
         pass
 
@@ -40,21 +58,193 @@ class Entity(pygame.sprite.Sprite):
     def load_setup(self, line: list[float]) -> None:
         pass
 
-    def __set_group(self, group: pygame.sprite.Group) -> None:
-        self.__default_group.remove(self)
+    @staticmethod
+    def load_setup_columns(entities: Sequence["Entity"], setups: array, columns: Collection[int]) -> None:
+        # Bulk load_setup() for entities of a same type: setups holds their setups one after the other, only the given columns changed
+        if not entities:
+            return
+        stride = len(setups) // len(entities)
+        for entity, start in zip(entities, range(0, len(setups), stride)):
+            entity.load_setup(list(setups[start:start + stride]))
+
+    def add(self, *groups: "IndexedGroup") -> None:
+        for group in groups:
+            group.add(self)
+
+    def remove(self, *groups: "IndexedGroup") -> None:
+        for group in groups:
+            group.remove(self)
+
+    def kill(self) -> None:
+        for group in self.__groups.copy():
+            group.remove(self)
+
+    def alive(self) -> bool:
+        return bool(self.__groups)
+
+    def groups(self) -> list["IndexedGroup"]:
+        return self.__groups.copy()
+
+    def get_index(self, group: "IndexedGroup") -> int:
+        for member_group, index in zip(self.__groups, self.__indexes):
+            if member_group is group:
+                return index
+        return -1
+
+    def add_internal(self, group: "IndexedGroup", index: int) -> None:
+        self.__groups.append(group)
+        self.__indexes.append(index)
+
+    def move_internal(self, group: "IndexedGroup", index: int) -> None:
+        self.__indexes[self.__groups.index(group)] = index
+
+    def remove_internal(self, group: "IndexedGroup") -> None:
+        position = self.__groups.index(group)
+        del self.__groups[position]
+        del self.__indexes[position]
+
+    def __set_group(self, group: "IndexedGroup") -> None:
+        if self.__default_group is not None:
+            self.__default_group.remove(self)
         self.__default_group = group
         self.__default_group.add(self)
 
-    def revive(self, *groups) -> None:
-        self.add(self.__default_group, *groups)
+    def revive(self, *groups: "IndexedGroup") -> None:
+        if self.__default_group is not None:
+            self.add(self.__default_group)
+        self.add(*groups)
 
     group = property(lambda self: self.__default_group, __set_group)
 
-class EntityEditorSelector(pygame.sprite.GroupSingle):
-    pass
+class IndexedGroup:
+
+    # Same interface as pygame.sprite.Group, but entities are kept in slots: adding and removing an entity are list operations.
+    # Removed entities leave a hole, filled when the group is compacted (the order of the entities is kept).
+
+    def __init__(self, *entities: Entity):
+        self.__entities = list[Union[Entity, None]]()
+        self.__nb_entities = 0
+        self.add(*entities)
+
+    def sprites(self) -> list[Entity]:
+        return [entity for entity in self.__entities if entity is not None]
+
+    def add(self, *entities: Entity) -> None:
+        for entity in entities:
+            if entity.get_index(self) < 0:
+                entity.add_internal(self, len(self.__entities))
+                self.__entities.append(entity)
+                self.__nb_entities += 1
+
+    def remove(self, *entities: Entity) -> None:
+        for entity in entities:
+            index = entity.get_index(self)
+            if index < 0:
+                continue
+            entity.remove_internal(self)
+            self.__entities[index] = None
+            self.__nb_entities -= 1
+        if len(self.__entities) > 2 * self.__nb_entities + 16:
+            self.__compact()
+
+    def __compact(self) -> None:
+        self.__entities = self.sprites()
+        for index, entity in enumerate(self.__entities):
+            entity.move_internal(self, index)
+
+    def has(self, *entities: Entity) -> bool:
+        return all(entity.get_index(self) >= 0 for entity in entities)
+
+    def empty(self) -> None:
+        for entity in self.sprites():
+            entity.remove_internal(self)
+        self.__entities.clear()
+        self.__nb_entities = 0
+
+    def update(self, *args, **kwargs) -> None:
+        for entity in self.sprites():
+            entity.update(*args, **kwargs)
+
+    def __iter__(self) -> Iterator[Entity]:
+        return iter(self.sprites())
+
+    def __contains__(self, entity: Entity) -> bool:
+        return self.has(entity)
+
+    def __len__(self) -> int:
+        return self.__nb_entities
+
+    def __bool__(self) -> bool:
+        return self.__nb_entities > 0
+
+class EntityEditorSelector(IndexedGroup):
+
+    def add(self, *entities: Entity) -> None:
+        # Like pygame.sprite.GroupSingle: only the last entity added is kept
+        if entities:
+            self.empty()
+            super().add(entities[-1])
+
+    sprite = property(lambda self: next(iter(self.sprites()), None))
+
+class EntityGrid:
+
+    # Spatial hash of the entity rects: a point only needs to be tested against the entities of its cell
+    def __init__(self, cell_size: int=PICKING_CELL_SIZE):
+        self.__cell_size = cell_size
+        self.__cells = dict[tuple[int, int], list[Entity]]()
+        self.__entity_cells = dict[Entity, list[tuple[int, int]]]()
+
+    def insert(self, entity: Entity) -> None:
+        if entity in self.__entity_cells:
+            self.remove(entity)
+        rect = entity.rect
+        size = self.__cell_size
+        cells = [
+            (cell_x, cell_y)
+            for cell_x in range(rect.left // size, (rect.right - 1) // size + 1)
+            for cell_y in range(rect.top // size, (rect.bottom - 1) // size + 1)
+        ]
+        for cell in cells:
+            self.__cells.setdefault(cell, list()).append(entity)
+        self.__entity_cells[entity] = cells
+
+    def remove(self, entity: Entity) -> None:
+        for cell in self.__entity_cells.pop(entity, tuple()):
+            entities = self.__cells[cell]
+            entities.remove(entity)
+            if not entities:
+                del self.__cells[cell]
+
+    def move(self, entity: Entity) -> None:
+        if entity in self.__entity_cells:
+            self.insert(entity)
+
+    def clear(self) -> None:
+        self.__cells.clear()
+        self.__entity_cells.clear()
+
+    def query(self, point: tuple[int, int]) -> list[Entity]:
+        x, y = point
+        entities = self.__cells.get((int(x) // self.__cell_size, int(y) // self.__cell_size), tuple())
+        return [entity for entity in entities if entity.rect.collidepoint(x, y)]
+
+    def query_rect(self, rect: pygame.Rect) -> list[Entity]:
+        size = self.__cell_size
+        entities = dict[Entity, None]()
+        for cell_x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cell_y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                for entity in self.__cells.get((cell_x, cell_y), tuple()):
+                    entities[entity] = None
+        return [entity for entity in entities if entity.rect.colliderect(rect)]
+
+    def __len__(self) -> int:
+        return len(self.__entity_cells)
 
 class EntityEditor(Entity):
 
+    __slots__ = ()
+
     def on_click(self, mouse_pos: tuple[int, int]) -> bool:
         # pylint: disable=unused-argument
         return False
@@ -70,11 +260,16 @@ class EntityEditor(Entity):
     def get_action_dict() -> dict[str, dict[str, str]]:
         return {str(): dict()}
 
+    @staticmethod
+    def get_setup_columns() -> dict[str, tuple[int, ...]]:
+        # Indexes of the values in get_setup() changed by the bulk operations ("x", "y", "speed", "delay", "radius")
+        return dict()
+
     @property
     def selected(self) -> bool:
         return any(isinstance(group, EntityEditorSelector) for group in self.groups())
 
-class EntityGroup(pygame.sprite.Group):
+class EntityGroup(IndexedGroup):
 
     def __init__(self, letter: str):
         super().__init__()
@@ -92,13 +287,18 @@ class EntityGroup(pygame.sprite.Group):
 
     letter = property(lambda self: self.__letter)
 
-class EntityEditorGroup(pygame.sprite.Group):
+class EntityEditorGroup(IndexedGroup):
 
-    def __init__(self, *sprites):
+    def __init__(self, *sprites, history_size: int=HISTORY_MAX_ENTRIES):
+        self.__grid = EntityGrid()
+        # Entities added, removed or changed since the last call to pop_dirty_entities() (autosave)
+        self.__dirty = dict[EntityEditor, None]()
         super().__init__(*sprites)
         self.__selected = None
         self.__selector = EntityEditorSelector()
-        self.__history = EntityEditorHistory(self)
+        self.__selection = IndexedGroup()
+        self.__box_start = self.__box_end = None
+        self.__history = EntityEditorHistory(self, history_size)
         self.__active = False
         self.__moving = False
         self.__modified = False
@@ -107,8 +307,61 @@ class EntityEditorGroup(pygame.sprite.Group):
         # pylint: disable=useless-super-delegation
         return super().sprites()
 
-    def handle_mouse_event(self, event_type: int, mouse_pos: tuple[int, int]) -> None:
-        if event_type == pygame.MOUSEBUTTONDOWN and self.selected is not None:
+    def add(self, *entities: Entity) -> None:
+        super().add(*entities)
+        for entity in entities:
+            self.__grid.insert(entity)
+            self.__dirty[entity] = None
+
+    def remove(self, *entities: Entity) -> None:
+        super().remove(*entities)
+        for entity in entities:
+            self.__grid.remove(entity)
+            self.__dirty[entity] = None
+
+    def empty(self) -> None:
+        self.__dirty.update(dict.fromkeys(self.sprites()))
+        super().empty()
+        self.__grid.clear()
+
+    def refresh(self, *entities: EntityEditor, moved=True) -> None:
+        # To call once the rect (or the setup) of entities has changed
+        for entity in entities:
+            if moved:
+                self.__grid.move(entity)
+            self.__dirty[entity] = None
+
+    def pop_dirty_entities(self) -> list[EntityEditor]:
+        entities = list(self.__dirty)
+        self.__dirty.clear()
+        return entities
+
+    def get_entities_at(self, point: tuple[int, int]) -> list[EntityEditor]:
+        return sorted(self.__grid.query(point), key=lambda entity: entity.get_index(self))
+
+    def pick(self, point: tuple[int, int]) -> Union[EntityEditor, None]:
+        # Clicking again on overlapping entities cycles through them, clicking again on a lone selected entity unselects it
+        entities = self.get_entities_at(point)
+        if self.selected in entities:
+            index = entities.index(self.selected)
+            entities = entities[index + 1:] + entities[:index]
+        return entities[0] if entities else None
+
+    def get_entities_in(self, rect: pygame.Rect) -> list[EntityEditor]:
+        return sorted(self.__grid.query_rect(rect), key=lambda entity: entity.get_index(self))
+
+    def handle_mouse_event(self, event_type: int, mouse_pos: tuple[int, int], modifiers: int=0) -> None:
+        if self.__box_start is not None:
+            # Rubber band selection, started with Shift + click
+            if event_type == pygame.MOUSEMOTION:
+                self.__box_end = mouse_pos
+            elif event_type == pygame.MOUSEBUTTONUP:
+                self.select_many(self.get_entities_in(self.box))
+                self.__box_start = self.__box_end = None
+            return
+        if event_type == pygame.MOUSEBUTTONDOWN and modifiers & pygame.KMOD_SHIFT:
+            self.__box_start = self.__box_end = mouse_pos
+        elif event_type == pygame.MOUSEBUTTONDOWN and self.selected is not None:
             if self.selected.on_click(mouse_pos):
                 self.__active = True
         elif event_type == pygame.MOUSEBUTTONUP:
@@ -118,6 +371,7 @@ class EntityEditorGroup(pygame.sprite.Group):
                 self.__history.action_modify(self.selected)
             self.__modified = self.__moving = True
             self.selected.on_move(mouse_pos)
+            self.refresh(self.selected)
 
     def handle_key_event(self, key: int, modifiers: int) -> None:
         if modifiers & (pygame.KMOD_LCTRL | pygame.KMOD_RCTRL):
@@ -128,10 +382,55 @@ class EntityEditorGroup(pygame.sprite.Group):
         elif self.selected is not None:
             setup = self.selected.get_setup()
             if self.selected.on_key_press(key):
+                self.refresh(self.selected)
+                self.__modified = True
+                self.history.action_modify(self.selected, setup=setup, coalesce=True)
+        elif self.__selection:
+            transforms = get_selection_transforms(key, modifiers)
+            if transforms:
+                entities = self.__selection.sprites()
+                self.history.action_bulk(entities, coalesce=True)
+                self.transform(entities, transforms)
                 self.__modified = True
-                self.history.action_modify(self.selected, setup=setup)
+
+    def transform(self, entities: Sequence[EntityEditor], transforms: list[tuple[str, Callable[[float], float]]]) -> None:
+        # The setups of the entities of a same type are gathered in one array, each operation maps whole columns of it,
+        # then only the changed columns are written back to the entities
+        entities_by_type = dict[type, list[EntityEditor]]()
+        for entity in entities:
+            entities_by_type.setdefault(type(entity), list()).append(entity)
+        moved = any(name in ("x", "y") for name, _ in transforms)
+        for entity_type, entities_list in entities_by_type.items():
+            columns = entity_type.get_setup_columns()
+            setups = array("d")
+            for entity in entities_list:
+                setups.extend(entity.get_setup())
+            stride = len(setups) // len(entities_list)
+            changed = set[int]()
+            for name, function in transforms:
+                for column in columns.get(name, tuple()):
+                    setups[column::stride] = array("d", map(function, setups[column::stride]))
+                    changed.add(column)
+            if changed:
+                entity_type.load_setup_columns(entities_list, setups, changed)
+                self.refresh(*entities_list, moved=moved)
+
+    def load_setups(self, entities: Sequence[EntityEditor], setups: array) -> None:
+        # setups holds the whole setups of the entities one after the other
+        setups_by_type = dict[type, tuple[list[EntityEditor], array]]()
+        start = 0
+        for entity in entities:
+            end = start + len(entity.get_setup())
+            entities_list, type_setups = setups_by_type.setdefault(type(entity), (list[EntityEditor](), array("d")))
+            entities_list.append(entity)
+            type_setups.extend(setups[start:end])
+            start = end
+        for entity_type, (entities_list, type_setups) in setups_by_type.items():
+            entity_type.load_setup_columns(entities_list, type_setups, range(len(type_setups) // len(entities_list)))
+        self.refresh(*entities)
 
     def select(self, entity: Union[Entity, None], active=False) -> None:
+        self.__selection.empty()
         self.__selector.empty()
         if isinstance(entity, EntityEditor):
             self.__selector.add(entity)
@@ -144,14 +443,46 @@ class EntityEditorGroup(pygame.sprite.Group):
             self.selected.kill()
             self.__modified = True
 
+    def select_many(self, entities: Sequence[EntityEditor]) -> None:
+        self.select(None)
+        self.__selection.add(*entities)
+
+    def draw_selection(self, surface: pygame.Surface) -> None:
+        for entity in self.__selection:
+            pygame.draw.rect(surface, "blue", entity.rect, width=1)
+        if self.__box_start is not None:
+            pygame.draw.rect(surface, "blue", self.box, width=1)
+
     @property
     def selected(self) -> Union[EntityEditor, None]:
         return self.__selector.sprite
 
+    @property
+    def box(self) -> Union[pygame.Rect, None]:
+        if self.__box_start is None:
+            return None
+        (x_1, y_1), (x_2, y_2) = self.__box_start, self.__box_end
+        return pygame.Rect(min(x_1, x_2), min(y_1, y_2), abs(x_2 - x_1) + 1, abs(y_2 - y_1) + 1)
+
+    @staticmethod
+    def get_action_dict() -> dict[str, dict[str, str]]:
+        return {
+            "selection": {
+                "Shift+Arrows": "Move entities",
+                "Left/Right arrow": "Scale airplanes' speed and towers' area radius",
+                "Up/Down arrow": "Shift airplanes' delay"
+            }
+        }
+
     def modification_saved(self) -> None:
         self.__modified = False
 
+    def modification_recovered(self) -> None:
+        self.__modified = True
+
     history = property(lambda self: self.__history)
+    selection = property(lambda self: self.__selection.sprites())
+    selecting = property(lambda self: self.__box_start is not None)
     moving = property(lambda self: self.__moving)
     modified = property(lambda self: self.__modified)
 
@@ -160,25 +491,31 @@ class EntityEditorHistory:
     ACTION_ADD = "add"
     ACTION_MOD = "modify"
     ACTION_DEL = "delete"
+    ACTION_BULK = "bulk"
 
-    def __init__(self, group: EntityEditorGroup):
+    def __init__(self, group: EntityEditorGroup, max_entries: int=HISTORY_MAX_ENTRIES):
         self.__group = group
-        self.__actions_undo = list[tuple[str, EntityEditor, tuple]]()
-        self.__actions_redo = list[tuple[str, EntityEditor, tuple]]()
+        # Bounded: a deleted entity is released once its actions are forgotten
+        self.__actions_undo = deque[tuple[str, EntityEditor, tuple]](maxlen=max_entries)
+        self.__actions_redo = deque[tuple[str, EntityEditor, tuple]](maxlen=max_entries)
+        self.__last_modify = None
         self.__undo_dict = {
             self.ACTION_ADD: self.__exec_action_del,
             self.ACTION_MOD: self.__exec_action_mod,
-            self.ACTION_DEL: self.__exec_action_add
+            self.ACTION_DEL: self.__exec_action_add,
+            self.ACTION_BULK: self.__exec_action_bulk
         }
         self.__redo_dict = {
             self.ACTION_ADD: self.__exec_action_add,
             self.ACTION_MOD: self.__exec_action_mod,
-            self.ACTION_DEL: self.__exec_action_del
+            self.ACTION_DEL: self.__exec_action_del,
+            self.ACTION_BULK: self.__exec_action_bulk
         }
         self.__register_dict = {
             self.ACTION_ADD: self.__register_action_add,
             self.ACTION_MOD: self.__register_action_mod,
-            self.ACTION_DEL: self.__register_action_del
+            self.ACTION_DEL: self.__register_action_del,
+            self.ACTION_BULK: self.__register_action_bulk
         }
 
     def __register_action_undo(self, action_type: str, entity: EntityEditor, *additionnal_infos) -> None:
@@ -190,12 +527,29 @@ class EntityEditorHistory:
     def __register_action(self, action_type: str, entity: EntityEditor, *additionnal_infos) -> None:
         self.__register_action_undo(action_type, entity, *additionnal_infos)
         self.__actions_redo.clear()
+        self.__last_modify = None
 
     def action_add(self, entity: EntityEditor) -> None:
         self.__register_action_add(self.__register_action, entity)
 
-    def action_modify(self, entity: EntityEditor, setup=None) -> None:
-        self.__register_action_mod(self.__register_action, entity, setup=setup)
+    def action_modify(self, entity: EntityEditor, setup=None, coalesce=False) -> None:
+        # Key repeats on the same entity only keep the setup from before the first one
+        now = time.monotonic()
+        last_modify = self.__last_modify
+        if not coalesce or last_modify is None or last_modify[0] != entity or now - last_modify[1] > HISTORY_COALESCE_DELAY:
+            self.__register_action_mod(self.__register_action, entity, setup=setup)
+        if coalesce:
+            self.__last_modify = (entity, now)
+
+    def action_bulk(self, entities: Sequence[EntityEditor], coalesce=False) -> None:
+        # One action for the whole selection, registered before the changes
+        entities = tuple(entities)
+        now = time.monotonic()
+        last_modify = self.__last_modify
+        if not coalesce or last_modify is None or last_modify[0] != entities or now - last_modify[1] > HISTORY_COALESCE_DELAY:
+            self.__register_action_bulk(self.__register_action, entities)
+        if coalesce:
+            self.__last_modify = (entities, now)
 
     def action_delete(self, entity: EntityEditor) -> None:
         self.__register_action_del(self.__register_action, entity)
@@ -204,21 +558,31 @@ class EntityEditorHistory:
         callback(self.ACTION_ADD, entity)
 
     def __register_action_mod(self, callback: Callable[[str, EntityEditor, tuple], None], entity: EntityEditor, setup=None) -> None:
-        callback(self.ACTION_MOD, entity, setup or entity.get_setup())
+        callback(self.ACTION_MOD, entity, array("d", setup or entity.get_setup()))
 
     def __register_action_del(self, callback: Callable[[str, EntityEditor, tuple], None], entity: EntityEditor) -> None:
         callback(self.ACTION_DEL, entity)
 
+    def __register_action_bulk(self, callback: Callable[[str, EntityEditor, tuple], None], entities: tuple[EntityEditor, ...]) -> None:
+        setups = array("d")
+        for entity in entities:
+            setups.extend(entity.get_setup())
+        callback(self.ACTION_BULK, entities, setups)
+
     def __exec_action_add(self, entity: EntityEditor) -> None:
         entity.revive(self.__group)
         self.__group.select(entity)
 
-    def __exec_action_mod(self, entity: EntityEditor, line_setup: list[float]) -> None:
-        entity.load_setup(line_setup)
+    def __exec_action_mod(self, entity: EntityEditor, line_setup: array) -> None:
+        entity.load_setup(list(line_setup))
+        self.__group.refresh(entity)
 
     def __exec_action_del(self, entity: EntityEditor) -> None:
         entity.kill()
 
+    def __exec_action_bulk(self, entities: tuple[EntityEditor, ...], setups: array) -> None:
+        self.__group.load_setups(entities, setups)
+
     def __action_to_do(self, history_action_type: str) -> None:
         history_actions = {
             "undo": [
@@ -233,14 +597,46 @@ class EntityEditorHistory:
             ]
         }
         action_list, action_dict, register_callback = history_actions[history_action_type]
+        self.__last_modify = None
         if action_list:
             prev_action, entity, additionnal_infos = action_list.pop()
             self.__register_dict[prev_action](register_callback, entity)
             action_dict[prev_action](entity, *additionnal_infos)
 
 
+    def clear(self) -> None:
+        self.__actions_undo.clear()
+        self.__actions_redo.clear()
+        self.__last_modify = None
+
+    def get_memory_size(self) -> int:
+        # Bytes held by the recorded actions, the entities themselves excluded
+        size = sys.getsizeof(self.__actions_undo) + sys.getsizeof(self.__actions_redo)
+        for _, _, additionnal_infos in (*self.__actions_undo, *self.__actions_redo):
+            size += sys.getsizeof(additionnal_infos) + sum(sys.getsizeof(info) for info in additionnal_infos)
+        return size
+
     def undo(self) -> None:
         self.__action_to_do("undo")
 
     def redo(self) -> None:
         self.__action_to_do("redo")
+
+def get_selection_transforms(key: int, modifiers: int) -> list[tuple[str, Callable[[float], float]]]:
+    # Same keys as for a single selected entity, Shift + arrows move the entities
+    if modifiers & pygame.KMOD_SHIFT:
+        moves = {
+            pygame.K_LEFT: ("x", -SELECTION_MOVE_STEP), pygame.K_RIGHT: ("x", SELECTION_MOVE_STEP),
+            pygame.K_UP: ("y", -SELECTION_MOVE_STEP), pygame.K_DOWN: ("y", SELECTION_MOVE_STEP)
+        }
+        if key not in moves:
+            return list()
+        column, offset = moves[key]
+        return [(column, lambda value: value + offset)]
+    if key in [pygame.K_LEFT, pygame.K_RIGHT]:
+        factor = SELECTION_SCALE_STEP if key == pygame.K_RIGHT else 1 / SELECTION_SCALE_STEP
+        return [("speed", lambda value: value * factor), ("radius", lambda value: value * factor)]
+    if key in [pygame.K_UP, pygame.K_DOWN]:
+        shift = SELECTION_DELAY_STEP if key == pygame.K_UP else -SELECTION_DELAY_STEP
+        return [("delay", lambda value: value + shift)]
+    return list()
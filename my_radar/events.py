@@ -0,0 +1,137 @@
+# -*- coding: Utf-8 -*
+
+import json
+import os.path
+import struct
+import sys
+import threading
+from typing import Any, Iterator
+from .simulation import Simulation
+
+MAGIC = b"MYRADEVT"
+VERSION = 1
+FILE_HEADER = struct.Struct("<HH")          # version, record size
+EVENT_RECORD = struct.Struct("<QdBiiidd")   # tick, chrono, event, airplane, other airplane, tower, x, y
+
+EVENT_COLLISION = 1
+EVENT_TOWER_ENTER = 2
+EVENT_TOWER_EXIT = 3
+EVENT_NAMES = {EVENT_COLLISION: "collision", EVENT_TOWER_ENTER: "tower_enter", EVENT_TOWER_EXIT: "tower_exit"}
+
+EVENT_LOG_CAPACITY = 65536 # events kept between two writes, the oldest ones are overwritten beyond
+EVENT_LOG_INTERVAL = 1     # seconds between two writes
+
+class EventRingBuffer:
+
+    # Events are packed in a buffer allocated once: appending one is a struct.pack_into()
+    def __init__(self, capacity: int=EVENT_LOG_CAPACITY):
+        self.__capacity = capacity
+        self.__buffer = bytearray(capacity * EVENT_RECORD.size)
+        self.__start = 0
+        self.__length = 0
+        self.__dropped = 0
+        self.__lock = threading.Lock()
+
+    def append(self, tick: int, chrono: float, event: int, airplane: int, other_airplane=-1, tower=-1, x=0.0, y=0.0) -> None:
+        with self.__lock:
+            index = (self.__start + self.__length) % self.__capacity
+            EVENT_RECORD.pack_into(self.__buffer, index * EVENT_RECORD.size, tick, chrono, event, airplane, other_airplane, tower, x, y)
+            if self.__length < self.__capacity:
+                self.__length += 1
+            else:
+                self.__start = (self.__start + 1) % self.__capacity
+                self.__dropped += 1
+
+    def drain(self) -> tuple[bytes, int]:
+        # Records of the events appended since the last drain (oldest first) and the number of events overwritten meanwhile
+        size = EVENT_RECORD.size
+        with self.__lock:
+            buffer = memoryview(self.__buffer)
+            end = self.__start + self.__length
+            if end <= self.__capacity:
+                data = bytes(buffer[self.__start * size:end * size])
+            else:
+                data = bytes(buffer[self.__start * size:]) + bytes(buffer[:(end - self.__capacity) * size])
+            dropped = self.__dropped
+            self.__start = self.__length = self.__dropped = 0
+        return data, dropped
+
+    def __len__(self) -> int:
+        return self.__length
+
+    capacity = property(lambda self: self.__capacity)
+
+def iter_events(data: bytes) -> Iterator[dict[str, Any]]:
+    for tick, chrono, event, airplane, other_airplane, tower, x, y in EVENT_RECORD.iter_unpack(data):
+        yield {
+            "tick": tick, "chrono": chrono, "type": EVENT_NAMES.get(event, event),
+            "airplanes": [airplane, other_airplane] if other_airplane >= 0 else [airplane],
+            "tower": tower if tower >= 0 else None, "x": x, "y": y
+        }
+
+def read_event_log(path: str) -> Iterator[dict[str, Any]]:
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{}: not an event log".format(path))
+        version, record_size = FILE_HEADER.unpack(file.read(FILE_HEADER.size))
+        if version != VERSION or record_size != EVENT_RECORD.size:
+            raise ValueError("{}: unsupported event log version {}".format(path, version))
+        data = file.read()
+    # A record cut by a crash is ignored
+    yield from iter_events(data[:len(data) - len(data) % EVENT_RECORD.size])
+
+class EventLog:
+
+    # Simulation listener: the events of each tick are appended to the ring buffer, a background thread drains it into the file
+    # (JSON lines if its extension is ".jsonl", binary records otherwise)
+    def __init__(self, path: str, first_collision: int=0, capacity: int=EVENT_LOG_CAPACITY, interval: float=EVENT_LOG_INTERVAL):
+        self.__buffer = EventRingBuffer(capacity)
+        self.__nb_collisions = first_collision
+        self.__jsonl = os.path.splitext(path)[1] == ".jsonl"
+        self.__file = open(path, "w" if self.__jsonl else "wb")
+        if not self.__jsonl:
+            self.__file.write(MAGIC)
+            self.__file.write(FILE_HEADER.pack(VERSION, EVENT_RECORD.size))
+        self.__interval = interval
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="event log", daemon=True)
+        self.__thread.start()
+
+    def __call__(self, simulation: Simulation) -> None:
+        tick = simulation.tick
+        chrono = simulation.chrono
+        collisions = simulation.collisions
+        while self.__nb_collisions < len(collisions):
+            collision_chrono, airplane_1, airplane_2 = collisions[self.__nb_collisions]
+            self.__nb_collisions += 1
+            x, y = (simulation.get_position(airplane_1) + simulation.get_position(airplane_2)) / 2
+            self.__buffer.append(tick, collision_chrono, EVENT_COLLISION, airplane_1, airplane_2, -1, x, y)
+        for tower, entered, exited in simulation.membership.get_transitions():
+            for event, airplanes in ((EVENT_TOWER_ENTER, entered), (EVENT_TOWER_EXIT, exited)):
+                for identifier in airplanes:
+                    x, y = simulation.get_position(identifier)
+                    self.__buffer.append(tick, chrono, event, identifier, -1, tower, x, y)
+
+    def __run(self) -> None:
+        while not self.__stopped.wait(self.__interval):
+            self.__write()
+        self.__write()
+
+    def __write(self) -> None:
+        data, dropped = self.__buffer.drain()
+        if dropped:
+            print("my_radar: event log: {} events lost, the buffer was full".format(dropped), file=sys.stderr)
+        if not data:
+            return
+        if self.__jsonl:
+            self.__file.write("".join(json.dumps(event) + "\n" for event in iter_events(data)))
+        else:
+            self.__file.write(data)
+        self.__file.flush()
+
+    def close(self) -> None:
+        self.__stopped.set()
+        self.__thread.join()
+        self.__file.close()
+
+    buffer = property(lambda self: self.__buffer)
@@ -0,0 +1,70 @@
+# -*- coding: Utf-8 -*
+
+import os
+import json
+from typing import Union
+import pygame
+
+CACHE_FOLDER = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "my_radar")
+FONT_CACHE_FILE = os.path.join(CACHE_FOLDER, "fonts.json")
+
+# (font name, bold, italic) -> (font file, emulate bold, emulate italic), as resolved by pygame.font.SysFont()
+__resolved_fonts = dict[str, tuple[Union[str, None], bool, bool]]()
+__cache_loaded = list[bool]()
+
+def __load_cache() -> None:
+    __cache_loaded.append(True)
+    try:
+        with open(FONT_CACHE_FILE, "r", encoding="utf-8") as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return
+    for key, (path, set_bold, set_italic) in cache.items():
+        # A font uninstalled since then is resolved again
+        if path is None or os.path.isfile(path):
+            __resolved_fonts[key] = (path, set_bold, set_italic)
+
+def __save_cache() -> None:
+    try:
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+        temporary_path = FONT_CACHE_FILE + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(__resolved_fonts, file)
+        os.replace(temporary_path, FONT_CACHE_FILE)
+    except OSError:
+        pass
+
+def create_font(path: Union[str, None], size: int, set_bold: bool, set_italic: bool) -> pygame.font.Font:
+    font = pygame.font.Font(path, size)
+    if set_bold:
+        font.set_bold(True)
+    if set_italic:
+        font.set_italic(True)
+    return font
+
+def get_system_font(name: str, size: int, bold=False, italic=False) -> pygame.font.Font:
+    # Same as pygame.font.SysFont(), without scanning the system fonts (which can take seconds) once the font is known
+    if not __cache_loaded:
+        __load_cache()
+    key = "{}|{}|{}".format(name, int(bold), int(italic))
+    resolved = __resolved_fonts.get(key)
+    if resolved is not None:
+        return create_font(resolved[0], size, resolved[1], resolved[2])
+
+    def constructor(path: Union[str, None], size: int, set_bold: bool, set_italic: bool) -> pygame.font.Font:
+        __resolved_fonts[key] = (path, set_bold, set_italic)
+        return create_font(path, size, set_bold, set_italic)
+
+    font = pygame.font.SysFont(name, size, bold=bold, italic=italic, constructor=constructor)
+    __save_cache()
+    return font
+
+# Fonts used by every editor entity: one font object each, they must not be modified
+__shared_fonts = dict[tuple[str, int, bool, bool], pygame.font.Font]()
+
+def get_shared_font(name: str, size: int, bold=False, italic=False) -> pygame.font.Font:
+    key = (name, size, bool(bold), bool(italic))
+    font = __shared_fonts.get(key)
+    if font is None:
+        font = __shared_fonts[key] = get_system_font(name, size, bold=bold, italic=italic)
+    return font
@@ -0,0 +1,33 @@
+# -*- coding: Utf-8 -*
+
+import os
+import sys
+import io
+from functools import lru_cache
+
+sys.stdout = io.StringIO()
+import pygame
+sys.stdout = sys.__stdout__
+
+from .constants import IMG, SCREEN_SIZE
+from .parser import ScriptParser
+from .simulation import Simulation
+
+def init_headless() -> None:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if pygame.display.get_surface() is None:
+        # Surface.convert_alpha() needs a display mode, even an invisible one
+        pygame.display.set_mode((1, 1))
+
+@lru_cache(maxsize=None)
+def load_entity_images() -> tuple[pygame.Surface, pygame.Surface]:
+    airplane_image = pygame.image.load(IMG["airplane"]).convert_alpha()
+    tower_image = pygame.image.load(IMG["tower"]).convert_alpha()
+    return airplane_image, tower_image
+
+def create_headless_simulation(parser: ScriptParser) -> Simulation:
+    init_headless()
+    airplane_image, tower_image = load_entity_images()
+    return Simulation.from_setups(airplane_image, tower_image, parser.airplanes, parser.towers, pygame.Rect((0, 0), SCREEN_SIZE))
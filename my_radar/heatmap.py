@@ -0,0 +1,98 @@
+# -*- coding: Utf-8 -*
+
+import math
+import struct
+from array import array
+from typing import Iterable, Sequence, Union
+import pygame
+from .simulation import Simulation
+from .constants import SCREEN_SIZE
+
+HEATMAP_CELL_SIZE = 16         # pixels of the map per cell
+HEATMAP_EVERY = 5              # ticks between two samples of the airplanes positions
+HEATMAP_DECAY = 1              # factor applied to the previous samples at each new one (1: no decay)
+HEATMAP_RENDER_INTERVAL = 0.5  # seconds between two renderings of the overlay
+HEATMAP_ALPHA = 170
+HEATMAP_MAX_WEIGHT = 1e100     # the grid is rescaled once the weight of the new samples goes beyond
+
+def get_heatmap_colormap() -> list[bytes]:
+    # RGBA pixels from transparent blue (no traffic) to cyan, yellow and red
+    colormap = list[bytes]()
+    for level in range(256):
+        t = level / 255
+        red, green, blue = (min(max(1.5 - abs(4 * t - offset), 0), 1) for offset in (3, 2, 1))
+        colormap.append(bytes((round(red * 255), round(green * 255), round(blue * 255), round(HEATMAP_ALPHA * min(4 * t, 1)))))
+    return colormap
+
+def write_npy(path: str, values: array, shape: tuple[int, ...]) -> None:
+    # NumPy .npy format (version 1.0), written without NumPy: numpy.load() reads it back
+    header = "{{'descr': '<{}{}', 'fortran_order': False, 'shape': {}, }}".format(
+        "f" if values.typecode in "fd" else "i", values.itemsize, shape
+    )
+    padding = 64 - (len(header) + 11) % 64
+    header = header + " " * padding + "\n"
+    with open(path, "wb") as file:
+        file.write(b"\x93NUMPY\x01\x00")
+        file.write(struct.pack("<H", len(header)))
+        file.write(header.encode("latin1"))
+        file.write(values.tobytes())
+
+class TrafficHeatmap:
+
+    # Simulation listener: the positions of the flying airplanes are added to a grid over the map every few ticks
+    def __init__(self, size: Sequence[int]=SCREEN_SIZE, cell_size: int=HEATMAP_CELL_SIZE, every: int=HEATMAP_EVERY,
+                 decay: float=HEATMAP_DECAY):
+        self.__cell_size = cell_size
+        self.__width = math.ceil(size[0] / cell_size)
+        self.__height = math.ceil(size[1] / cell_size)
+        self.__grid = array("d", bytes(8 * self.__width * self.__height))
+        self.__every = every
+        self.__decay = decay
+        # Rather than applying the decay to the whole grid, the next samples weigh more
+        self.__weight = 1.0
+        self.__nb_ticks = 0
+        self.__nb_samples = 0
+        self.__colormap = get_heatmap_colormap()
+
+    def __call__(self, simulation: Simulation) -> None:
+        self.__nb_ticks += 1
+        if self.__nb_ticks % self.__every == 0:
+            self.add_positions(airplane.center for airplane in simulation.airplanes_group.sprites() if airplane.flying)
+
+    def add_positions(self, positions: Iterable[Sequence[float]]) -> None:
+        if self.__decay < 1 and self.__nb_samples > 0:
+            self.__weight /= self.__decay
+            if self.__weight > HEATMAP_MAX_WEIGHT:
+                self.__grid = array("d", (value / self.__weight for value in self.__grid))
+                self.__weight = 1.0
+        grid = self.__grid
+        weight = self.__weight
+        cell_size = self.__cell_size
+        width, height = self.__width, self.__height
+        for x, y in positions:
+            column = int(x // cell_size)
+            row = int(y // cell_size)
+            if 0 <= column < width and 0 <= row < height:
+                grid[row * width + column] += weight
+        self.__nb_samples += 1
+
+    def get_values(self) -> array:
+        # Row major, in airplanes per sample (with the decay applied)
+        scale = 1 / (self.__weight * max(self.__nb_samples, 1)) if self.__decay >= 1 else (1 - self.__decay) / self.__weight
+        return array("f", (value * scale for value in self.__grid))
+
+    def save(self, path: str) -> None:
+        write_npy(path, self.get_values(), (self.__height, self.__width))
+
+    def render(self, size: Sequence[int]) -> Union[pygame.Surface, None]:
+        maximum = max(self.__grid, default=0)
+        if maximum <= 0:
+            return None
+        colormap = self.__colormap
+        # Square root scale: low traffic stays visible next to the busiest cells
+        pixels = b"".join(colormap[int(255 * math.sqrt(value / maximum))] for value in self.__grid)
+        surface = pygame.image.frombytes(pixels, (self.__width, self.__height), "RGBA").convert_alpha()
+        return pygame.transform.smoothscale(surface, size)
+
+    shape = property(lambda self: (self.__height, self.__width))
+    nb_samples = property(lambda self: self.__nb_samples)
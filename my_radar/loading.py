@@ -0,0 +1,101 @@
+# -*- coding: Utf-8 -*
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Sequence, Union
+import pygame
+from .constants import BLACK, WHITE, GRAY_DARK
+from .airplane import Airplane, AirplaneEditor
+from .tower import Tower, TowerEditor
+from .entity import EntityEditorGroup
+from .parser import ScriptParser
+from .simulation import Simulation
+from .fonts import get_system_font
+
+LOADING_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="loading")
+
+def load_image(path: str, size: Union[tuple[int, int], None]=None) -> pygame.Surface:
+    # Decoding (and scaling) does not need the display: it runs on a worker thread, only convert_alpha() is left to the main thread
+    image = pygame.image.load(path)
+    if size is not None and image.get_bitsize() in (24, 32):
+        image = pygame.transform.smoothscale(image, size)
+    return image
+
+def load_image_in_background(path: str, size: Union[tuple[int, int], None]=None) -> Future:
+    return LOADING_EXECUTOR.submit(load_image, path, size)
+
+def load_script_in_background(path: str, **kwargs) -> Future:
+    return LOADING_EXECUTOR.submit(ScriptParser, path, **kwargs)
+
+def draw_progress_bar(surface: pygame.Surface, rect: pygame.Rect, progress: float) -> None:
+    pygame.draw.rect(surface, GRAY_DARK, rect)
+    filled = rect.copy()
+    filled.width = round(rect.width * min(max(progress, 0), 1))
+    pygame.draw.rect(surface, WHITE, filled)
+    pygame.draw.rect(surface, WHITE, rect, width=2)
+
+class LoadingScreen:
+
+    def __init__(self, screen: pygame.Surface):
+        self.__screen = screen
+        self.__text = get_system_font("calibri", 50).render("Loading...", True, "white")
+
+    def draw(self, progress: float) -> None:
+        screen_rect = self.__screen.get_rect()
+        self.__screen.fill(BLACK)
+        text_rect = self.__screen.blit(self.__text, self.__text.get_rect(center=screen_rect.center))
+        bar_rect = pygame.Rect(0, 0, screen_rect.width // 3, 20)
+        bar_rect.midtop = (text_rect.centerx, text_rect.bottom + 20)
+        draw_progress_bar(self.__screen, bar_rect, progress)
+        pygame.display.flip()
+        # Keeps the window responsive (the system must not think it hung)
+        pygame.event.pump()
+
+    def wait(self, future: Future, progress: float) -> object:
+        while not future.done():
+            self.draw(progress)
+            time.sleep(0.01)
+        return future.result()
+
+class EntityLoader:
+
+    def __init__(self, simulation: Simulation, airplane_image: pygame.Surface, tower_image: pygame.Surface,
+                 airplanes: Sequence[Sequence[float]], towers: Sequence[Sequence[float]], screen_rect: pygame.Rect,
+                 entity_editor_grp: Union[EntityEditorGroup, None]=None):
+        self.__simulation = simulation
+        self.__airplane_image = airplane_image
+        self.__tower_image = tower_image
+        self.__airplanes = airplanes
+        self.__towers = towers
+        self.__screen_rect = screen_rect
+        self.__entity_editor_grp = entity_editor_grp
+        self.__nb_loaded = 0
+
+    def load(self, time_budget: Union[float, None]=None) -> int:
+        # Builds entities until the time budget (in seconds) is spent, returns the number of built entities
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        nb_airplanes = len(self.__airplanes)
+        editor = self.__entity_editor_grp is not None
+        start = self.__nb_loaded
+        while not self.done:
+            index = self.__nb_loaded
+            if index < nb_airplanes:
+                AirplaneType = Airplane if not editor else AirplaneEditor
+                entity = AirplaneType.from_script_setup(self.__airplane_image, self.__airplanes[index])
+                self.__simulation.add_airplane(entity)
+            else:
+                TowerType = Tower if not editor else TowerEditor
+                entity = TowerType.from_script_setup(self.__tower_image, self.__towers[index - nb_airplanes], self.__screen_rect)
+                self.__simulation.add_tower(entity)
+            if editor:
+                entity.add(self.__entity_editor_grp)
+            self.__nb_loaded += 1
+            # Checking the clock every few entities is enough
+            if deadline is not None and self.__nb_loaded % 16 == 0 and time.perf_counter() >= deadline:
+                break
+        return self.__nb_loaded - start
+
+    nb_entities = property(lambda self: len(self.__airplanes) + len(self.__towers))
+    nb_loaded = property(lambda self: self.__nb_loaded)
+    done = property(lambda self: self.__nb_loaded >= self.nb_entities)
+    progress = property(lambda self: self.__nb_loaded / self.nb_entities if self.nb_entities > 0 else 1)
@@ -0,0 +1,150 @@
+# -*- coding: Utf-8 -*
+
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+from math import sqrt
+from typing import Iterable, Iterator, Mapping, Sequence
+from .airplane import Airplane
+from .tower import Tower
+
+def iter_bits(bitset: int) -> Iterator[int]:
+    # Indexes of the set bits, in increasing order (the binary string is scanned in C)
+    bits = bin(bitset)[:1:-1]
+    index = bits.find("1")
+    while index >= 0:
+        yield index
+        index = bits.find("1", index + 1)
+
+def make_bitset(indexes: Iterable[int], size: int) -> int:
+    # Bitset of the given indexes (all below size), parsed at once from its binary string
+    bits = bytearray(b"0" * size)
+    for index in indexes:
+        bits[size - 1 - index] = 49
+    return int(bits, 2) if size else 0
+
+def get_squared_limit(radius: float) -> int:
+    # Greatest integer squared distance whose square root is within the radius, as distance_to() computes it
+    limit = int(radius * radius)
+    while sqrt(limit + 1) <= radius:
+        limit += 1
+    while limit >= 0 and sqrt(limit) > radius:
+        limit -= 1
+    return limit
+
+class TowerMembership:
+
+    # Airplanes are rows and towers are columns (their index in the simulation): each tower keeps the bitset of
+    # the airplanes in its area, the union of the columns is the "protected" mask.
+    # A row is a dense slot given to an airplane when it flies and reused once it is discarded, so that the bitsets
+    # stay as wide as the number of airplanes in the sky whatever their simulation identifier
+    def __init__(self):
+        self.__columns = list[int]()
+        self.__previous_columns = list[int]()
+        self.__protected = 0
+        self.__flying = 0
+        self.__entered = 0
+        self.__exited = 0
+        self.__slots = dict[int, int]()
+        self.__identifiers = list[int]()
+        self.__free_slots = list[int]()
+
+    def update(self, towers_list: Sequence[Tower], airplanes: Mapping[int, Airplane]) -> None:
+        while len(self.__columns) < len(towers_list):
+            self.__columns.append(0)
+        # The positions are sorted along x so that each area only tests the airplanes of its horizontal band
+        positions = sorted((*airplane.rect.center, self.__get_slot(identifier))
+                           for identifier, airplane in airplanes.items() if airplane.flying)
+        positions_x = [x for x, _, _ in positions]
+        size = len(self.__identifiers)
+        columns = [0] * len(self.__columns)
+        for index, tower in enumerate(towers_list):
+            slots = list[int]()
+            for area in tower.areas:
+                center_x, center_y = area.center
+                radius = area.radius
+                limit = get_squared_limit(radius)
+                band = positions[bisect_left(positions_x, center_x - radius):bisect_right(positions_x, center_x + radius)]
+                slots += [slot for x, y, slot in band if (x - center_x) ** 2 + (y - center_y) ** 2 <= limit]
+            if slots:
+                columns[index] = make_bitset(slots, size)
+        flying = make_bitset((slot for _, _, slot in positions), size)
+        protected = 0
+        for column in columns:
+            protected |= column
+        # Airplanes which are not flying anymore leave the areas without an exit transition
+        self.__entered = protected & ~self.__protected
+        self.__exited = self.__protected & ~protected & flying
+        self.__previous_columns = self.__columns
+        self.__columns = columns
+        self.__protected = protected
+        self.__flying = flying
+
+    def add(self, identifier: int, tower_index: int) -> None:
+        while len(self.__columns) <= tower_index:
+            self.__columns.append(0)
+        bit = 1 << self.__get_slot(identifier)
+        self.__columns[tower_index] |= bit
+        self.__protected |= bit
+
+    def discard(self, identifier: int) -> None:
+        if identifier not in self.__slots:
+            return
+        towers = self.get_towers(identifier)
+        slot = self.__slots.pop(identifier)
+        bit = 1 << slot
+        for index in towers:
+            self.__columns[index] &= ~bit
+        # The previous columns are cleared too, the slot must not carry a transition to its next airplane
+        for index, column in enumerate(self.__previous_columns):
+            if column & bit:
+                self.__previous_columns[index] = column & ~bit
+        mask = ~bit
+        self.__protected &= mask
+        self.__flying &= mask
+        self.__entered &= mask
+        self.__exited &= mask
+        self.__identifiers[slot] = -1
+        heappush(self.__free_slots, slot)
+
+    def get_transitions(self) -> Iterator[tuple[int, list[int], list[int]]]:
+        # Tower index, airplanes which entered and airplanes which exited its area during the last update
+        for index, column in enumerate(self.__columns):
+            previous = self.__previous_columns[index] if index < len(self.__previous_columns) else 0
+            if column != previous:
+                yield index, self.get_identifiers(column & ~previous), self.get_identifiers(previous & ~column & self.__flying)
+
+    def get_identifiers(self, bitset: int) -> list[int]:
+        # Simulation identifiers of the rows of a bitset, in the script order
+        identifiers = self.__identifiers
+        return sorted(identifiers[slot] for slot in iter_bits(bitset))
+
+    def get_towers(self, identifier: int) -> list[int]:
+        if identifier not in self.__slots:
+            return list[int]()
+        bit = 1 << self.__slots[identifier]
+        return [index for index, column in enumerate(self.__columns) if column & bit]
+
+    def count(self, tower_index: int) -> int:
+        return self.__columns[tower_index].bit_count() if tower_index < len(self.__columns) else 0
+
+    def contains(self, identifier: int) -> bool:
+        slot = self.__slots.get(identifier)
+        return slot is not None and bool(self.__protected >> slot & 1)
+
+    def __get_slot(self, identifier: int) -> int:
+        slot = self.__slots.get(identifier)
+        if slot is None:
+            if self.__free_slots:
+                slot = heappop(self.__free_slots)
+                self.__identifiers[slot] = identifier
+            else:
+                slot = len(self.__identifiers)
+                self.__identifiers.append(identifier)
+            self.__slots[identifier] = slot
+        return slot
+
+    nb_protected = property(lambda self: self.__protected.bit_count())
+    nb_flying = property(lambda self: self.__flying.bit_count())
+    unprotected = property(lambda self: self.get_identifiers(self.__flying & ~self.__protected))
+    entered = property(lambda self: self.get_identifiers(self.__entered))
+    exited = property(lambda self: self.get_identifiers(self.__exited))
@@ -0,0 +1,136 @@
+# -*- coding: Utf-8 -*
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Sequence, Union
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Each thread updates its own cell: increments never take a lock, cells are only summed when the metrics are scraped
+class ThreadCells:
+
+    def __init__(self, size: int):
+        self.__size = size
+        self.__local = threading.local()
+        self.__cells = list[list[float]]()
+        self.__lock = threading.Lock()
+
+    def get(self) -> list[float]:
+        try:
+            return self.__local.cell
+        except AttributeError:
+            cell = self.__local.cell = [0] * self.__size
+            with self.__lock:
+                self.__cells.append(cell)
+            return cell
+
+    def total(self) -> list[float]:
+        with self.__lock:
+            cells = self.__cells.copy()
+        return [sum(values) for values in zip(*cells)] if cells else [0] * self.__size
+
+class Counter:
+
+    def __init__(self):
+        self.__cells = ThreadCells(1)
+
+    def inc(self, amount: float=1) -> None:
+        self.__cells.get()[0] += amount
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        return ["{}_total{} {}".format(name, labels, format_value(self.__cells.total()[0]))]
+
+class Gauge:
+
+    def __init__(self):
+        self.__value = 0
+        self.__function = None
+
+    def set(self, value: float) -> None:
+        self.__value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        # The value is computed when the metrics are scraped, never in the hot path
+        self.__function = function
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        value = self.__function() if self.__function is not None else self.__value
+        return ["{}{} {}".format(name, labels, format_value(value))]
+
+class Histogram:
+
+    def __init__(self, buckets: Sequence[float]=DEFAULT_BUCKETS):
+        self.__buckets = tuple(sorted(buckets))
+        # One count per bucket, the "+Inf" bucket count, then the sum of the observed values
+        self.__cells = ThreadCells(len(self.__buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self.__cells.get()
+        cell[bisect_left(self.__buckets, value)] += 1
+        cell[-1] += value
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        values = self.__cells.total()
+        lines = list[str]()
+        cumulative = 0
+        for bound, count in zip((*self.__buckets, math.inf), values):
+            cumulative += count
+            lines.append("{}_bucket{} {}".format(name, format_labels(labels, le=format_value(bound)), format_value(cumulative)))
+        lines.append("{}_sum{} {}".format(name, labels, format_value(values[-1])))
+        lines.append("{}_count{} {}".format(name, labels, format_value(cumulative)))
+        return lines
+
+Metric = Union[Counter, Gauge, Histogram]
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def format_labels(labels: str, **extra: str) -> str:
+    pairs = [labels[1:-1]] if labels else []
+    pairs.extend('{}="{}"'.format(key, value) for key, value in extra.items())
+    return "{" + ",".join(pairs) + "}"
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.__families = dict[str, tuple[str, str, dict[str, Metric]]]()
+        self.__lock = threading.Lock()
+
+    def __get(self, name: str, kind: str, description: str, factory: Callable[[], Metric], labels: dict[str, str]) -> Metric:
+        label_str = format_labels("", **labels) if labels else ""
+        with self.__lock:
+            family = self.__families.setdefault(name, (kind, description, dict[str, Metric]()))
+            if family[0] != kind:
+                raise ValueError("Metric {} is already registered as a {}".format(name, family[0]))
+            metric = family[2].get(label_str)
+            if metric is None:
+                metric = family[2][label_str] = factory()
+            return metric
+
+    def counter(self, name: str, description: str, **labels: str) -> Counter:
+        return self.__get(name, "counter", description, Counter, labels)
+
+    def gauge(self, name: str, description: str, **labels: str) -> Gauge:
+        return self.__get(name, "gauge", description, Gauge, labels)
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float]=DEFAULT_BUCKETS, **labels: str) -> Histogram:
+        return self.__get(name, "histogram", description, lambda: Histogram(buckets), labels)
+
+    def expose(self) -> str:
+        with self.__lock:
+            families = [(name, kind, description, list(metrics.items())) for name, (kind, description, metrics) in self.__families.items()]
+        lines = list[str]()
+        for name, kind, description, metrics in families:
+            lines.append("# HELP {} {}".format(name + "_total" if kind == "counter" else name, description))
+            lines.append("# TYPE {} {}".format(name + "_total" if kind == "counter" else name, kind))
+            for labels, metric in metrics:
+                lines.extend(metric.samples(name, labels))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,40 @@
+# -*- coding: Utf-8 -*
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .metrics import REGISTRY
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None: # pylint: disable=redefined-builtin
+        pass
+
+class MetricsServer:
+
+    def __init__(self, address: str):
+        host, _, port = address.rpartition(":")
+        self.__server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), MetricsRequestHandler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="metrics", daemon=True)
+
+    def start(self) -> None:
+        self.__thread.start()
+
+    def stop(self) -> None:
+        if self.__thread.is_alive():
+            self.__server.shutdown()
+            self.__thread.join()
+        self.__server.server_close()
+
+    address = property(lambda self: "{}:{}".format(*self.__server.server_address[:2]))
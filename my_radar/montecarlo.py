@@ -0,0 +1,87 @@
+# -*- coding: Utf-8 -*
+
+import os
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Union
+from .batch import ScriptSetups, RunParameters, DEFAULT_MAX_CHRONO, create_perturbed_simulation
+from .headless import init_headless
+
+CONFIDENCE_Z = 1.96 # 95% confidence level
+
+class Estimate(NamedTuple):
+    count: int
+    frequency: float
+    low: float
+    high: float
+
+def wilson_interval(count: int, nb_replicas: int, z: float=CONFIDENCE_Z) -> Estimate:
+    if nb_replicas == 0:
+        return Estimate(count, 0, 0, 1)
+    p = count / nb_replicas
+    denominator = 1 + z ** 2 / nb_replicas
+    center = (p + z ** 2 / (2 * nb_replicas)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / nb_replicas + z ** 2 / (4 * nb_replicas ** 2)) / denominator
+    return Estimate(count, p, max(center - half_width, 0), min(center + half_width, 1))
+
+class CollisionRiskEstimator:
+
+    def __init__(self, nb_airplanes: int):
+        self.__nb_airplanes = nb_airplanes
+        self.__nb_replicas = 0
+        self.__airplanes = Counter[int]()
+        self.__pairs = Counter[tuple[int, int]]()
+
+    def add_replica(self, pairs: list[tuple[int, int]]) -> None:
+        self.__nb_replicas += 1
+        for pair in set(pairs):
+            self.__pairs[pair] += 1
+        for airplane in {airplane for pair in pairs for airplane in pair}:
+            self.__airplanes[airplane] += 1
+
+    def airplane_estimates(self) -> dict[int, Estimate]:
+        return {airplane: wilson_interval(self.__airplanes[airplane], self.__nb_replicas) for airplane in range(self.__nb_airplanes)}
+
+    def pair_estimates(self) -> dict[tuple[int, int], Estimate]:
+        return {pair: wilson_interval(count, self.__nb_replicas) for pair, count in self.__pairs.most_common()}
+
+    def max_half_width(self) -> float:
+        # Estimates with the same count share the same interval: airplanes never destroyed so far all have count 0
+        counts = set(self.__airplanes.values()) | set(self.__pairs.values()) | {0}
+        estimates = [wilson_interval(count, self.__nb_replicas) for count in counts]
+        return max((estimate.high - estimate.low) / 2 for estimate in estimates)
+
+    nb_replicas = property(lambda self: self.__nb_replicas)
+
+__worker_script = list[ScriptSetups]()
+
+def __init_worker(script: ScriptSetups) -> None:
+    __worker_script[:] = [script]
+    init_headless()
+
+def __run_replica(parameters: RunParameters, max_chrono: float) -> list[tuple[int, int]]:
+    simulation = create_perturbed_simulation(__worker_script[0], parameters)
+    simulation.run(max_chrono)
+    return [(min(id_1, id_2), max(id_1, id_2)) for _, id_1, id_2 in simulation.collisions]
+
+def estimate_collision_risk(script: ScriptSetups, max_replicas: int, delay_jitter: float=1, speed_jitter: float=0.05, seed: int=0,
+                            tolerance: float=0.01, min_replicas: int=100, max_chrono: float=DEFAULT_MAX_CHRONO,
+                            max_workers: Union[int, None]=None) -> CollisionRiskEstimator:
+    estimator = CollisionRiskEstimator(len(script.airplanes))
+    max_workers = max_workers or os.cpu_count()
+    batch_size = max(max_workers * 8, 1)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=__init_worker, initargs=(script,)) as executor:
+        next_seed = seed
+        while estimator.nb_replicas < max_replicas:
+            nb_replicas = min(batch_size, max_replicas - estimator.nb_replicas)
+            parameters = [
+                RunParameters(delay_jitter=delay_jitter, seed=replica_seed, speed_jitter=speed_jitter)
+                for replica_seed in range(next_seed, next_seed + nb_replicas)
+            ]
+            next_seed += nb_replicas
+            for pairs in executor.map(__run_replica, parameters, [max_chrono] * nb_replicas, chunksize=max(nb_replicas // max_workers, 1)):
+                estimator.add_replica(pairs)
+            if estimator.nb_replicas >= min_replicas and estimator.max_half_width() <= tolerance:
+                break
+    return estimator
@@ -26,6 +26,21 @@ def parse_error_exception(function):
 
     return wrapper
 
+ENTITY_SIZES = {"A": 6, "T": 3}
+
+def parse_script_line(path: str, index: int, line: str) -> tuple[str, list[float]]:
+    entity, *infos = line.split()
+    if entity not in ENTITY_SIZES:
+        raise ScriptLineParserError(path, index, "Unrecognized entity '{}'".format(entity))
+    try:
+        infos = [float(value) for value in infos]
+    except Exception as e:
+        raise ScriptLineParserError(path, index, str(e)) from None
+    size = len(infos)
+    if size != ENTITY_SIZES[entity]:
+        raise ScriptLineParserError(path, index, "Expected {} decimal numbers, not {}".format(ENTITY_SIZES[entity], size))
+    return entity, infos
+
 class ScriptParser:
 
     EXTENSION = ".rdr"
@@ -39,8 +54,8 @@ class ScriptParser:
             raise FileNotFoundError(path)
 
         self.__entities = {
-            "A": {"list": list(), "size": 6},
-            "T": {"list": list(), "size": 3}
+            "A": {"list": list(), "size": ENTITY_SIZES["A"]},
+            "T": {"list": list(), "size": ENTITY_SIZES["T"]}
         }
 
         try:
@@ -53,16 +68,7 @@ class ScriptParser:
             raise ScriptParserError("Can't use script file: {}".format(e)) from None
 
         for index, line in enumerate(script.splitlines(), start=1):
-            entity, *infos = line.split()
-            if entity not in self.__entities:
-                raise ScriptLineParserError(path, index, "Unrecognized entity '{}'".format(entity))
-            try:
-                infos = [float(value) for value in infos]
-            except Exception as e:
-                raise ScriptLineParserError(path, index, str(e)) from None
-            size = len(infos)
-            if size != self.__entities[entity]["size"]:
-                raise ScriptLineParserError(path, index, "Expected {} decimal numbers, not {}".format(self.__entities[entity]["size"], size))
+            entity, infos = parse_script_line(path, index, line)
             self.__entities[entity]["list"].append(infos)
 
         self.__filepath = path
@@ -75,6 +81,10 @@ class ScriptParser:
             for entity in group.sprites():
                 self.__entities[group.letter]["list"].append(entity.get_setup())
 
+    def load_setups(self, airplanes: list[list[float]], towers: list[list[float]]) -> None:
+        self.__entities["A"]["list"] = airplanes
+        self.__entities["T"]["list"] = towers
+
     def save_in_file(self) -> bool:
         try:
             with open(self.__filepath, "w") as file:
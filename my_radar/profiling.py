@@ -0,0 +1,127 @@
+# -*- coding: Utf-8 -*
+
+import os.path
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterable, TextIO, Union
+import pygame
+
+MEMORY_REPORT_INTERVAL = 10 # seconds between two memory reports
+
+class StartupProfiler:
+
+    def __init__(self, enabled=True, start: Union[float, None]=None):
+        self.__enabled = enabled
+        self.__start = self.__last = start if start is not None else time.perf_counter()
+        self.__stages = list[tuple[str, float]]()
+
+    def mark(self, stage: str) -> None:
+        # Ends the stage started at the previous mark
+        if not self.__enabled:
+            return
+        now = time.perf_counter()
+        self.__stages.append((stage, now - self.__last))
+        self.__last = now
+
+    def report(self, file: TextIO=sys.stderr) -> None:
+        if not self.__enabled or not self.__stages:
+            return
+        width = max(len(stage) for stage, _ in self.__stages)
+        print("Startup profile:", file=file)
+        for stage, duration in self.__stages:
+            print("  {}  {:8.1f} ms".format(stage.ljust(width), duration * 1000), file=file)
+        print("  {}  {:8.1f} ms".format("total".ljust(width), (self.__last - self.__start) * 1000), file=file)
+        self.__enabled = False
+
+    enabled = property(lambda self: self.__enabled)
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} GiB".format(size)
+
+def get_surfaces_size(surfaces: Iterable[pygame.Surface]) -> int:
+    # Pixels are allocated by SDL, out of sight of tracemalloc; shared surfaces are counted once
+    unique_surfaces = {id(surface): surface for surface in surfaces}
+    return sum(surface.get_pitch() * surface.get_height() for surface in unique_surfaces.values())
+
+class MemoryProfiler:
+
+    def __init__(self, enabled=True, interval: float=MEMORY_REPORT_INTERVAL):
+        self.__enabled = enabled
+        self.__interval = interval
+        self.__next_report = time.monotonic() + interval
+        self.__sources = dict[str, Callable[[], int]]()
+        self.__package = os.path.dirname(os.path.abspath(__file__))
+        self.__frame_start = 0
+        self.__nb_frames = 0
+        self.__frames_net = self.__frames_peak = self.__max_peak = 0
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_source(self, name: str, get_size: Callable[[], int]) -> None:
+        # Memory of a subsystem, computed at each report
+        if self.__enabled:
+            self.__sources[name] = get_size
+
+    def start_frame(self) -> None:
+        if not self.__enabled:
+            return
+        tracemalloc.reset_peak()
+        self.__frame_start = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self) -> None:
+        # Net growth and transient allocations (peak above the start of the frame) of the frame
+        if not self.__enabled:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self.__nb_frames += 1
+        self.__frames_net += current - self.__frame_start
+        self.__frames_peak += peak - self.__frame_start
+        self.__max_peak = max(self.__max_peak, peak - self.__frame_start)
+        if time.monotonic() >= self.__next_report:
+            self.report("every {}s".format(self.__interval))
+
+    def get_modules_sizes(self) -> list[tuple[str, int]]:
+        # Traced memory by module of the package, allocations made elsewhere are gathered
+        sizes = dict[str, int]()
+        for statistic in tracemalloc.take_snapshot().statistics("filename"):
+            filename = statistic.traceback[0].filename
+            module = "(other)"
+            if os.path.dirname(os.path.abspath(filename)) == self.__package:
+                module = os.path.splitext(os.path.basename(filename))[0]
+            sizes[module] = sizes.get(module, 0) + statistic.size
+        return sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+
+    def report(self, stage: str, file: TextIO=sys.stderr) -> None:
+        if not self.__enabled:
+            return
+        self.__next_report = time.monotonic() + self.__interval
+        current, _ = tracemalloc.get_traced_memory()
+        modules = self.get_modules_sizes()
+        sources = [(name, get_size()) for name, get_size in self.__sources.items()]
+        width = max(len(name) for name, _ in modules + sources + [("traced by module", 0)])
+        print("Memory profile ({}):".format(stage), file=file)
+        print("  {}  {:>12}".format("traced by module".ljust(width), format_size(current)), file=file)
+        for module, size in modules:
+            print("    {}  {:>12}".format(module.ljust(width - 2), format_size(size)), file=file)
+        print("  subsystems", file=file)
+        for name, size in sources:
+            print("    {}  {:>12}".format(name.ljust(width - 2), format_size(size)), file=file)
+        if self.__nb_frames > 0:
+            print("  {} frames: {} net, {} allocated per frame on average (at most {})".format(
+                self.__nb_frames, format_size(self.__frames_net / self.__nb_frames),
+                format_size(self.__frames_peak / self.__nb_frames), format_size(self.__max_peak)
+            ), file=file)
+            self.__nb_frames = 0
+            self.__frames_net = self.__frames_peak = self.__max_peak = 0
+
+    def stop(self) -> None:
+        if self.__enabled:
+            tracemalloc.stop()
+            self.__enabled = False
+
+    enabled = property(lambda self: self.__enabled)
@@ -0,0 +1,286 @@
+# -*- coding: Utf-8 -*
+
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+from typing import Sequence, Union
+from .simulation import Simulation
+from .snapshot import SimulationSnapshot, AirplaneState, AIRPLANE_TAKE_OFF, AIRPLANE_DESTROYED, AIRPLANE_IN_TOWER_AREA
+
+MAGIC = b"MYRADREC"
+VERSION = 1
+FILE_HEADER = struct.Struct("<HIII")    # version, frames per chunk, nb airplanes, nb towers
+CHUNK_HEADER = struct.Struct("<QIId")   # first frame, nb frames, payload size, first chrono
+KEYFRAME = struct.Struct("<dIIIH")      # chrono, landed on, destroyed, nb airplanes, nb events
+KEY_RECORD = struct.Struct("<IiiB")     # airplane, x, y, flags
+DELTA_FRAME = struct.Struct("<dIIH")    # chrono, landed on, destroyed, nb events
+EVENT = struct.Struct("<BIii")          # event, airplane, x, y
+
+EVENT_TAKE_OFF = 1
+EVENT_LAND_ON = 2
+EVENT_DESTROYED = 3
+EVENT_TOWER_ENTER = 4
+EVENT_TOWER_EXIT = 5
+
+POSITION_SCALE = 16 # Positions are stored in 1/16 pixels
+DELTA_LIMIT = 2 ** 15 - 1
+
+class TrajectoryRecorder:
+
+    def __init__(self, path: str, angles: Sequence[float], towers: Sequence[Sequence[float]], frames_per_chunk=120):
+        self.__file = open(path, "wb")
+        self.__file.write(MAGIC)
+        self.__file.write(FILE_HEADER.pack(VERSION, frames_per_chunk, len(angles), len(towers)))
+        self.__file.write(array("f", angles).tobytes())
+        self.__file.write(array("d", (value for tower in towers for value in tower)).tobytes())
+        self.__frames_per_chunk = frames_per_chunk
+        self.__chunk = bytearray()
+        self.__chunk_first_frame = 0
+        self.__chunk_chrono = 0
+        self.__nb_frames = 0
+        self.__chunk_nb_frames = 0
+        self.__active = dict[int, list[int]]()
+        self.__land_on = self.__destroyed = 0
+
+    def record(self, simulation: Simulation) -> None:
+        membership = simulation.membership
+        current = dict[int, list[int]]()
+        for airplane in simulation.airplanes_group.sprites():
+            if airplane.flying:
+                identifier = simulation.get_identifier(airplane)
+                flags = AIRPLANE_IN_TOWER_AREA if membership.contains(identifier) else 0
+                current[identifier] = [round(airplane.center.x * POSITION_SCALE), round(airplane.center.y * POSITION_SCALE), flags]
+        results = simulation.get_results()
+        self.__land_on = results["land_on"]
+        self.__destroyed = results["destroyed"]
+        events = list[tuple[int, int, int, int]]()
+        for identifier in self.__active.keys() - current.keys():
+            events.append((EVENT_DESTROYED if simulation.get_flags(identifier) & AIRPLANE_DESTROYED else EVENT_LAND_ON, identifier, 0, 0))
+        for identifier, (x, y, flags) in current.items():
+            if identifier not in self.__active:
+                events.append((EVENT_TAKE_OFF, identifier, x, y))
+                if flags:
+                    events.append((EVENT_TOWER_ENTER, identifier, 0, 0))
+        # The other tower events are the transitions of the last tick
+        for transitions, event in ((membership.entered, EVENT_TOWER_ENTER), (membership.exited, EVENT_TOWER_EXIT)):
+            for identifier in transitions:
+                if identifier in self.__active and identifier in current:
+                    events.append((event, identifier, 0, 0))
+        deltas = array("h")
+        if self.__chunk_nb_frames > 0 and self.__chunk_nb_frames < self.__frames_per_chunk:
+            for identifier in sorted(current):
+                x, y, _ = current[identifier]
+                previous = self.__active.get(identifier)
+                dx, dy = (x - previous[0], y - previous[1]) if previous is not None else (0, 0)
+                if abs(dx) > DELTA_LIMIT or abs(dy) > DELTA_LIMIT:
+                    break
+                deltas.append(dx)
+                deltas.append(dy)
+            else:
+                self.__write_delta_frame(simulation.chrono, events, deltas)
+                self.__active = current
+                return
+        self.__write_keyframe(simulation.chrono, events, current)
+        self.__active = current
+
+    def __write_keyframe(self, chrono: float, events: list[tuple[int, int, int, int]], current: dict[int, list[int]]) -> None:
+        self.flush()
+        self.__chunk_first_frame = self.__nb_frames
+        self.__chunk_chrono = chrono
+        self.__chunk += KEYFRAME.pack(chrono, self.__land_on, self.__destroyed, len(current), len(events))
+        for event in events:
+            self.__chunk += EVENT.pack(*event)
+        for identifier in sorted(current):
+            self.__chunk += KEY_RECORD.pack(identifier, *current[identifier])
+        self.__chunk_nb_frames = 1
+        self.__nb_frames += 1
+
+    def __write_delta_frame(self, chrono: float, events: list[tuple[int, int, int, int]], deltas: array) -> None:
+        self.__chunk += DELTA_FRAME.pack(chrono, self.__land_on, self.__destroyed, len(events))
+        for event in events:
+            self.__chunk += EVENT.pack(*event)
+        self.__chunk += deltas.tobytes()
+        self.__chunk_nb_frames += 1
+        self.__nb_frames += 1
+
+    def flush(self) -> None:
+        if self.__chunk_nb_frames > 0:
+            self.__file.write(CHUNK_HEADER.pack(self.__chunk_first_frame, self.__chunk_nb_frames, len(self.__chunk), self.__chunk_chrono))
+            self.__file.write(self.__chunk)
+        self.__chunk.clear()
+        self.__chunk_nb_frames = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.__file.close()
+
+class TrajectoryReplay:
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError("{}: not a trajectory recording".format(path))
+        offset = len(MAGIC)
+        version, _, nb_airplanes, nb_towers = FILE_HEADER.unpack_from(self.__mmap, offset)
+        if version != VERSION:
+            raise ValueError("{}: unsupported recording version {}".format(path, version))
+        offset += FILE_HEADER.size
+        self.__angles = array("f", self.__mmap[offset:offset + 4 * nb_airplanes])
+        offset += 4 * nb_airplanes
+        towers = array("d", self.__mmap[offset:offset + 8 * 3 * nb_towers])
+        self.__towers = [list(towers[i:i + 3]) for i in range(0, len(towers), 3)]
+        offset += 8 * 3 * nb_towers
+
+        # Chunk index: (first frame, nb frames, payload offset, first chrono)
+        self.__chunks = list[tuple[int, int, int, float]]()
+        while offset + CHUNK_HEADER.size <= len(self.__mmap):
+            first_frame, nb_frames, size, chrono = CHUNK_HEADER.unpack_from(self.__mmap, offset)
+            offset += CHUNK_HEADER.size
+            if offset + size > len(self.__mmap):
+                break # Truncated last chunk (the recorder did not exit properly)
+            self.__chunks.append((first_frame, nb_frames, offset, chrono))
+            offset += size
+        self.__chunk_chronos = [chunk[3] for chunk in self.__chunks]
+
+        # Decoding position
+        self.__chunk_index = -1
+        self.__frame = -1
+        self.__frame_offset = 0
+        self.__chrono = 0
+        self.__state = dict[int, list[int]]()
+        self.__land_on = self.__destroyed = 0
+
+        # Frames have no fixed size: the chrono of the last one is only known once the last chunk is decoded
+        self.__duration = 0
+        if self.__chunks:
+            self.__load_keyframe(len(self.__chunks) - 1)
+            while self.__next_frame():
+                pass
+            self.__duration = self.__chrono
+            self.__chunk_index = self.__frame = -1
+            self.__frame_offset = 0
+            self.__chrono = 0
+            self.__state = dict[int, list[int]]()
+            self.__land_on = self.__destroyed = 0
+
+    def __load_keyframe(self, chunk_index: int) -> None:
+        first_frame, _, offset, _ = self.__chunks[chunk_index]
+        chrono, land_on, destroyed, count, nb_events = KEYFRAME.unpack_from(self.__mmap, offset)
+        offset += KEYFRAME.size + nb_events * EVENT.size
+        state = dict[int, list[int]]()
+        for _ in range(count):
+            identifier, x, y, flags = KEY_RECORD.unpack_from(self.__mmap, offset)
+            state[identifier] = [x, y, flags]
+            offset += KEY_RECORD.size
+        self.__chunk_index = chunk_index
+        self.__frame = first_frame
+        self.__frame_offset = offset
+        self.__chrono = chrono
+        self.__state = state
+        self.__land_on = land_on
+        self.__destroyed = destroyed
+
+    def __next_chrono(self) -> Union[float, None]:
+        first_frame, nb_frames, _, _ = self.__chunks[self.__chunk_index]
+        if self.__frame + 1 < first_frame + nb_frames:
+            return DELTA_FRAME.unpack_from(self.__mmap, self.__frame_offset)[0]
+        if self.__chunk_index + 1 < len(self.__chunks):
+            return self.__chunk_chronos[self.__chunk_index + 1]
+        return None
+
+    def __next_frame(self) -> bool:
+        first_frame, nb_frames, _, _ = self.__chunks[self.__chunk_index]
+        if self.__frame + 1 >= first_frame + nb_frames:
+            if self.__chunk_index + 1 >= len(self.__chunks):
+                return False
+            self.__load_keyframe(self.__chunk_index + 1)
+            return True
+        offset = self.__frame_offset
+        chrono, land_on, destroyed, nb_events = DELTA_FRAME.unpack_from(self.__mmap, offset)
+        offset += DELTA_FRAME.size
+        state = self.__state
+        for _ in range(nb_events):
+            event, identifier, x, y = EVENT.unpack_from(self.__mmap, offset)
+            offset += EVENT.size
+            if event == EVENT_TAKE_OFF:
+                state[identifier] = [x, y, 0]
+            elif event == EVENT_LAND_ON or event == EVENT_DESTROYED:
+                state.pop(identifier, None)
+            elif event == EVENT_TOWER_ENTER:
+                state[identifier][2] = AIRPLANE_IN_TOWER_AREA
+            elif event == EVENT_TOWER_EXIT:
+                state[identifier][2] = 0
+        identifiers = sorted(state)
+        deltas = array("h", self.__mmap[offset:offset + 4 * len(identifiers)])
+        offset += 4 * len(identifiers)
+        for i, identifier in enumerate(identifiers):
+            position = state[identifier]
+            position[0] += deltas[2 * i]
+            position[1] += deltas[2 * i + 1]
+        self.__frame += 1
+        self.__frame_offset = offset
+        self.__chrono = chrono
+        self.__land_on = land_on
+        self.__destroyed = destroyed
+        return True
+
+    def seek(self, chrono: float) -> None:
+        if not self.__chunks:
+            return
+        chunk_index = max(bisect_right(self.__chunk_chronos, chrono) - 1, 0)
+        if chunk_index != self.__chunk_index or chrono < self.__chrono:
+            self.__load_keyframe(chunk_index)
+        next_chrono = self.__next_chrono()
+        while next_chrono is not None and next_chrono <= chrono:
+            self.__next_frame()
+            next_chrono = self.__next_chrono()
+
+    def snapshot(self) -> SimulationSnapshot:
+        angles = self.__angles
+        airplanes = tuple(
+            AirplaneState(identifier, x / POSITION_SCALE, y / POSITION_SCALE, angles[identifier], AIRPLANE_TAKE_OFF | flags)
+            for identifier, (x, y, flags) in sorted(self.__state.items())
+        )
+        return SimulationSnapshot(self.__frame, self.__chrono, airplanes, tuple(), self.__land_on, self.__destroyed, self.__frame + 1 >= self.nb_frames)
+
+    def close(self) -> None:
+        self.__mmap.close()
+
+    towers = property(lambda self: self.__towers)
+    nb_frames = property(lambda self: self.__chunks[-1][0] + self.__chunks[-1][1] if self.__chunks else 0)
+    duration = property(lambda self: self.__duration)
+
+class TrajectoryPlayer:
+
+    def __init__(self, replay: TrajectoryReplay):
+        self.__replay = replay
+        self.__chrono = 0
+        self.__speed = 1
+        self.__playing = True
+        replay.seek(0)
+
+    def update(self, elapsed_time: float) -> None:
+        if self.__playing:
+            self.seek(self.__chrono + elapsed_time * self.__speed)
+            # The last frame stays on screen
+            self.__playing = self.__chrono < self.__replay.duration
+
+    def seek(self, chrono: float) -> None:
+        self.__chrono = min(max(chrono, 0), self.__replay.duration)
+        self.__replay.seek(self.__chrono)
+
+    def set_speed(self, speed: float) -> None:
+        self.__speed = min(max(speed, 1 / 16), 64)
+
+    def toggle_pause(self) -> None:
+        # Playing again once the replay is over starts it over
+        if not self.__playing and self.__chrono >= self.__replay.duration:
+            self.seek(0)
+        self.__playing = not self.__playing
+
+    latest = property(lambda self: self.__replay.snapshot())
+    chrono = property(lambda self: self.__chrono)
+    speed = property(lambda self: self.__speed, set_speed)
+    playing = property(lambda self: self.__playing)
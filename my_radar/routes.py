@@ -0,0 +1,155 @@
+# -*- coding: Utf-8 -*
+
+import heapq
+import math
+from bisect import bisect_left
+from itertools import combinations
+from typing import NamedTuple, Sequence, Union
+import pygame
+from pygame.math import Vector2
+from .tower import get_wrapped_area_positions
+
+EPSILON = 1e-7
+
+class RouteSegment(NamedTuple):
+    airplane: int
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+
+    @classmethod
+    def from_setup(cls, airplane: int, line: Sequence[float]):
+        departure_x, departure_y, arrival_x, arrival_y = line[:4]
+        # The sweep line goes from left to right: the first point is the lexicographically smallest one
+        if (departure_x, departure_y) > (arrival_x, arrival_y):
+            departure_x, departure_y, arrival_x, arrival_y = arrival_x, arrival_y, departure_x, departure_y
+        return cls(airplane, departure_x, departure_y, arrival_x, arrival_y)
+
+    @property
+    def vertical(self) -> bool:
+        return self.x1 == self.x2
+
+    @property
+    def slope(self) -> float:
+        return math.inf if self.vertical else (self.y2 - self.y1) / (self.x2 - self.x1)
+
+    def y_at(self, x: float, y: float) -> float:
+        if self.vertical:
+            # A vertical segment is "at" the event point for as long as the point is on it
+            return min(max(y, self.y1), self.y2)
+        return self.y1 + (x - self.x1) * (self.y2 - self.y1) / (self.x2 - self.x1)
+
+class RouteCrossing(NamedTuple):
+    airplane_1: int
+    airplane_2: int
+    x: float
+    y: float
+    time_1: float
+    time_2: float
+    protected: bool
+
+def segment_intersection(s1: RouteSegment, s2: RouteSegment) -> Union[tuple[float, float], None]:
+    # Returns the lexicographically smallest common point of the two segments, if any
+    dx1, dy1 = s1.x2 - s1.x1, s1.y2 - s1.y1
+    dx2, dy2 = s2.x2 - s2.x1, s2.y2 - s2.y1
+    denominator = dx1 * dy2 - dy1 * dx2
+    ox, oy = s2.x1 - s1.x1, s2.y1 - s1.y1
+    if abs(denominator) > EPSILON:
+        t = (ox * dy2 - oy * dx2) / denominator
+        u = (ox * dy1 - oy * dx1) / denominator
+        if -EPSILON <= t <= 1 + EPSILON and -EPSILON <= u <= 1 + EPSILON:
+            t = min(max(t, 0), 1)
+            return (s1.x1 + t * dx1, s1.y1 + t * dy1)
+        return None
+    if abs(ox * dy1 - oy * dx1) > EPSILON * max(math.hypot(dx1, dy1), 1):
+        return None # Parallel but not collinear
+    start = max((s1.x1, s1.y1), (s2.x1, s2.y1))
+    end = min((s1.x2, s1.y2), (s2.x2, s2.y2))
+    return start if start <= end else None
+
+def is_after(x: float, y: float, event_x: float, event_y: float) -> bool:
+    if abs(x - event_x) <= EPSILON:
+        return y > event_y + EPSILON
+    return x > event_x
+
+def find_route_intersections(segments: Sequence[RouteSegment]) -> dict[tuple[int, int], tuple[float, float]]:
+    # Bentley-Ottmann sweep line: events are processed in lexicographic (x, y) order and the status list holds the
+    # segments crossing the sweep line, sorted by their y coordinate. Only neighbours in the status can intersect next.
+    START, CROSSING, END = range(3)
+    events = list[tuple[float, float, int, int]]()
+    for index, segment in enumerate(segments):
+        events.append((segment.x1, segment.y1, START, index))
+        events.append((segment.x2, segment.y2, END, index))
+    heapq.heapify(events)
+    status = list[int]()
+    intersections = dict[tuple[int, int], tuple[float, float]]()
+
+    def schedule(index_1: int, index_2: int, x: float, y: float) -> None:
+        point = segment_intersection(segments[index_1], segments[index_2])
+        if point is not None and is_after(*point, x, y):
+            heapq.heappush(events, (point[0], point[1], CROSSING, -1))
+
+    while events:
+        x, y, _, _ = events[0]
+        starting = list[int]()
+        while events and events[0][0] == x and events[0][1] == y:
+            _, _, event_type, index = heapq.heappop(events)
+            if event_type == START:
+                starting.append(index)
+
+        key = lambda index: segments[index].y_at(x, y)
+        first = bisect_left(status, y - EPSILON, key=key)
+        last = first
+        while last < len(status) and key(status[last]) <= y + EPSILON:
+            last += 1
+        # Segments containing the event point: ending ones leave the status, the others are re-inserted with the starting
+        # ones in their order right after the event point (by slope)
+        containing = [index for index in status[first:last] if is_after(segments[index].x2, segments[index].y2, x, y)]
+        for index_1, index_2 in combinations(sorted(set(status[first:last]) | set(starting)), 2):
+            pair = tuple(sorted((segments[index_1].airplane, segments[index_2].airplane)))
+            intersections.setdefault(pair, (x, y))
+        inserted = sorted(set(containing) | set(starting), key=lambda index: segments[index].slope)
+        status[first:last] = inserted
+        if not inserted:
+            if 0 < first < len(status):
+                schedule(status[first - 1], status[first], x, y)
+        else:
+            if first > 0:
+                schedule(status[first - 1], inserted[0], x, y)
+            after = first + len(inserted)
+            if after < len(status):
+                schedule(inserted[-1], status[after], x, y)
+    return intersections
+
+def get_tower_areas(towers: Sequence[Sequence[float]], screen_rect: pygame.Rect) -> list[tuple[Vector2, float]]:
+    areas = list[tuple[Vector2, float]]()
+    for center_x, center_y, radius in towers:
+        # Same geometry as TowerArea: a (2 * radius) square surface centered on the tower
+        area_rect = pygame.Rect(0, 0, int(radius * 2), int(radius * 2))
+        area_rect.center = (center_x, center_y)
+        areas.append((Vector2(area_rect.center), radius))
+        for position in get_wrapped_area_positions(area_rect, screen_rect):
+            wrapped_rect = area_rect.copy()
+            for attribute, value in position.items():
+                setattr(wrapped_rect, attribute, value)
+            areas.append((Vector2(wrapped_rect.center), radius))
+    return areas
+
+def get_time_at(line: Sequence[float], point: Vector2) -> float:
+    departure_x, departure_y, _, _, speed, delay = line
+    if speed <= 0:
+        return math.inf
+    return delay + Vector2(departure_x, departure_y).distance_to(point) / speed
+
+def find_route_crossings(airplanes: Sequence[Sequence[float]], towers: Sequence[Sequence[float]], screen_rect: pygame.Rect) -> list[RouteCrossing]:
+    segments = [RouteSegment.from_setup(identifier, line) for identifier, line in enumerate(airplanes) if line[:2] != line[2:4]]
+    areas = get_tower_areas(towers, screen_rect)
+    crossings = list[RouteCrossing]()
+    for (airplane_1, airplane_2), (x, y) in sorted(find_route_intersections(segments).items()):
+        point = Vector2(x, y)
+        protected = any(center.distance_to(point) <= radius for center, radius in areas)
+        crossings.append(RouteCrossing(
+            airplane_1, airplane_2, x, y, get_time_at(airplanes[airplane_1], point), get_time_at(airplanes[airplane_2], point), protected
+        ))
+    return crossings
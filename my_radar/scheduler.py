@@ -0,0 +1,148 @@
+# -*- coding: Utf-8 -*
+
+import math
+from array import array
+from typing import Sequence, Union
+import pygame
+from pygame.math import Vector2
+from .airplane import Airplane, get_route_direction
+from .snapshot import AIRPLANE_TAKE_OFF, AIRPLANE_LAND_ON, AIRPLANE_DESTROYED
+
+SPAWN_LOOKAHEAD = 1 # seconds: airplanes are built this long before taking off
+
+ROW_PENDING = 0  # Only the route is known, the airplane is not built yet
+ROW_SPAWNED = 1  # The airplane entity is in the simulation
+ROW_RELEASED = 2 # Landed on or destroyed: the entity is gone, the row keeps its last position and flags
+
+# departure (or last position once spawned), arrival, direction, speed, delay
+ROUTE_SIZE = 8
+
+def get_landing_moves(departure: Vector2, arrival: Vector2, direction: Vector2, speed: float) -> float:
+    # Airplanes move before taking off: number of moves after which one lands on (on the next update) without having taken off
+    if departure.distance_to(arrival) <= speed:
+        return 0
+    step = direction.length()
+    if step == 0:
+        return math.inf
+    moves = max(math.floor((departure.distance_to(arrival) - speed) / step) - 1, 0)
+    while (departure + direction * moves).distance_to(arrival) > speed:
+        moves += 1
+    return moves
+
+class SpawnScheduler:
+
+    def __init__(self, airplane_image: Union[pygame.Surface, None], routes: Sequence[Sequence[float]],
+                 statuses: Union[Sequence[int], None]=None, flags: Union[Sequence[int], None]=None, lookahead: float=SPAWN_LOOKAHEAD):
+        self.__airplane_image = airplane_image
+        self.__lookahead = lookahead
+        self.__routes = array("d", (value for route in routes for value in route))
+        self.__statuses = bytearray(statuses) if statuses is not None else bytearray(len(routes))
+        self.__flags = bytearray(flags) if flags is not None else bytearray(len(routes))
+        self.__landing_moves = array("d")
+        for identifier in range(len(routes)):
+            departure, arrival, direction, speed, _ = self.__get_route(identifier)
+            self.__landing_moves.append(get_landing_moves(departure, arrival, direction, speed))
+        pending = [identifier for identifier in range(len(routes)) if self.__statuses[identifier] == ROW_PENDING]
+        self.__spawn_order = array("I", sorted(pending, key=lambda identifier: self.__routes[identifier * ROUTE_SIZE + 7]))
+        self.__landing_order = array("I", sorted(
+            (identifier for identifier in pending if self.__landing_moves[identifier] < math.inf),
+            key=lambda identifier: self.__landing_moves[identifier]
+        ))
+        self.__next_spawn = self.__next_landing = 0
+        self.__nb_pending = len(pending)
+
+    @classmethod
+    def from_setups(cls, airplane_image: pygame.Surface, setups: Sequence[Sequence[float]], **kwargs):
+        routes = list[tuple[float, ...]]()
+        for departure_x, departure_y, arrival_x, arrival_y, speed, delay in setups:
+            speed = max(speed, 0)
+            direction = get_route_direction(Vector2(departure_x, departure_y), Vector2(arrival_x, arrival_y), speed)
+            routes.append((departure_x, departure_y, arrival_x, arrival_y, direction.x, direction.y, speed, delay))
+        return cls(airplane_image, routes, **kwargs)
+
+    def __get_route(self, identifier: int) -> tuple[Vector2, Vector2, Vector2, float, float]:
+        x, y, arrival_x, arrival_y, direction_x, direction_y, speed, delay = self.__routes[identifier * ROUTE_SIZE:(identifier + 1) * ROUTE_SIZE]
+        return Vector2(x, y), Vector2(arrival_x, arrival_y), Vector2(direction_x, direction_y), speed, delay
+
+    def add(self, airplane: Airplane) -> int:
+        # An airplane built elsewhere (editor, checkpoint): it only gets a row and an identifier
+        identifier = len(self.__statuses)
+        self.__routes.extend(airplane.get_state()[:ROUTE_SIZE])
+        self.__statuses.append(ROW_SPAWNED)
+        self.__flags.append(0)
+        self.__landing_moves.append(math.inf)
+        return identifier
+
+    def spawn(self, chrono: float, nb_moves: int) -> list[tuple[int, Airplane]]:
+        # Builds the airplanes taking off within the lookahead, with the moves they made since the start of the simulation
+        airplanes = list[tuple[int, Airplane]]()
+        spawn_order = self.__spawn_order
+        while self.__next_spawn < len(spawn_order):
+            identifier = spawn_order[self.__next_spawn]
+            if self.__routes[identifier * ROUTE_SIZE + 7] > chrono + self.__lookahead:
+                break
+            self.__next_spawn += 1
+            if self.__statuses[identifier] != ROW_PENDING:
+                continue
+            departure, arrival, _, speed, delay = self.__get_route(identifier)
+            airplane = Airplane(self.__airplane_image, departure, arrival, speed, delay)
+            airplane.skip_moves(nb_moves)
+            self.__statuses[identifier] = ROW_SPAWNED
+            self.__nb_pending -= 1
+            airplanes.append((identifier, airplane))
+        return airplanes
+
+    def land(self, nb_moves: int) -> int:
+        # Airplanes reaching their arrival before taking off land on without ever being built
+        nb_land_on = 0
+        landing_order = self.__landing_order
+        while self.__next_landing < len(landing_order):
+            identifier = landing_order[self.__next_landing]
+            moves = self.__landing_moves[identifier]
+            if moves > nb_moves:
+                break
+            self.__next_landing += 1
+            if self.__statuses[identifier] != ROW_PENDING:
+                continue
+            departure, _, direction, _, _ = self.__get_route(identifier)
+            self.__set_position(identifier, departure + direction * moves)
+            self.__statuses[identifier] = ROW_RELEASED
+            self.__flags[identifier] = AIRPLANE_LAND_ON
+            self.__nb_pending -= 1
+            nb_land_on += 1
+        return nb_land_on
+
+    def release(self, identifier: int, airplane: Airplane) -> None:
+        self.__set_position(identifier, airplane.center)
+        self.__statuses[identifier] = ROW_RELEASED
+        self.__flags[identifier] = (
+            (AIRPLANE_TAKE_OFF if airplane.take_off else 0) | (AIRPLANE_LAND_ON if airplane.land_on else 0)
+            | (AIRPLANE_DESTROYED if airplane.destroyed else 0)
+        )
+
+    def __set_position(self, identifier: int, position: Vector2) -> None:
+        self.__routes[identifier * ROUTE_SIZE] = position.x
+        self.__routes[identifier * ROUTE_SIZE + 1] = position.y
+
+    def get_state(self, identifier: int) -> tuple[float, ...]:
+        # Same layout as Airplane.get_state(), for the airplanes without entity
+        flags = self.__flags[identifier]
+        return (
+            *self.__routes[identifier * ROUTE_SIZE:(identifier + 1) * ROUTE_SIZE],
+            bool(flags & AIRPLANE_TAKE_OFF), bool(flags & AIRPLANE_LAND_ON), bool(flags & AIRPLANE_DESTROYED)
+        )
+
+    def get_position(self, identifier: int) -> Vector2:
+        return Vector2(self.__routes[identifier * ROUTE_SIZE], self.__routes[identifier * ROUTE_SIZE + 1])
+
+    def get_angle(self, identifier: int) -> float:
+        return Vector2(self.__routes[identifier * ROUTE_SIZE + 4], self.__routes[identifier * ROUTE_SIZE + 5]).angle_to(Vector2(1, 0))
+
+    def get_status(self, identifier: int) -> int:
+        return self.__statuses[identifier]
+
+    def get_flags(self, identifier: int) -> int:
+        return self.__flags[identifier]
+
+    nb_airplanes = property(lambda self: len(self.__statuses))
+    nb_pending = property(lambda self: self.__nb_pending)
@@ -0,0 +1,110 @@
+# -*- coding: Utf-8 -*
+
+import struct
+import time
+from itertools import starmap
+from typing import Callable, Sequence
+from multiprocessing import shared_memory, resource_tracker
+from .parser import ScriptParser
+from .headless import create_headless_simulation
+from .simulation import Simulation, SimulationThread
+from .snapshot import SimulationSnapshot, TowerState
+
+# generation, tick, chrono, airplanes capacity, nb airplanes, nb towers, landed on, destroyed, finished
+HEADER = struct.Struct("<QQdIIIIII")
+GENERATION = struct.Struct("<Q")
+# Same fields as AirplaneState: the unpacked records are drawn as they are
+AIRPLANE_RECORD = struct.Struct("<qdddQ")  # identifier, x, y, angle, flags
+TOWER_RECORD_SIZE = struct.calcsize("<Q")  # nb airplanes
+READ_TIMEOUT = 0.1 # seconds: beyond, a write in progress is considered interrupted (publisher killed)
+
+def get_shared_state_size(nb_airplanes: int, nb_towers: int) -> int:
+    return HEADER.size + nb_airplanes * AIRPLANE_RECORD.size + nb_towers * TOWER_RECORD_SIZE
+
+def get_towers_record(nb_towers: int) -> struct.Struct:
+    return struct.Struct("<{}Q".format(nb_towers))
+
+class SharedStateWriter:
+
+    def __init__(self, name: str, nb_airplanes: int, nb_towers: int):
+        self.__memory = shared_memory.SharedMemory(name, create=True, size=get_shared_state_size(nb_airplanes, nb_towers))
+        self.__capacity = nb_airplanes
+        self.__nb_towers = nb_towers
+        self.__generation = 0
+        self.__towers_record = get_towers_record(nb_towers)
+        self.__towers_offset = HEADER.size + nb_airplanes * AIRPLANE_RECORD.size
+        HEADER.pack_into(self.__memory.buf, 0, 0, 0, 0, nb_airplanes, 0, nb_towers, 0, 0, 0)
+
+    def publish(self, snapshot: SimulationSnapshot) -> None:
+        # Seqlock: an odd generation tells the readers that a write is in progress
+        buf = self.__memory.buf
+        self.__generation += 1
+        GENERATION.pack_into(buf, 0, self.__generation)
+        records = b"".join(starmap(AIRPLANE_RECORD.pack, snapshot.airplanes))
+        buf[HEADER.size:HEADER.size + len(records)] = records
+        self.__towers_record.pack_into(buf, self.__towers_offset, *(tower.nb_airplanes for tower in snapshot.towers))
+        HEADER.pack_into(
+            buf, 0, self.__generation, snapshot.tick, snapshot.chrono, self.__capacity, len(snapshot.airplanes), self.__nb_towers,
+            snapshot.land_on, snapshot.destroyed, int(snapshot.finished)
+        )
+        self.__generation += 1
+        GENERATION.pack_into(buf, 0, self.__generation)
+
+    def close(self) -> None:
+        self.__memory.close()
+        self.__memory.unlink()
+
+    name = property(lambda self: self.__memory.name)
+
+class SharedStateReader:
+
+    def __init__(self, name: str):
+        self.__memory = shared_memory.SharedMemory(name)
+        # The block belongs to the writer process: do not let this process' resource tracker unlink it at exit
+        resource_tracker.unregister(self.__memory._name, "shared_memory") # pylint: disable=protected-access
+        _, _, _, capacity, _, nb_towers, _, _, _ = HEADER.unpack_from(self.__memory.buf, 0)
+        self.__capacity = capacity
+        self.__towers_record = get_towers_record(nb_towers)
+        self.__towers_offset = HEADER.size + capacity * AIRPLANE_RECORD.size
+        self.__last = SimulationSnapshot(0, 0, tuple(), tuple(TowerState(i, 0) for i in range(nb_towers)), 0, 0, False)
+
+    def read(self) -> SimulationSnapshot:
+        # Seqlock: the records are unpacked in place, and again if the generation changed meanwhile.
+        # A write which does not end in time leaves the last snapshot read on screen.
+        buf = self.__memory.buf
+        deadline = time.perf_counter() + READ_TIMEOUT
+        while True:
+            generation = GENERATION.unpack_from(buf, 0)[0]
+            if not generation % 2:
+                header = HEADER.unpack_from(buf, 0)
+                nb_airplanes = min(header[4], self.__capacity)
+                with buf[HEADER.size:HEADER.size + nb_airplanes * AIRPLANE_RECORD.size] as records:
+                    airplanes = tuple(AIRPLANE_RECORD.iter_unpack(records))
+                towers = self.__towers_record.unpack_from(buf, self.__towers_offset)
+                if GENERATION.unpack_from(buf, 0)[0] == generation:
+                    break
+            if time.perf_counter() >= deadline:
+                return self.__last
+            time.sleep(0)
+        _, tick, chrono, _, _, _, land_on, destroyed, finished = header
+        self.__last = SimulationSnapshot(
+            tick, chrono, airplanes, tuple(starmap(TowerState, enumerate(towers))), land_on, destroyed, bool(finished)
+        )
+        return self.__last
+
+    def close(self) -> None:
+        self.__memory.close()
+
+    latest = property(read)
+
+def publish_simulation(parser: ScriptParser, name: str, tick_rate=100,
+                       listeners: Sequence[Callable[[Simulation], None]]=tuple()) -> dict[str, float]:
+    simulation = create_headless_simulation(parser)
+    for listener in listeners:
+        simulation.add_listener(listener)
+    writer = SharedStateWriter(name, simulation.nb_airplanes, len(simulation.towers_list))
+    try:
+        SimulationThread(simulation, tick_rate, buffer=writer).run()
+    finally:
+        writer.close()
+    return simulation.get_results()
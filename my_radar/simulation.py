@@ -0,0 +1,241 @@
+# -*- coding: Utf-8 -*
+
+import threading
+import time
+from typing import Callable, Sequence, Union
+import pygame
+from pygame.math import Vector2
+from .airplane import Airplane, AirplaneGroup
+from .tower import Tower, TowerGroup
+from .scheduler import SpawnScheduler
+from .membership import TowerMembership
+from .constants import SIMULATION_STEP
+from .metrics import REGISTRY
+from .snapshot import (
+    SimulationSnapshot, AirplaneState, TowerState, CollisionState, AirplanesCount, SnapshotBuffer,
+    AIRPLANE_TAKE_OFF, AIRPLANE_LAND_ON, AIRPLANE_DESTROYED, AIRPLANE_IN_TOWER_AREA
+)
+
+TICK_DURATION = REGISTRY.histogram("my_radar_tick_seconds", "Duration of a simulation tick")
+
+class Simulation:
+
+    def __init__(self, airplanes_group: AirplaneGroup, towers_group: TowerGroup, scheduler: Union[SpawnScheduler, None]=None):
+        self.__airplanes_group = airplanes_group
+        self.__towers_group = towers_group
+        self.__scheduler = scheduler if scheduler is not None else SpawnScheduler(None, tuple())
+        # Only the airplanes built so far and not released yet have an entity
+        self.__airplanes = dict[int, Airplane]()
+        self.__identifiers = dict[Airplane, int]()
+        self.__towers_list = towers_group.sprites().copy()
+        self.__membership = TowerMembership()
+        self.__collisions = list[tuple[float, int, int]]()
+        # The collisions with their positions: only appended to, a snapshot holds the list and the number of collisions it covers
+        self.__collision_states = list[CollisionState]()
+        self.__land_on = 0
+        self.__destroyed = 0
+        self.__chrono = 0
+        self.__tick = 0
+        # Replaced at the end of each tick: other threads read it without looking at the groups being updated
+        self.__airplanes_count = AirplanesCount(0, 0, 0, 0)
+        self.__listeners = list[Callable[["Simulation"], None]]()
+        for airplane in airplanes_group.sprites():
+            self.add_airplane(airplane)
+        self.__spawn_airplanes(0)
+
+    @classmethod
+    def from_setups(cls, airplane_image: pygame.Surface, tower_image: pygame.Surface,
+                    airplanes: Sequence[Sequence[float]], towers: Sequence[Sequence[float]], screen_rect: pygame.Rect):
+        towers_group = TowerGroup()
+        for tower_setup in towers:
+            tower = Tower.from_script_setup(tower_image, tower_setup, screen_rect)
+            tower.group = towers_group
+        return cls(AirplaneGroup(), towers_group, SpawnScheduler.from_setups(airplane_image, airplanes))
+
+    def update(self, elapsed_time: float, fixed_step=False) -> None:
+        start = time.perf_counter()
+        self.__chrono += elapsed_time
+        self.__tick += 1
+        # Airplanes not built yet have moved once per tick so far, and some of them land on before taking off
+        self.__spawn_airplanes(self.__tick - 1)
+        self.__land_on += self.__scheduler.land(self.__tick - 1)
+        nb_airplanes = len(self.__airplanes_group)
+        self.__airplanes_group.update(self.__chrono, fixed_step=fixed_step)
+        # Airplanes only leave the group when they land on during their update or when they are destroyed below
+        self.__land_on += nb_airplanes - len(self.__airplanes_group)
+        self.__membership.update(self.__towers_list, self.__airplanes)
+        # Airplanes join the group in spawn order, collisions are still resolved in the script order
+        airplanes_list = [self.__airplanes[identifier] for identifier in self.__membership.unprotected]
+        for airplane_1, airplane_2 in self.__airplanes_group.check_collisions(airplanes_list):
+            identifier_1, identifier_2 = self.__identifiers[airplane_1], self.__identifiers[airplane_2]
+            self.__collisions.append((self.__chrono, identifier_1, identifier_2))
+            x, y = (Vector2(airplane_1.center) + Vector2(airplane_2.center)) / 2
+            self.__collision_states.append(CollisionState(self.__chrono, identifier_1, identifier_2, x, y))
+            self.__destroyed += 2
+        if len(self.__airplanes) != len(self.__airplanes_group):
+            self.__release_airplanes()
+        self.__count_airplanes()
+        for listener in self.__listeners:
+            listener(self)
+        TICK_DURATION.observe(time.perf_counter() - start)
+
+    def step(self) -> None:
+        # Deterministic tick: every airplane moves exactly one step, whatever the wall clock says
+        self.update(SIMULATION_STEP / 1000, fixed_step=True)
+
+    def run(self, max_chrono: Union[float, None]=None) -> None:
+        while not self.finished and (max_chrono is None or self.__chrono < max_chrono):
+            self.step()
+
+    def __spawn_airplanes(self, nb_moves: int) -> None:
+        for identifier, airplane in self.__scheduler.spawn(self.__chrono, nb_moves):
+            self.add_airplane(airplane, identifier)
+
+    def __release_airplanes(self) -> None:
+        # Landed on and destroyed airplanes only remain as a row of the scheduler
+        for identifier, airplane in list(self.__airplanes.items()):
+            if not airplane.alive():
+                self.__scheduler.release(identifier, airplane)
+                self.__membership.discard(identifier)
+                del self.__airplanes[identifier]
+                del self.__identifiers[airplane]
+
+    def __count_airplanes(self) -> None:
+        # Once released, the airplanes landed on or destroyed during the tick are out of the flying mask
+        membership = self.__membership
+        self.__airplanes_count = AirplanesCount(
+            membership.nb_flying, self.__land_on, self.__destroyed, membership.nb_protected
+        )
+
+    def add_airplane(self, airplane: Airplane, identifier: Union[int, None]=None) -> int:
+        # Airplanes built outside the scheduler (editor) get the next identifier
+        if identifier is None:
+            identifier = self.__scheduler.add(airplane)
+        airplane.group = self.__airplanes_group
+        self.__airplanes[identifier] = airplane
+        self.__identifiers[airplane] = identifier
+        return identifier
+
+    def add_tower(self, tower: Tower) -> None:
+        tower.group = self.__towers_group
+        self.__towers_list.append(tower)
+
+    def get_identifier(self, airplane: Airplane) -> int:
+        return self.__identifiers[airplane]
+
+    def get_airplane(self, identifier: int) -> Union[Airplane, None]:
+        return self.__airplanes.get(identifier)
+
+    def get_position(self, identifier: int) -> Vector2:
+        airplane = self.__airplanes.get(identifier)
+        return Vector2(airplane.center) if airplane is not None else self.__scheduler.get_position(identifier)
+
+    def get_flags(self, identifier: int) -> int:
+        airplane = self.__airplanes.get(identifier)
+        if airplane is None:
+            return self.__scheduler.get_flags(identifier)
+        return get_airplane_flags(airplane, self.__membership.contains(identifier))
+
+    def get_angles(self) -> list[float]:
+        return [self.__scheduler.get_angle(identifier) for identifier in range(self.__scheduler.nb_airplanes)]
+
+    def add_listener(self, listener: Callable[["Simulation"], None]) -> None:
+        # Listeners are called at the end of every tick, from the thread running the simulation
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[["Simulation"], None]) -> None:
+        self.__listeners.remove(listener)
+
+    def load_state(self, tick: int, chrono: float, land_on: int, destroyed: int, collisions: Sequence[tuple[float, int, int]]) -> None:
+        self.__tick = tick
+        self.__chrono = chrono
+        self.__land_on = land_on
+        self.__destroyed = destroyed
+        self.__collisions = list(collisions)
+        self.__collision_states = [
+            CollisionState(chrono, airplane_1, airplane_2, *((self.get_position(airplane_1) + self.get_position(airplane_2)) / 2))
+            for chrono, airplane_1, airplane_2 in collisions
+        ]
+        self.__count_airplanes()
+
+    def snapshot(self) -> SimulationSnapshot:
+        airplanes = list[AirplaneState]()
+        for identifier in sorted(self.__airplanes):
+            airplane = self.__airplanes[identifier]
+            if not airplane.alive():
+                continue
+            airplanes.append(AirplaneState(identifier, airplane.center.x, airplane.center.y, airplane.angle,
+                                           get_airplane_flags(airplane, self.__membership.contains(identifier))))
+        towers = tuple(TowerState(identifier, self.__membership.count(identifier)) for identifier in range(len(self.__towers_list)))
+        results = self.get_results()
+        return SimulationSnapshot(self.__tick, self.__chrono, tuple(airplanes), towers, results["land_on"], results["destroyed"], self.finished,
+                                  self.__collision_states, len(self.__collision_states))
+
+    def get_results(self) -> dict[str, float]:
+        return {"chrono": self.__chrono, "land_on": self.__land_on, "destroyed": self.__destroyed}
+
+    airplanes_group = property(lambda self: self.__airplanes_group)
+    towers_group = property(lambda self: self.__towers_group)
+    towers_list = property(lambda self: self.__towers_list)
+    scheduler = property(lambda self: self.__scheduler)
+    membership = property(lambda self: self.__membership)
+    nb_airplanes = property(lambda self: self.__scheduler.nb_airplanes)
+    collisions = property(lambda self: self.__collisions)
+    collision_states = property(lambda self: self.__collision_states)
+    airplanes_count = property(lambda self: self.__airplanes_count)
+    chrono = property(lambda self: self.__chrono)
+    tick = property(lambda self: self.__tick)
+    finished = property(lambda self: not self.__airplanes_group and self.__scheduler.nb_pending == 0)
+
+def get_airplane_flags(airplane: Airplane, in_a_tower_area=False) -> int:
+    flags = 0
+    if airplane.take_off:
+        flags |= AIRPLANE_TAKE_OFF
+    if airplane.land_on:
+        flags |= AIRPLANE_LAND_ON
+    if airplane.destroyed:
+        flags |= AIRPLANE_DESTROYED
+    if in_a_tower_area:
+        flags |= AIRPLANE_IN_TOWER_AREA
+    return flags
+
+class SimulationThread(threading.Thread):
+
+    def __init__(self, simulation: Simulation, tick_rate=100, buffer: Union[SnapshotBuffer, None]=None):
+        super().__init__(name="simulation", daemon=True)
+        self.__simulation = simulation
+        self.__period = 1 / tick_rate
+        self.__buffer = buffer if buffer is not None else SnapshotBuffer()
+        self.__buffer.publish(simulation.snapshot())
+        self.__running = threading.Event()
+        self.__running.set()
+        self.__stopped = threading.Event()
+
+    def run(self) -> None:
+        simulation = self.__simulation
+        previous = time.perf_counter()
+        while not self.__stopped.is_set() and not simulation.finished:
+            if not self.__running.is_set():
+                self.__running.wait(self.__period)
+                previous = time.perf_counter()
+                continue
+            now = time.perf_counter()
+            simulation.update(now - previous)
+            previous = now
+            self.__buffer.publish(simulation.snapshot())
+            self.__stopped.wait(max(self.__period - (time.perf_counter() - now), 0))
+
+    def pause(self) -> None:
+        self.__running.clear()
+
+    def resume(self) -> None:
+        self.__running.set()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        self.__running.set()
+        if self.is_alive():
+            self.join()
+
+    running = property(lambda self: self.__running.is_set())
+    buffer = property(lambda self: self.__buffer)
@@ -0,0 +1,121 @@
+# -*- coding: Utf-8 -*
+
+import threading
+from typing import NamedTuple, Sequence, Union
+import pygame
+from pygame.math import Vector2
+from .entity import Entity
+from .constants import AIRPLANE_SIZE
+from .metrics import REGISTRY
+
+ROTATION_CACHE_HITS = REGISTRY.counter("my_radar_surface_cache_requests", "Rotated airplane surface cache lookups", cache="rotation", result="hit")
+ROTATION_CACHE_MISSES = REGISTRY.counter("my_radar_surface_cache_requests", "Rotated airplane surface cache lookups", cache="rotation", result="miss")
+
+AIRPLANE_TAKE_OFF = 1 << 0
+AIRPLANE_LAND_ON = 1 << 1
+AIRPLANE_DESTROYED = 1 << 2
+AIRPLANE_IN_TOWER_AREA = 1 << 3
+
+def is_flying(flags: int) -> bool:
+    return bool(flags & AIRPLANE_TAKE_OFF) and not flags & (AIRPLANE_LAND_ON | AIRPLANE_DESTROYED)
+
+class AirplaneState(NamedTuple):
+    # Consumers read the fields by position: the shared memory reader hands plain tuples with the same layout
+    identifier: int
+    x: float
+    y: float
+    angle: float
+    flags: int
+
+    @property
+    def flying(self) -> bool:
+        return is_flying(self.flags)
+
+class TowerState(NamedTuple):
+    identifier: int
+    nb_airplanes: int
+
+class CollisionState(NamedTuple):
+    chrono: float
+    airplane_1: int
+    airplane_2: int
+    x: float
+    y: float
+
+class AirplanesCount(NamedTuple):
+    flying: int
+    land_on: int
+    destroyed: int
+    in_tower_area: int
+
+class SimulationSnapshot(NamedTuple):
+    tick: int
+    chrono: float
+    airplanes: tuple[AirplaneState, ...]
+    towers: tuple[TowerState, ...]
+    land_on: int
+    destroyed: int
+    finished: bool
+    # Shared with the simulation, which keeps appending to it: only the first nb_collisions belong to the snapshot
+    collisions: Sequence[CollisionState] = tuple()
+    nb_collisions: int = 0
+
+class SnapshotBuffer:
+
+    def __init__(self):
+        self.__front = None
+        self.__condition = threading.Condition()
+
+    def publish(self, snapshot: SimulationSnapshot) -> None:
+        # The back buffer is the snapshot being built by the producer: swapping the front reference is atomic,
+        # so a reader never sees a partially written state.
+        with self.__condition:
+            self.__front = snapshot
+            self.__condition.notify_all()
+
+    def wait(self, timeout=None) -> Union[SimulationSnapshot, None]:
+        with self.__condition:
+            self.__condition.wait(timeout)
+            return self.__front
+
+    latest = property(lambda self: self.__front)
+
+class AirplaneStateRenderer:
+
+    def __init__(self, image: pygame.Surface):
+        self.__default_airplane_image = pygame.transform.smoothscale(image, AIRPLANE_SIZE).convert_alpha()
+        self.__rotated_images = dict[float, pygame.Surface]()
+        self.__hitbox_color = pygame.Color(46, 173, 46)
+        w, h = AIRPLANE_SIZE
+        self.__corners = [Vector2(-w / 2, -h / 2), Vector2(w / 2, -h / 2), Vector2(w / 2, h / 2), Vector2(-w / 2, h / 2)]
+
+    def get_image(self, angle: float) -> pygame.Surface:
+        angle = round(angle, 1)
+        image = self.__rotated_images.get(angle)
+        if image is None:
+            ROTATION_CACHE_MISSES.inc()
+            image = pygame.transform.rotate(self.__default_airplane_image, angle).convert_alpha()
+            self.__rotated_images[angle] = image
+        else:
+            ROTATION_CACHE_HITS.inc()
+        return image
+
+    def get_rect(self, state: AirplaneState) -> pygame.Rect:
+        _, x, y, angle, _ = state
+        return self.get_image(angle).get_rect(center=(x, y))
+
+    def draw(self, surface: pygame.Surface, airplanes: tuple[AirplaneState, ...]) -> None:
+        show_sprite = Entity.sprite_shown()
+        show_hitbox = Entity.hitbox_shown()
+        for _, x, y, angle, flags in airplanes:
+            if not is_flying(flags):
+                continue
+            center = Vector2(x, y)
+            if show_sprite:
+                image = self.get_image(angle)
+                surface.blit(image, image.get_rect(center=center))
+            if show_hitbox:
+                points = [center + corner.rotate(-angle) for corner in self.__corners]
+                pygame.draw.polygon(surface, self.__hitbox_color, points, width=1)
+
+    images = property(lambda self: [self.__default_airplane_image, *self.__rotated_images.values()])
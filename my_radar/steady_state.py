@@ -0,0 +1,51 @@
+# -*- coding: Utf-8 -*
+
+import gc
+import time
+from .metrics import REGISTRY
+
+GC_MIN_SLACK = 0.002 # seconds left before the next frame below which the collector waits for a later frame
+GC_DEFER_LIMIT = 10  # without slack, the youngest generation may grow up to this many times its threshold before being collected
+
+GC_DURATION = REGISTRY.histogram("my_radar_gc_seconds", "Duration of the garbage collections run between frames")
+
+class FrameCollector:
+
+    # Steady-state mode: the objects built at load are moved out of the collector's sight (gc.freeze()) and the automatic
+    # collections, which may happen in the middle of a frame, are replaced by collections run in the time left after a frame
+    def __init__(self, enabled=True):
+        self.__enabled = enabled
+        self.__frozen = False
+        self.__thresholds = gc.get_threshold()
+
+    def freeze(self) -> None:
+        if not self.__enabled or self.__frozen:
+            return
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self.__frozen = True
+
+    def collect(self, slack: float) -> None:
+        if not self.__frozen:
+            return
+        count_0, count_1, count_2 = gc.get_count()
+        threshold_0, threshold_1, threshold_2 = self.__thresholds
+        if count_0 < threshold_0 or (slack < GC_MIN_SLACK and count_0 < threshold_0 * GC_DEFER_LIMIT):
+            return
+        # Same choice of generation as the automatic collection
+        generation = 0
+        if count_1 >= threshold_1:
+            generation = 2 if count_2 >= threshold_2 else 1
+        start = time.perf_counter()
+        gc.collect(generation)
+        GC_DURATION.observe(time.perf_counter() - start)
+
+    def stop(self) -> None:
+        if self.__frozen:
+            gc.enable()
+            gc.unfreeze()
+            self.__frozen = False
+
+    enabled = property(lambda self: self.__enabled)
+    frozen = property(lambda self: self.__frozen)
@@ -0,0 +1,204 @@
+# -*- coding: Utf-8 -*
+
+import asyncio
+import struct
+import threading
+from collections import deque
+from typing import NamedTuple, Sequence, Union
+from .snapshot import SimulationSnapshot, AirplaneState, TowerState
+
+# Every frame is a 32 bits payload length followed by the payload, whose first byte is the frame type
+FRAME_LENGTH = struct.Struct("<I")
+FRAME_SNAPSHOT = 1
+FRAME_COLLISION = 2
+FRAME_SUBSCRIBE = 3
+
+SNAPSHOT_HEADER = struct.Struct("<BQdIIBII")   # type, tick, chrono, landed on, destroyed, finished, nb airplanes, nb towers
+AIRPLANE_RECORD = struct.Struct("<IfffB")      # identifier, x, y, angle, flags
+TOWER_RECORD = struct.Struct("<II")            # identifier, nb airplanes
+COLLISION_RECORD = struct.Struct("<BdIIff")    # type, chrono, airplane, airplane, x, y
+SUBSCRIBE_RECORD = struct.Struct("<Bffff")     # type, left, top, width, height (an empty region means everything)
+
+MAX_FRAME_SIZE = 1 << 24
+
+class CollisionEvent(NamedTuple):
+    chrono: float
+    airplane_1: int
+    airplane_2: int
+    x: float
+    y: float
+
+Region = Union[tuple[float, float, float, float], None]
+
+def in_region(region: Region, x: float, y: float) -> bool:
+    if region is None:
+        return True
+    left, top, width, height = region
+    return left <= x < left + width and top <= y < top + height
+
+def encode_frame(payload: bytes) -> bytes:
+    return FRAME_LENGTH.pack(len(payload)) + payload
+
+def encode_snapshot(snapshot: SimulationSnapshot, region: Region=None) -> bytes:
+    airplanes = [state for state in snapshot.airplanes if in_region(region, state[1], state[2])]
+    payload = bytearray(SNAPSHOT_HEADER.pack(
+        FRAME_SNAPSHOT, snapshot.tick, snapshot.chrono, snapshot.land_on, snapshot.destroyed, int(snapshot.finished),
+        len(airplanes), len(snapshot.towers)
+    ))
+    for state in airplanes:
+        payload += AIRPLANE_RECORD.pack(*state)
+    for tower in snapshot.towers:
+        payload += TOWER_RECORD.pack(*tower)
+    return encode_frame(bytes(payload))
+
+def encode_collision(collision: CollisionEvent) -> bytes:
+    return encode_frame(COLLISION_RECORD.pack(FRAME_COLLISION, *collision))
+
+def encode_subscription(region: Region) -> bytes:
+    return encode_frame(SUBSCRIBE_RECORD.pack(FRAME_SUBSCRIBE, *(region or (0, 0, 0, 0))))
+
+def decode_frame(payload: bytes) -> Union[SimulationSnapshot, CollisionEvent]:
+    frame_type = payload[0]
+    if frame_type == FRAME_SNAPSHOT:
+        _, tick, chrono, land_on, destroyed, finished, nb_airplanes, nb_towers = SNAPSHOT_HEADER.unpack_from(payload, 0)
+        offset = SNAPSHOT_HEADER.size
+        airplanes = tuple(
+            AirplaneState(*AIRPLANE_RECORD.unpack_from(payload, offset + i * AIRPLANE_RECORD.size)) for i in range(nb_airplanes)
+        )
+        offset += nb_airplanes * AIRPLANE_RECORD.size
+        towers = tuple(TowerState(*TOWER_RECORD.unpack_from(payload, offset + i * TOWER_RECORD.size)) for i in range(nb_towers))
+        return SimulationSnapshot(tick, chrono, airplanes, towers, land_on, destroyed, bool(finished))
+    if frame_type == FRAME_COLLISION:
+        return CollisionEvent(*COLLISION_RECORD.unpack(payload)[1:])
+    raise ValueError("Unknown telemetry frame type {}".format(frame_type))
+
+def decode_subscription(payload: bytes) -> Region:
+    frame_type, left, top, width, height = SUBSCRIBE_RECORD.unpack(payload)
+    if frame_type != FRAME_SUBSCRIBE:
+        raise ValueError("Unknown telemetry request type {}".format(frame_type))
+    return (left, top, width, height) if width > 0 and height > 0 else None
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    length = FRAME_LENGTH.unpack(await reader.readexactly(FRAME_LENGTH.size))[0]
+    if length == 0 or length > MAX_FRAME_SIZE:
+        raise ValueError("Invalid telemetry frame length {}".format(length))
+    return await reader.readexactly(length)
+
+class TelemetryClient:
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.__writer = writer
+        self.__region = None
+        self.__snapshot = None
+        self.__collisions = deque[CollisionEvent]()
+        self.__ready = asyncio.Event()
+
+    def push(self, snapshot: Union[SimulationSnapshot, None], collisions: Sequence[CollisionEvent]) -> None:
+        # Slow clients only get the latest snapshot: an unsent one is simply replaced. Collisions are never dropped.
+        if snapshot is not None:
+            self.__snapshot = snapshot
+        self.__collisions.extend(collision for collision in collisions if in_region(self.__region, collision.x, collision.y))
+        self.__ready.set()
+
+    async def send_loop(self, encoded_snapshots: dict[tuple[int, Region], bytes]) -> None:
+        writer = self.__writer
+        while not writer.is_closing():
+            await self.__ready.wait()
+            self.__ready.clear()
+            while self.__collisions:
+                writer.write(encode_collision(self.__collisions.popleft()))
+            snapshot, self.__snapshot = self.__snapshot, None
+            if snapshot is not None:
+                # Clients following the same region share the serialization of a snapshot
+                key = (snapshot.tick, self.__region)
+                data = encoded_snapshots.get(key)
+                if data is None:
+                    data = encoded_snapshots[key] = encode_snapshot(snapshot, self.__region)
+                writer.write(data)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    def set_region(self, region: Region) -> None:
+        self.__region = region
+
+    def close(self) -> None:
+        self.__writer.close()
+
+class TelemetryServer:
+
+    def __init__(self, address: str):
+        self.__address = address
+        self.__loop = None
+        self.__stop = None
+        self.__started = threading.Event()
+        self.__error = None
+        self.__clients = set[TelemetryClient]()
+        self.__handlers = set[asyncio.Task]()
+        self.__encoded_snapshots = dict[tuple[int, Region], bytes]()
+        self.__thread = threading.Thread(target=self.__run, name="telemetry", daemon=True)
+
+    def start(self) -> None:
+        self.__thread.start()
+        self.__started.wait()
+        if self.__error is not None:
+            raise self.__error
+
+    def stop(self) -> None:
+        if self.__loop is not None and self.__thread.is_alive():
+            self.__loop.call_soon_threadsafe(self.__stop.set)
+            self.__thread.join()
+
+    def publish(self, snapshot: SimulationSnapshot, collisions: Sequence[CollisionEvent]=tuple()) -> None:
+        # Called from the render loop: only hand the (immutable) snapshot over, the event loop thread does the rest
+        if self.__loop is not None and self.__clients:
+            self.__loop.call_soon_threadsafe(self.__dispatch, snapshot, tuple(collisions))
+
+    def __dispatch(self, snapshot: SimulationSnapshot, collisions: tuple[CollisionEvent, ...]) -> None:
+        self.__encoded_snapshots.clear()
+        for client in self.__clients:
+            client.push(snapshot, collisions)
+
+    def __run(self) -> None:
+        asyncio.run(self.__serve())
+
+    async def __serve(self) -> None:
+        self.__stop = asyncio.Event()
+        try:
+            if ":" in self.__address or self.__address.isdigit():
+                host, _, port = self.__address.rpartition(":")
+                server = await asyncio.start_server(self.__handle_client, host or "127.0.0.1", int(port))
+            else:
+                server = await asyncio.start_unix_server(self.__handle_client, self.__address)
+        except (OSError, ValueError) as exc:
+            self.__error = exc
+            self.__started.set()
+            return
+        self.__loop = asyncio.get_running_loop()
+        self.__started.set()
+        async with server:
+            await self.__stop.wait()
+            # Closing the connections ends the client handlers (end of stream) instead of cancelling them
+            for client in self.__clients:
+                client.close()
+            await asyncio.gather(*self.__handlers, return_exceptions=True)
+
+    async def __handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = TelemetryClient(writer)
+        self.__clients.add(client)
+        self.__handlers.add(asyncio.current_task())
+        sender = asyncio.create_task(client.send_loop(self.__encoded_snapshots))
+        try:
+            while not sender.done():
+                client.set_region(decode_subscription(await read_frame(reader)))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            self.__clients.discard(client)
+            self.__handlers.discard(asyncio.current_task())
+            sender.cancel()
+            writer.close()
+
+    address = property(lambda self: self.__address)
+    nb_clients = property(lambda self: len(self.__clients))
@@ -1,10 +1,11 @@
 # -*- coding: Utf-8 -*
 
-from typing import Sequence, Union
+from array import array
+from typing import Collection, Sequence, Union
 import pygame
 from pygame.math import Vector2
 from .entity import Entity, EntityEditor, EntityGroup
-from .airplane import Airplane
+from .fonts import get_shared_font
 
 class TowerArea(pygame.sprite.Sprite):
 
@@ -32,6 +33,8 @@ class TowerArea(pygame.sprite.Sprite):
 
 class Tower(Entity):
 
+    __slots__ = ("__area_outline", "__area_color", "__image_area", "__area", "__image_tower", "__screen_rect")
+
     def __init__(self, image: pygame.Surface, center: Vector2, radius: float, screen_rect: pygame.Rect):
         super().__init__()
         self.__area_outline = area_outline = 2
@@ -39,7 +42,6 @@ class Tower(Entity):
         self.__image_area = TowerArea(radius, area_outline, area_color, center=center)
         self.__area = pygame.sprite.Group()
         self.__image_tower = image.convert_alpha()
-        self.__airplanes = pygame.sprite.Group()
         self.__screen_rect = screen_rect
         self.update_area()
 
@@ -59,37 +61,32 @@ class Tower(Entity):
         self.__image_area.set_radius(radius)
         self.update_area()
 
+    @staticmethod
+    def load_setup_columns(towers: Sequence["Tower"], setups: array, columns: Collection[int]) -> None:
+        # Bulk load_setup(): the area circle is only drawn again when the radius changes
+        center = 0 in columns or 1 in columns
+        radius = 2 in columns
+        stride = len(setups) // max(len(towers), 1)
+        for tower, start in zip(towers, range(0, len(setups), stride)):
+            if center:
+                tower.__image_area.set_center((setups[start], setups[start + 1]))
+            if radius:
+                tower.__image_area.set_radius(setups[start + 2])
+            if center or radius:
+                tower.update_area()
+
     def draw(self, surface: pygame.Surface) -> None:
         if self.sprite_shown():
             surface.blit(self.image, self.rect)
         if self.hitbox_shown():
             self.__area.draw(surface)
 
-    def update(self, airplanes_list: list[Airplane, ...]) -> None:
-        for airplane in airplanes_list:
-            if not airplane.flying:
-                continue
-            if any(airplane_in_area(airplane, area) for area in self.__area):
-                self.__airplanes.add(airplane)
-                airplane.towers.add(self)
-            else:
-                self.__airplanes.remove(airplane)
-                airplane.towers.remove(self)
-
     def update_area(self) -> None:
         screen_rect = self.__screen_rect
         self.__area.empty()
         self.__area.add(self.__image_area)
-        area_rect = self.__image_area.rect
-        area_check = [
-            (area_rect.top < screen_rect.top,       {"centerx": area_rect.centerx, "top": screen_rect.bottom - abs(screen_rect.top - area_rect.top)}),
-            (area_rect.bottom > screen_rect.bottom, {"centerx": area_rect.centerx, "bottom": screen_rect.top + abs(screen_rect.bottom - area_rect.bottom)}),
-            (area_rect.left < screen_rect.left,     {"centery": area_rect.centery, "left": screen_rect.right - abs(screen_rect.left - area_rect.left)}),
-            (area_rect.right > screen_rect.right,   {"centery": area_rect.centery, "right": screen_rect.left + abs(screen_rect.right - area_rect.right)})
-        ]
-        for area_out_of_screen, new_area_pos in area_check:
-            if area_out_of_screen:
-                self.__area.add(TowerArea(self.__image_area.radius, self.__area_outline, self.__area_color, **new_area_pos))
+        for new_area_pos in get_wrapped_area_positions(self.__image_area.rect, screen_rect):
+            self.__area.add(TowerArea(self.__image_area.radius, self.__area_outline, self.__area_color, **new_area_pos))
 
     def set_alpha(self, value: int) -> None:
         for area in self.__area:
@@ -99,14 +96,17 @@ class Tower(Entity):
 
     image = property(lambda self: self.__image_tower)
     rect = property(lambda self: self.__image_tower.get_rect(midbottom=self.__image_area.rect.center))
+    areas = property(lambda self: self.__area.sprites())
     area = property(lambda self: self.__image_area)
 
 class TowerEditor(Tower, EntityEditor):
 
+    __slots__ = ("__update_point", "__font")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.__update_point = None
-        self.__font = pygame.font.SysFont("calibri", 15, bold=True)
+        self.__font = get_shared_font("calibri", 15, bold=True)
 
     def __repr__(self) -> str:
         return "<{} center={} radius={}>".format(
@@ -172,6 +172,10 @@ class TowerEditor(Tower, EntityEditor):
             }
         }
 
+    @staticmethod
+    def get_setup_columns() -> dict[str, tuple[int, ...]]:
+        return {"x": (0,), "y": (1,), "radius": (2,)}
+
 
 class TowerGroup(EntityGroup):
 
@@ -183,18 +187,11 @@ class TowerGroup(EntityGroup):
         return super().sprites()
 
 
-def airplane_in_area(airplane: Airplane, area: TowerArea) -> bool:
-    # segments = [(point, point + edge) for point, edge in zip(airplane.get_hitbox_points(), airplane.get_hitbox_edges())]
-    # area_center = Vector2(area.rect.center)
-    # area_radius = area.radius
-    # for point_1, point_2 in segments:
-    #     distance_p1_center = point_1.distance_to(area_center)
-    #     distance_p2_center = point_2.distance_to(area_center)
-    #     if distance_p1_center <= area_radius or distance_p2_center <= area_radius:
-    #         return True
-    #     direction_p1_p2 = (point_2 - point_1).normalize()
-    #     vector_p1_center = area_center - point_1
-    #     if abs(direction_p1_p2.cross(vector_p1_center)) <= area_radius:
-    #         return True
-    # return False
-    return Vector2(airplane.rect.center).distance_to(area.center) <= area.radius
+def get_wrapped_area_positions(area_rect: pygame.Rect, screen_rect: pygame.Rect) -> list[dict[str, int]]:
+    area_check = [
+        (area_rect.top < screen_rect.top,       {"centerx": area_rect.centerx, "top": screen_rect.bottom - abs(screen_rect.top - area_rect.top)}),
+        (area_rect.bottom > screen_rect.bottom, {"centerx": area_rect.centerx, "bottom": screen_rect.top + abs(screen_rect.bottom - area_rect.bottom)}),
+        (area_rect.left < screen_rect.left,     {"centery": area_rect.centery, "left": screen_rect.right - abs(screen_rect.left - area_rect.left)}),
+        (area_rect.right > screen_rect.right,   {"centery": area_rect.centery, "right": screen_rect.left + abs(screen_rect.right - area_rect.right)})
+    ]
+    return [new_area_pos for area_out_of_screen, new_area_pos in area_check if area_out_of_screen]
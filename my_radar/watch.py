@@ -0,0 +1,87 @@
+# -*- coding: Utf-8 -*
+
+import os
+import sys
+import time
+from array import array
+from typing import NamedTuple, Union
+from .parser import ScriptParserError, parse_script_line
+
+WATCH_INTERVAL = 0.25 # seconds between two checks of the script file
+
+class ScriptChange(NamedTuple):
+    start: int   # index of the first changed line
+    removed: int # number of lines replaced, starting from start
+    lines: list[tuple[str, list[float]]]
+
+class ScriptWatcher:
+
+    # Polls the script file: only the lines between the unchanged head and tail are parsed again
+    def __init__(self, path: str, interval: float=WATCH_INTERVAL):
+        self.__path = path
+        self.__interval = interval
+        self.__next_check = time.monotonic() + interval
+        self.__stat = None
+        self.__hashes = array("q")
+        self.__letters = str()
+        self.reset()
+
+    def __read(self) -> Union[list[bytes], None]:
+        try:
+            stat = os.stat(self.__path)
+            with open(self.__path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        self.__stat = (stat.st_mtime_ns, stat.st_size)
+        return data.splitlines()
+
+    def reset(self) -> None:
+        # Takes the file as it is now (after it was saved by the editor for example)
+        lines = self.__read()
+        if lines is None:
+            return
+        self.__hashes = array("q", map(hash, lines))
+        self.__letters = "".join(chr(line.lstrip()[0]) if line.strip() else " " for line in lines)
+
+    def poll(self) -> Union[ScriptChange, None]:
+        now = time.monotonic()
+        if now < self.__next_check:
+            return None
+        self.__next_check = now + self.__interval
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) == self.__stat:
+            return None
+        lines = self.__read()
+        if lines is None:
+            return None
+        hashes = array("q", map(hash, lines))
+        old_hashes = self.__hashes
+        start = 0
+        end = min(len(hashes), len(old_hashes))
+        while start < end and hashes[start] == old_hashes[start]:
+            start += 1
+        nb_common_tail = 0
+        while nb_common_tail < end - start and hashes[-1 - nb_common_tail] == old_hashes[-1 - nb_common_tail]:
+            nb_common_tail += 1
+        new_end = len(hashes) - nb_common_tail
+        old_end = len(old_hashes) - nb_common_tail
+        try:
+            parsed = [
+                parse_script_line(self.__path, index + 1, lines[index].decode())
+                for index in range(start, new_end)
+            ]
+        except (ScriptParserError, ValueError) as e:
+            # The file may be written in several times: the change is applied once the script is valid again
+            print("my_radar: {}: {}".format(e.__class__.__name__, str(e)), file=sys.stderr)
+            return None
+        self.__hashes = hashes
+        self.__letters = self.__letters[:start] + "".join(letter for letter, _ in parsed) + self.__letters[old_end:]
+        if start == new_end and start == old_end:
+            return None
+        return ScriptChange(start, old_end - start, parsed)
+
+    letters = property(lambda self: self.__letters)
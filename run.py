@@ -1,9 +1,16 @@
 #! /bin/python3
 # -*- coding: Utf-8 -*
+# pylint: disable=wrong-import-position
 
 import sys
+import time
 import argparse
-from my_radar import MyRadar, ScriptParser
+
+STARTUP_TIME = time.perf_counter()
+
+from my_radar import MyRadar, ScriptParser, publish_simulation, print_results
+from my_radar.profiling import StartupProfiler, MemoryProfiler
+from my_radar.loading import load_script_in_background
 
 class MyHelpFormatter(argparse.RawTextHelpFormatter):
 
@@ -16,19 +23,98 @@ class MyHelpFormatter(argparse.RawTextHelpFormatter):
             "user interactions:",
             "  'L' key:" + nb_spaces * " " + "enable/disable hitboxes and areas",
             "  'S' key:" + nb_spaces * " " + "enable/disable sprites",
+            "  'H' key:" + nb_spaces * " " + "show/hide the traffic heatmap",
             "  'P' key:" + nb_spaces * " " + "Play/pause the simulation",
+            "replay interactions:",
+            "  'P' key:" + nb_spaces * " " + "Play/pause the replay",
+            "  Left/Right arrows:" + nb_spaces * " " + "Go back/forward 10 seconds",
+            "  Up/Down arrows:" + nb_spaces * " " + "Double/halve the playback speed",
         ]
         return help_str + "\n" + "\n".join(user_interaction_help) + "\n"
 
 def main() -> int:
     parser = argparse.ArgumentParser(prog="my_radar", description="Air traffic simulation panel", formatter_class=MyHelpFormatter)
-    parser.add_argument("script", help="Path to a .rdr script file")
+    parser.add_argument("script", nargs="?", help="Path to a .rdr script file (not needed with --replay or --resume)")
     parser.add_argument("-e", "--editor", help="Launch the script editor", action="store_true")
+    parser.add_argument("-t", "--threaded", help="Run the simulation on its own thread, decoupled from rendering", action="store_true")
+    parser.add_argument("--shared-memory", metavar="NAME", help="Draw the simulation published in the shared memory block NAME")
+    parser.add_argument("--publish", metavar="NAME", help="Run the simulation without window and publish its state in the shared memory block NAME")
+    parser.add_argument("--record", metavar="FILE", help="Record the airplanes trajectories in FILE")
+    parser.add_argument("--replay", metavar="FILE", help="Replay a trajectories recording instead of running the simulation")
+    parser.add_argument("--checkpoint", metavar="FILE", help="Save the whole simulation state in FILE at regular intervals")
+    parser.add_argument("--checkpoint-every", metavar="MINUTES", type=float, default=5, help="Simulated minutes between two checkpoints (default: 5)")
+    parser.add_argument("--resume", metavar="FILE", help="Resume the simulation saved in the checkpoint FILE")
+    parser.add_argument("--event-log", metavar="FILE",
+                        help="Log the collisions and tower area transitions in FILE (JSON lines if FILE ends with .jsonl, binary otherwise)")
+    parser.add_argument("--heatmap", metavar="FILE", help="Save the traffic heatmap of the run in FILE (NumPy .npy array), also with --publish")
+    parser.add_argument("--telemetry", metavar="ADDRESS", help="Stream the simulation state on ADDRESS ([host:]port or Unix socket path)")
+    parser.add_argument("--metrics", metavar="ADDRESS", help="Serve metrics in Prometheus text format on http://ADDRESS/metrics ([host:]port)")
+    parser.add_argument("--startup-profile", help="Print the time spent in each startup stage, up to the first frame", action="store_true")
+    parser.add_argument("--memory-profile", help="Report the memory used by each subsystem and allocated per frame", action="store_true")
+    parser.add_argument("--steady-state", help="Freeze the objects built at load and only run the garbage collector between frames",
+                        action="store_true")
+    parser.add_argument("--watch", help="Reload the script each time it changes on disk (with --editor)", action="store_true")
+    parser.add_argument("--no-autosave", help="Do not journal the editor changes in the background (with --editor)", action="store_true")
+    parser.add_argument("--recover", help="Recover the editor changes not saved during the last session (with --editor)", action="store_true")
+    parser.add_argument("--crossings", help="Print the route crossings of the script and exit", action="store_true")
 
     args = parser.parse_args()
-    script = ScriptParser(args.script, raise_error_file_not_found=not args.editor)
+    profiler = StartupProfiler(enabled=args.startup_profile, start=STARTUP_TIME)
+    profiler.mark("imports and arguments")
+    # Started before the script is parsed, to account for the parser lists
+    memory_profiler = MemoryProfiler(enabled=args.memory_profile)
+    if args.replay and not args.script:
+        MyRadar(
+            None, replay=args.replay, telemetry=args.telemetry, metrics=args.metrics, startup_profiler=profiler,
+            memory_profiler=memory_profiler, steady_state=args.steady_state
+        ).start()
+        return 0
+    if args.resume and not args.script:
+        MyRadar(
+            None, threaded=args.threaded, record=args.record, resume=args.resume, checkpoint=args.checkpoint,
+            checkpoint_every=args.checkpoint_every, telemetry=args.telemetry, metrics=args.metrics, startup_profiler=profiler,
+            memory_profiler=memory_profiler, steady_state=args.steady_state, event_log=args.event_log, heatmap=args.heatmap
+        ).start()
+        return 0
+    if not args.script:
+        parser.error("the following arguments are required: script")
+    if args.watch and not args.editor:
+        parser.error("--watch needs --editor")
+    if args.recover and not args.editor:
+        parser.error("--recover needs --editor")
+    if args.crossings or args.publish:
+        script = ScriptParser(args.script, raise_error_file_not_found=not args.editor)
+    else:
+        # The window opens while the script is parsed
+        script = load_script_in_background(args.script, raise_error_file_not_found=not args.editor)
+
+    if args.crossings:
+        import pygame # pylint: disable=import-outside-toplevel
+        from my_radar.constants import SCREEN_SIZE # pylint: disable=import-outside-toplevel
+        from my_radar.routes import find_route_crossings # pylint: disable=import-outside-toplevel
+        for crossing in find_route_crossings(script.airplanes, script.towers, pygame.Rect((0, 0), SCREEN_SIZE)):
+            print("A{} x A{} at ({:.1f}, {:.1f}): {:.1f}s / {:.1f}s{}".format(
+                crossing.airplane_1, crossing.airplane_2, crossing.x, crossing.y, crossing.time_1, crossing.time_2,
+                " (protected)" if crossing.protected else ""
+            ))
+        return 0
+
+    if args.publish:
+        heatmap = None
+        if args.heatmap:
+            from my_radar.heatmap import TrafficHeatmap # pylint: disable=import-outside-toplevel
+            heatmap = TrafficHeatmap()
+        print_results(publish_simulation(script, args.publish, listeners=[heatmap] if heatmap is not None else tuple()))
+        if heatmap is not None:
+            heatmap.save(args.heatmap)
+        return 0
 
-    MyRadar(script, editor=args.editor).start()
+    MyRadar(
+        script, editor=args.editor, threaded=args.threaded, shared_memory=args.shared_memory, record=args.record, replay=args.replay,
+        resume=args.resume, checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every, telemetry=args.telemetry, metrics=args.metrics,
+        startup_profiler=profiler, watch=args.watch, autosave=not args.no_autosave, recover=args.recover,
+        memory_profiler=memory_profiler, steady_state=args.steady_state, event_log=args.event_log, heatmap=args.heatmap
+    ).start()
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+# -*- coding: Utf-8 -*
+
+import os
+import sys
+import gc
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+# pylint: disable=wrong-import-position
+from my_radar.parser import ScriptParser
+from my_radar.headless import create_headless_simulation
+
+WARM_UP_TICKS = 100
+MEASURED_TICKS = 500
+MAX_GROWTH_PER_TICK = 64 # bytes
+
+def write_script(path: str) -> None:
+    # Parallel lanes, some of them through tower areas: airplanes fly the whole measure without colliding nor landing on
+    with open(path, "w") as file:
+        for lane in range(20):
+            print("A", 100, 100 + lane * 40, 1800, 100 + lane * 40, 50, 0, file=file)
+        print("T", 500, 300, 120, file=file)
+        print("T", 1200, 700, 150, file=file)
+
+def test_steady_state_allocations(tmp_path):
+    path = str(tmp_path / "steady.rdr")
+    write_script(path)
+    simulation = create_headless_simulation(ScriptParser(path))
+    for _ in range(WARM_UP_TICKS):
+        simulation.step()
+    tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        for _ in range(MEASURED_TICKS):
+            simulation.step()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    assert not simulation.finished and not simulation.collisions
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    growth = sum(stat.size_diff for stat in after.filter_traces(filters).compare_to(before.filter_traces(filters), "filename"))
+    assert growth / MEASURED_TICKS < MAX_GROWTH_PER_TICK, "{:.1f} bytes per tick".format(growth / MEASURED_TICKS)